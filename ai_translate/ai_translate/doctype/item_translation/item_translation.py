@@ -0,0 +1,19 @@
+# Copyright (c) 2026, sammish and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class ItemTranslation(Document):
+	def autoname(self):
+		from ai_translate.item_translation import make_name
+
+		self.name = make_name(self.item_code, self.language)
+
+	def validate(self):
+		from ai_translate.item_translation import source_hash
+
+		self.source_hash = source_hash(self.source_text)
+		# A translation corrected by hand must never be replaced by an AI one
+		if not self.is_new() and self.has_value_changed("translated_text"):
+			self.reviewed = 1
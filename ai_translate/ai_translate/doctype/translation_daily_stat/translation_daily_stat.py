@@ -0,0 +1,16 @@
+# Copyright (c) 2026, sammish and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TranslationDailyStat(Document):
+	def autoname(self):
+		from ai_translate.translation_stats import make_name
+
+		self.name = make_name(self.date, self.ai_provider, self.target_language)
+
+
+def on_doctype_update():
+	frappe.db.add_index("Translation Daily Stat", ["date"])
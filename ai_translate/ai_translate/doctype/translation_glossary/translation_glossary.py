@@ -0,0 +1,32 @@
+# Copyright (c) 2026, sammish and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TranslationGlossary(Document):
+	def autoname(self):
+		from ai_translate.glossary import make_name
+
+		self.name = make_name(self.source_language, self.target_language)
+
+	def validate(self):
+		seen = set()
+		for term in self.terms:
+			term.source_term = (term.source_term or "").strip()
+			term.target_term = (term.target_term or "").strip()
+			key = term.source_term if term.case_sensitive else term.source_term.lower()
+			if key in seen:
+				frappe.throw(f"Row {term.idx}: {term.source_term} is already in the glossary")
+			seen.add(key)
+
+	def on_update(self):
+		from ai_translate.glossary import bump_version
+
+		bump_version()
+
+	def on_trash(self):
+		from ai_translate.glossary import bump_version
+
+		bump_version()
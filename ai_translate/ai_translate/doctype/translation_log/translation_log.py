@@ -0,0 +1,17 @@
+# Copyright (c) 2026, sammish and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TranslationLog(Document):
+	pass
+
+
+def on_doctype_update():
+	# Every list filter and the retention cleanup range over creation
+	frappe.db.add_index("Translation Log", ["creation"])
+	frappe.db.add_index("Translation Log", ["ai_provider", "creation"])
+	frappe.db.add_index("Translation Log", ["target_language", "creation"])
+	frappe.db.add_index("Translation Log", ["status", "creation"])
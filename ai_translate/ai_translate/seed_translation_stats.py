@@ -0,0 +1,8 @@
+from ai_translate.translation_stats import reconcile_translated_rows
+
+
+def execute():
+	"""
+	Count the rows translated before Translation Daily Stat kept translated_rows
+	"""
+	reconcile_translated_rows(full=True)
@@ -35,8 +35,30 @@ def execute():
             "read_only": 1
         })
         custom_field.insert(ignore_permissions=True)
+
+    # Hash of the source description each translation was made from
+    if not frappe.db.exists("Custom Field", {"dt": "Sales Invoice Item", "fieldname": "custom_source_hash"}):
+        custom_field = frappe.get_doc({
+            "doctype": "Custom Field",
+            "dt": "Sales Invoice Item",
+            "label": "Translation Source Hash",
+            "fieldname": "custom_source_hash",
+            "fieldtype": "Data",
+            "insert_after": "custom_translated_description",
+            "hidden": 1,
+            "read_only": 1,
+            "no_copy": 1
+        })
+        custom_field.insert(ignore_permissions=True)
+    else:
+        # A hash copied onto a duplicated invoice's rows would claim they are translated
+        custom_field = frappe.get_doc("Custom Field", {"dt": "Sales Invoice Item", "fieldname": "custom_source_hash"})
+        if not custom_field.no_copy:
+            custom_field.no_copy = 1
+            custom_field.save(ignore_permissions=True)
         
     # Create user preference fields
+    provider_options = "\ngroq\nopenai\nclaude\nperplexity\ndeepseek"
     if not frappe.db.exists("Custom Field", {"dt": "User", "fieldname": "preferred_translation_provider"}):
         custom_field = frappe.get_doc({
             "doctype": "Custom Field",
@@ -44,11 +66,21 @@ def execute():
             "label": "Preferred Translation Provider",
             "fieldname": "preferred_translation_provider",
             "fieldtype": "Select",
-            "options": "\ngoogle_free\nmymemory\nlibretranslate",
-            "default": "google_free",
+            "options": provider_options,
             "insert_after": "language"
         })
         custom_field.insert(ignore_permissions=True)
+    else:
+        # Earlier versions offered providers the app never supported
+        custom_field = frappe.get_doc("Custom Field", {"dt": "User", "fieldname": "preferred_translation_provider"})
+        if custom_field.options != provider_options:
+            custom_field.options = provider_options
+            custom_field.default = None
+            custom_field.save(ignore_permissions=True)
+            frappe.db.sql(
+                """UPDATE `tabUser` SET preferred_translation_provider = NULL
+                WHERE preferred_translation_provider IN ('google_free', 'mymemory', 'libretranslate')"""
+            )
         
     if not frappe.db.exists("Custom Field", {"dt": "User", "fieldname": "auto_translate_descriptions"}):
         custom_field = frappe.get_doc({
@@ -0,0 +1,205 @@
+import hashlib
+
+import frappe
+from frappe.utils import cint
+
+from ai_translate.settings import get_config
+from ai_translate.translation_stats import adjust_translated_rows, row_totals
+
+REALTIME_EVENT = "ai_translate_auto_translation"
+JOB_TIMEOUT = 1800  # seconds
+
+# Labels of the custom_translation_language options that differ from LANGUAGE_NAMES
+SELECT_LANGUAGE_CODES = {"Chinese (Simplified)": "zh", "Chinese (Traditional)": "zh-tw"}
+
+
+def source_hash(description, target_language):
+	"""
+	Fingerprint of what a row's translation was made from. The target language is part
+	of it, so switching the invoice language makes every row stale.
+	"""
+	text = (description or "").strip()
+	if not text:
+		return None
+	return hashlib.sha1(f"{target_language}\n{text}".encode("utf-8")).hexdigest()
+
+
+def language_code(value):
+	"""
+	Language code of a custom_translation_language value ("Arabic") or of a code ("ar")
+	"""
+	if not value:
+		return "ar"
+	config = get_config()
+	if value in config.language_names:
+		return value
+	if value in SELECT_LANGUAGE_CODES:
+		return SELECT_LANGUAGE_CODES[value]
+	return next((code for code, name in config.language_names.items() if name == value), "ar")
+
+
+def language_values(value):
+	"""
+	Every custom_translation_language value meaning the same language as value (a code
+	or a label): the code itself, its labels and, for the default language, empty
+	"""
+	config = get_config()
+	known = value in config.language_names or value in SELECT_LANGUAGE_CODES or value in config.language_names.values()
+	if value and not known:
+		return (value,)
+
+	code = language_code(value)
+	values = {code, config.language_names.get(code, code)}
+	values.update(label for label, label_code in SELECT_LANGUAGE_CODES.items() if label_code == code)
+	if code == language_code(None):
+		values.add("")
+	return tuple(sorted(values))
+
+
+def _user_setting(user, fieldname):
+	if not frappe.get_meta("User").has_field(fieldname):
+		return None
+	return frappe.get_cached_value("User", user, fieldname)
+
+
+def is_enabled(user=None):
+	"""
+	Auto-translation is on for the whole site with ai_translate_auto_translate, or for
+	users who ticked Auto Translate Descriptions
+	"""
+	if cint(frappe.conf.get("ai_translate_auto_translate")):
+		return True
+	return bool(cint(_user_setting(user or frappe.session.user, "auto_translate_descriptions")))
+
+
+def get_provider(doc, user=None):
+	"""
+	The invoice's provider, else the user's preferred one, else the first configured one
+	"""
+	config = get_config()
+	for name in (doc.get("custom_ai_provider"), _user_setting(user or frappe.session.user, "preferred_translation_provider")):
+		if name and config.has_api_key(name):
+			return name
+	return next((name for name in config.provider_names if config.has_api_key(name)), None)
+
+
+def mark_changed_rows(doc):
+	"""
+	validate hook: compare every item's source hash with the one its translation was
+	made from. Rows whose translation was just set (by the translate buttons or by
+	hand) and translations from before hashes were kept are stamped as current; new
+	and changed rows lose their stale translation and are flagged for on_update.
+	"""
+	target_language = language_code(doc.get("custom_translation_language"))
+	enabled = is_enabled()
+	before = doc.get_doc_before_save()
+	previous = {row.name: row.get("custom_translated_description") for row in (before.items if before else [])}
+
+	pending = []
+	for row in doc.items:
+		current = source_hash(row.description, target_language)
+		if current is None:
+			row.custom_source_hash = None
+			continue
+		# A cleared translation is out of date whatever its hash says
+		if row.get("custom_source_hash") == current and row.get("custom_translated_description"):
+			continue
+
+		translation = row.get("custom_translated_description")
+		if translation and (not row.get("custom_source_hash") or translation != previous.get(row.name)):
+			row.custom_source_hash = current
+		elif enabled:
+			row.custom_translated_description = None
+			pending.append(row.idx)
+
+	doc.flags.ai_translate_pending = pending
+
+
+def is_out_of_date(row, target_language):
+	current = source_hash(row.description, target_language)
+	return current is not None and (current != row.custom_source_hash or not row.custom_translated_description)
+
+
+def enqueue_changed_rows(doc):
+	"""
+	on_update hook: queue the rows flagged by mark_changed_rows, after the save commits
+	"""
+	pending = set(doc.flags.ai_translate_pending or [])
+	doc.flags.ai_translate_pending = None
+	if not pending:
+		return
+
+	ai_provider = get_provider(doc)
+	if not ai_provider:
+		return
+
+	frappe.enqueue(
+		"ai_translate.auto_translate.translate_rows",
+		queue="default",
+		timeout=JOB_TIMEOUT,
+		enqueue_after_commit=True,
+		invoice=doc.name,
+		rows=[row.name for row in doc.items if row.idx in pending],
+		target_language=language_code(doc.get("custom_translation_language")),
+		ai_provider=ai_provider,
+		user=frappe.session.user,
+	)
+
+
+def translate_rows(invoice, rows, target_language, ai_provider, user=None):
+	"""
+	Translate the given Sales Invoice Item rows and store each translation with the hash
+	of the description it was made from. Rows edited or translated again since they
+	were queued are picked up by the save that changed them, so only rows still out of
+	date are sent to the provider.
+	"""
+	from ai_translate.translate import run_bulk_translation
+
+	items = [
+		row
+		for row in frappe.get_all(
+			"Sales Invoice Item",
+			filters={"parent": invoice, "parenttype": "Sales Invoice", "name": ["in", rows]},
+			fields=["name", "modified", "item_code", "description", "custom_source_hash", "custom_translated_description"],
+		)
+		if is_out_of_date(row, target_language)
+	]
+	if not items:
+		return
+
+	response = run_bulk_translation(
+		[{"item_code": row.item_code, "description": row.description} for row in items], target_language, ai_provider
+	)
+
+	# Counted under the invoice's own provider and language, as the recount does
+	invoice_provider, invoice_language = frappe.db.get_value(
+		"Sales Invoice", invoice, ["custom_ai_provider", "custom_translation_language"]
+	)
+	translated = 0
+	added = []
+	for row, result in zip(items, response["results"]):
+		if not (result and result.get("success") and result.get("translated_text")):
+			continue
+		frappe.db.set_value(
+			"Sales Invoice Item",
+			row.name,
+			{
+				"custom_translated_description": result["translated_text"],
+				"custom_source_hash": source_hash(row.description, target_language),
+			},
+			update_modified=False,
+		)
+		translated += 1
+		if not row.custom_translated_description:
+			added.append(
+				{"date": row.modified, "ai_provider": invoice_provider, "target_language": invoice_language,
+					"translated_rows": 1}
+			)
+	adjust_translated_rows(row_totals(added))
+	frappe.db.commit()
+
+	frappe.publish_realtime(
+		REALTIME_EVENT,
+		{"invoice": invoice, "translated": translated, "failed": len(items) - translated},
+		user=user or frappe.session.user,
+	)
@@ -0,0 +1,314 @@
+import json
+import logging
+import re
+import time
+
+import frappe
+
+from ai_translate import glossary, metrics, provider_health, providers
+from ai_translate.concurrency import map_in_threads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_ITEMS = 40
+
+# Targets whose scripts tokenize into noticeably more tokens than English
+HEAVY_TOKEN_LANGUAGES = ("ar", "hi", "ur", "ja", "ko", "zh", "zh-tw", "ru")
+
+# Fraction of the completion ceiling a batch may plan to use
+OUTPUT_SAFETY_MARGIN = 0.75
+PER_ITEM_OVERHEAD_TOKENS = 12
+MAX_SPLIT_DEPTH = 4
+
+BATCH_SYSTEM_PROMPT = """You are a professional translator specializing in natural, fluent business translations.
+You receive a JSON array of {{"id": number, "text": string}} objects in {source_name}.
+Translate every "text" to {target_name}:
+- Make it sound completely natural in {target_name}
+- Preserve the original meaning, tone and any codes, numbers or units
+- Use appropriate business terminology
+- Don't add explanations or notes
+
+Reply with ONLY a JSON object of the form {{"translations": [{{"id": number, "text": string}}]}}
+containing exactly one entry for each input id."""
+
+
+def estimate_tokens(text):
+	"""
+	Cheap upper-bound token estimate (about three characters per token)
+	"""
+	return len(text or "") // 3 + 1
+
+
+def get_max_batch_items():
+	return frappe.conf.get("ai_translate_max_batch_items") or DEFAULT_MAX_BATCH_ITEMS
+
+
+def get_output_budget(provider):
+	adapter = providers.get_adapter(provider)
+	if adapter is None:
+		return int(1024 * OUTPUT_SAFETY_MARGIN), 8192
+	return int(adapter.max_output * OUTPUT_SAFETY_MARGIN), adapter.context
+
+
+def estimate_output_tokens(text, target_language):
+	expansion = 3 if target_language in HEAVY_TOKEN_LANGUAGES else 2
+	return estimate_tokens(text) * expansion + PER_ITEM_OVERHEAD_TOKENS
+
+
+def plan_batches(entries, provider, target_language, max_items=None):
+	"""
+	Greedily pack (id, text) entries into batches that fit the provider's token limits
+	"""
+	max_items = max_items or get_max_batch_items()
+	output_budget, context = get_output_budget(provider)
+	input_budget = context // 2
+
+	batches = []
+	current = []
+	current_output = 0
+	current_input = 0
+
+	for entry in entries:
+		output_tokens = estimate_output_tokens(entry[1], target_language)
+		input_tokens = estimate_tokens(entry[1]) + PER_ITEM_OVERHEAD_TOKENS
+
+		if current and (
+			len(current) >= max_items
+			or current_output + output_tokens > output_budget
+			or current_input + input_tokens > input_budget
+		):
+			batches.append(current)
+			current, current_output, current_input = [], 0, 0
+
+		current.append(entry)
+		current_output += output_tokens
+		current_input += input_tokens
+
+	if current:
+		batches.append(current)
+
+	return batches
+
+
+def build_batch_prompt(entries, source_language, target_language):
+	from ai_translate.translate import get_language_names
+
+	lang_names = get_language_names()
+	system_prompt = BATCH_SYSTEM_PROMPT.format(
+		source_name=lang_names.get(source_language, "English"),
+		target_name=lang_names.get(target_language, target_language),
+	)
+
+	# Only the glossary terms that occur in this batch's texts, each once
+	terms = {}
+	for _entry_id, text in entries:
+		for term in glossary.find_terms(text, source_language, target_language):
+			terms.setdefault(term[0], term)
+	system_prompt += glossary.prompt_block(list(terms.values()))
+
+	user_prompt = json.dumps([{"id": entry_id, "text": text} for entry_id, text in entries], ensure_ascii=False)
+	return system_prompt, user_prompt
+
+
+def load_json_reply(raw):
+	"""
+	The JSON object or array in a model reply, tolerating code fences and chatter around it
+	"""
+	if not raw:
+		return None
+
+	raw = raw.strip()
+	raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw)
+
+	for start, end in (("{", "}"), ("[", "]")):
+		first, last = raw.find(start), raw.rfind(end)
+		if first == -1 or last <= first:
+			continue
+		try:
+			return json.loads(raw[first : last + 1])
+		except ValueError:
+			continue
+	return None
+
+
+def parse_batch_response(raw, expected_ids):
+	"""
+	Map id -> translation from a structured reply, dropping malformed or unknown entries
+	"""
+	data = load_json_reply(raw)
+	if isinstance(data, dict):
+		data = data.get("translations")
+	if not isinstance(data, list):
+		return {}
+
+	expected = set(expected_ids)
+	parsed = {}
+	for row in data:
+		if not isinstance(row, dict):
+			continue
+		try:
+			entry_id = int(row.get("id"))
+		except (TypeError, ValueError):
+			continue
+		text = row.get("text") if row.get("text") is not None else row.get("translation")
+		if entry_id in expected and isinstance(text, str) and text.strip():
+			parsed[entry_id] = text.strip()
+
+	return parsed
+
+
+def translate_batch(entries, target_language, source_language, provider, depth=0):
+	"""
+	Translate a list of (id, text) entries in one request.
+
+	Items missing or malformed in the reply are re-sent as a smaller batch; a batch
+	that fails outright is split in half. Returns (translations by id, request count,
+	token usage of all the requests); ids that never came back are simply absent so the
+	caller can fall back per item.
+	"""
+	if not entries:
+		return {}, 0, {}
+
+	adapter = providers.get_adapter(provider)
+	if adapter is None:
+		raise Exception(f"Unknown AI provider: {provider}")
+
+	system_prompt, user_prompt = build_batch_prompt(entries, source_language, target_language)
+	output_budget, _context = get_output_budget(provider)
+	max_tokens = min(
+		output_budget,
+		sum(estimate_output_tokens(text, target_language) for _id, text in entries) + 256,
+	)
+
+	requests_made = 1
+	usages = []
+	try:
+		raw, data = adapter.send(system_prompt, user_prompt, max_tokens, temperature=0.2, json_mode=True, timeout=60)
+		usages.append(adapter.usage(data))
+		translations = parse_batch_response(raw, [entry_id for entry_id, _text in entries])
+	except provider_health.ProviderUnavailable:
+		# Splitting cannot help while the circuit is open; leave every item to the fallback path
+		return {}, requests_made, {}
+	except Exception as e:
+		logger.warning(f"Batch of {len(entries)} failed with {provider}: {str(e)}")
+		translations = {}
+
+	missing = [entry for entry in entries if entry[0] not in translations]
+	if not missing or len(entries) == 1 or depth >= MAX_SPLIT_DEPTH:
+		return translations, requests_made, providers.merge_usage(usages)
+
+	if len(missing) == len(entries):
+		# Nothing usable came back: split and retry both halves
+		middle = len(entries) // 2
+		halves = (entries[:middle], entries[middle:])
+	else:
+		halves = (missing,)
+
+	for part in halves:
+		if len(part) == 1 and len(halves) == 1:
+			# A lone malformed item is cheaper through the regular single-text path
+			break
+		retried, count, usage = translate_batch(part, target_language, source_language, provider, depth + 1)
+		translations.update(retried)
+		requests_made += count
+		usages.append(usage)
+
+	return translations, requests_made, providers.merge_usage(usages)
+
+
+def translate_items_batched(pending, target_language, source_language, provider, on_result=None):
+	"""
+	Translate (index, text) pairs through the translation memory and batched requests.
+
+	Returns (results by index in the ai_translate_text response shape, request count).
+	Indexes the batches could not translate are left out. on_result(index, result) is
+	called as soon as each item is resolved.
+	"""
+	from ai_translate import translation_memory
+	model = providers.get_model(provider)
+	results = {}
+	misses = []
+
+	for index, text in pending:
+		start_time = time.monotonic()
+		cached = translation_memory.lookup(text, source_language, target_language, provider, model)
+		if cached:
+			results[index] = make_result(
+				cached["translated_text"], source_language, target_language,
+				cached.get("ai_provider") or provider, cached.get("model") or model,
+				time.monotonic() - start_time, cache_hit=True, cache_tier=cached["tier"],
+			)
+			metrics.record_translation(
+				provider, cached.get("model") or model, source_language, target_language, "cache",
+				results[index]["processing_time"], text,
+			)
+			if on_result:
+				on_result(index, results[index])
+		else:
+			misses.append((index, text))
+
+	texts_by_index = dict(misses)
+	requests_made = 0
+
+	batches = plan_batches(misses, provider, target_language)
+
+	def collect(position, outcome):
+		nonlocal requests_made
+
+		if isinstance(outcome, Exception):
+			logger.warning(f"Batch of {len(batches[position])} failed with {provider}: {str(outcome)}")
+			return
+
+		translations, count, usage, elapsed = outcome
+		requests_made += count
+		per_item_time = elapsed / max(len(translations), 1)
+
+		for position, (index, translated_text) in enumerate(translations.items()):
+			translation_memory.store(
+				texts_by_index[index], source_language, target_language, provider, model, translated_text
+			)
+			terms = glossary.find_terms(texts_by_index[index], source_language, target_language)
+			results[index] = make_result(
+				translated_text, source_language, target_language, provider, model, per_item_time,
+				batched=True, glossary_missed=glossary.missed_terms(translated_text, terms),
+			)
+			# The batch's token usage is logged once, with its first item
+			metrics.record_translation(
+				provider, model, source_language, target_language, "batch", per_item_time, texts_by_index[index],
+				usage if position == 0 else None,
+			)
+			if on_result:
+				on_result(index, results[index])
+
+	map_in_threads(
+		lambda batch: _timed_batch(batch, target_language, source_language, provider),
+		batches,
+		provider,
+		on_result=collect,
+	)
+
+	return results, requests_made
+
+
+def _timed_batch(batch, target_language, source_language, provider):
+	start_time = time.monotonic()
+	translations, count, usage = translate_batch(batch, target_language, source_language, provider)
+	return translations, count, usage, time.monotonic() - start_time
+
+
+def make_result(translated_text, source_language, target_language, provider, model, processing_time, **extra):
+	result = {
+		"success": True,
+		"translated_text": translated_text,
+		"source_language": source_language,
+		"target_language": target_language,
+		"ai_provider": provider,
+		"model_used": model,
+		"confidence_score": 0.95,
+		"processing_time": processing_time,
+		"context_aware": True,
+		"ai_enhanced": True,
+		"cache_hit": False,
+	}
+	result.update(extra)
+	return result
@@ -0,0 +1,292 @@
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TARGET_PATTERN = re.compile(r"Target language: ([^\n]+)|(?:into|to) ([A-Z][\w ()]*?)[:,.\n]")
+
+
+@dataclass
+class ProviderProfile:
+	"""
+	How one simulated provider behaves
+	"""
+
+	latency: str = "lognormal"  # "fixed", "uniform" or "lognormal" time to first byte
+	median: float = 0.2  # seconds
+	spread: float = 0.3  # lognormal sigma, or +/- seconds for uniform
+	tokens_per_second: float = 500  # generation speed; paces streamed chunks
+	error_rate: float = 0.0  # share of requests answered with HTTP 500
+	rate_limit_rate: float = 0.0  # share of requests answered with HTTP 429
+	retry_after: float = 1.0  # seconds, sent with every 429
+	stream_chunk_chars: int = 12
+
+	def sample_latency(self, rng):
+		if self.median <= 0:
+			return 0.0
+		if self.latency == "fixed":
+			return self.median
+		if self.latency == "uniform":
+			return max(0.0, rng.uniform(self.median - self.spread, self.median + self.spread))
+		return rng.lognormvariate(math.log(self.median), self.spread)
+
+
+class SimulatedProviderServer:
+	"""
+	Local stand-in for the provider APIs. Each provider gets its own path prefix and
+	profile; /<provider>/v1/chat/completions speaks the OpenAI-compatible format and
+	/<provider>/v1/messages the Anthropic one, both with optional streaming. Replies are
+	deterministic pseudo-translations ("[Arabic] original text"), batch requests are
+	answered in the JSON shape the batching prompt asks for, and usage is reported
+	including cache reads for system prompts the server has already seen.
+
+		with SimulatedProviderServer({"groq": ProviderProfile(median=0.1)}) as server:
+			server.endpoint("groq")
+	"""
+
+	def __init__(self, profiles=None, host="127.0.0.1", port=0, seed=42):
+		self.profiles = dict(profiles or {})
+		self.default_profile = ProviderProfile()
+		self.rng = random.Random(seed)
+		self.lock = threading.Lock()
+		self.stats = {}
+		self.seen_prefixes = set()
+
+		handler = type("Handler", (_Handler,), {"simulator": self})
+		self.httpd = ThreadingHTTPServer((host, port), handler)
+		self.httpd.daemon_threads = True
+		self.thread = None
+
+	@property
+	def url(self):
+		host, port = self.httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def endpoint(self, provider, api_format="openai"):
+		path = "v1/messages" if api_format == "anthropic" else "v1/chat/completions"
+		return f"{self.url}/{provider}/{path}"
+
+	def profile(self, provider):
+		return self.profiles.get(provider) or self.default_profile
+
+	def start(self):
+		self.thread = threading.Thread(target=self.httpd.serve_forever, name="simulated-provider", daemon=True)
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.httpd.shutdown()
+		self.httpd.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc_info):
+		self.stop()
+
+	def draw(self, provider):
+		"""
+		(latency, outcome) of the next request, drawn under the lock so runs with the
+		same seed and request order are reproducible
+		"""
+		profile = self.profile(provider)
+		with self.lock:
+			latency = profile.sample_latency(self.rng)
+			roll = self.rng.random()
+		if roll < profile.rate_limit_rate:
+			return latency, 429
+		if roll < profile.rate_limit_rate + profile.error_rate:
+			return latency, 500
+		return latency, 200
+
+	def cached_prefix(self, provider, system_prompt):
+		"""
+		Whether the system prompt was sent before, as a provider's prefix cache would see it
+		"""
+		key = (provider, system_prompt)
+		with self.lock:
+			seen = key in self.seen_prefixes
+			self.seen_prefixes.add(key)
+		return seen
+
+	def record(self, provider, status, prompt_tokens=0, completion_tokens=0, cached_tokens=0):
+		with self.lock:
+			stats = self.stats.setdefault(
+				provider,
+				{"requests": 0, "statuses": {}, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0},
+			)
+			stats["requests"] += 1
+			stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+			stats["prompt_tokens"] += prompt_tokens
+			stats["completion_tokens"] += completion_tokens
+			stats["cached_tokens"] += cached_tokens
+
+	def snapshot(self):
+		with self.lock:
+			return json.loads(json.dumps(self.stats))
+
+
+def estimate_tokens(text):
+	return len(text or "") // 4 + 1
+
+
+def fake_translation(system_prompt, user_prompt):
+	"""
+	Deterministic stand-in reply for a translation, batch or reference prompt
+	"""
+	match = TARGET_PATTERN.search(system_prompt or "")
+	target = (match.group(1) or match.group(2)).strip() if match else "Translated"
+
+	try:
+		entries = json.loads(user_prompt)
+	except ValueError:
+		entries = None
+	if isinstance(entries, list):
+		return json.dumps(
+			{"translations": [{"id": entry.get("id"), "text": f"[{target}] {entry.get('text')}"} for entry in entries]},
+			ensure_ascii=False,
+		)
+
+	# Reference prompts end with the new source text
+	text = user_prompt.rsplit("New text:\n", 1)[-1]
+	return f"[{target}] {text}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	simulator = None
+
+	def log_message(self, format, *args):
+		pass
+
+	def do_POST(self):
+		parts = self.path.strip("/").split("/", 1)
+		provider = parts[0] if len(parts) == 2 else "default"
+		anthropic = self.path.endswith("/messages")
+
+		length = int(self.headers.get("Content-Length") or 0)
+		try:
+			payload = json.loads(self.rfile.read(length) or b"{}")
+		except ValueError:
+			return self._send_json(400, {"error": {"message": "invalid JSON"}})
+
+		profile = self.simulator.profile(provider)
+		latency, status = self.simulator.draw(provider)
+		if status == 429:
+			self.simulator.record(provider, 429)
+			return self._send_json(
+				429, {"error": {"message": "rate limited"}}, {"Retry-After": f"{profile.retry_after:g}"}
+			)
+
+		time.sleep(latency)
+		if status == 500:
+			self.simulator.record(provider, 500)
+			return self._send_json(500, {"error": {"message": "simulated upstream failure"}})
+
+		system_prompt, user_prompt = self._prompts(payload, anthropic)
+		reply = fake_translation(system_prompt, user_prompt)
+
+		cached = 0
+		cache_creation = 0
+		prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+		# Anthropic caches only blocks marked with cache_control, the others any repeated prefix
+		cacheable = not anthropic or isinstance(payload.get("system"), list)
+		if system_prompt and cacheable:
+			if self.simulator.cached_prefix(provider, system_prompt):
+				cached = estimate_tokens(system_prompt)
+			elif anthropic:
+				cache_creation = estimate_tokens(system_prompt)
+		completion_tokens = estimate_tokens(reply)
+		self.simulator.record(provider, 200, prompt_tokens, completion_tokens, cached)
+
+		generation_time = completion_tokens / max(profile.tokens_per_second, 1)
+		model = payload.get("model") or "simulated"
+		if payload.get("stream"):
+			return self._stream(reply, anthropic, model, generation_time, profile.stream_chunk_chars)
+
+		time.sleep(generation_time)
+		if anthropic:
+			body = {
+				"id": "msg_simulated",
+				"type": "message",
+				"role": "assistant",
+				"model": model,
+				"content": [{"type": "text", "text": reply}],
+				"stop_reason": "end_turn",
+				"usage": {
+					"input_tokens": prompt_tokens - cached - cache_creation,
+					"output_tokens": completion_tokens,
+					"cache_read_input_tokens": cached,
+					"cache_creation_input_tokens": cache_creation,
+				},
+			}
+		else:
+			body = {
+				"id": "chatcmpl-simulated",
+				"object": "chat.completion",
+				"model": model,
+				"choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+				"usage": {
+					"prompt_tokens": prompt_tokens,
+					"completion_tokens": completion_tokens,
+					"total_tokens": prompt_tokens + completion_tokens,
+					"prompt_tokens_details": {"cached_tokens": cached},
+				},
+			}
+		self._send_json(200, body)
+
+	def _prompts(self, payload, anthropic):
+		messages = payload.get("messages") or []
+		user_prompt = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+		if anthropic:
+			system = payload.get("system") or ""
+			if isinstance(system, list):
+				system = "".join(block.get("text", "") for block in system)
+			return system, user_prompt
+		system = next((m.get("content") for m in messages if m.get("role") == "system"), "") or ""
+		return system, user_prompt
+
+	def _send_json(self, status, body, headers=None):
+		data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		for name, value in (headers or {}).items():
+			self.send_header(name, value)
+		self.end_headers()
+		self.wfile.write(data)
+
+	def _stream(self, reply, anthropic, model, generation_time, chunk_chars):
+		self.send_response(200)
+		self.send_header("Content-Type", "text/event-stream")
+		self.send_header("Transfer-Encoding", "chunked")
+		self.end_headers()
+
+		pieces = [reply[i : i + chunk_chars] for i in range(0, len(reply), chunk_chars)] or [""]
+		pause = generation_time / len(pieces)
+
+		if anthropic:
+			self._event({"type": "message_start", "message": {"model": model}})
+		for piece in pieces:
+			time.sleep(pause)
+			if anthropic:
+				self._event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}})
+			else:
+				self._event({"choices": [{"index": 0, "delta": {"content": piece}}]})
+
+		if anthropic:
+			self._event({"type": "message_stop"})
+		else:
+			self._chunk(b"data: [DONE]\n\n")
+		self._chunk(b"")
+
+	def _event(self, event):
+		self._chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+	def _chunk(self, data):
+		self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+		self.wfile.flush()
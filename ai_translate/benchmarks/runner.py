@@ -0,0 +1,330 @@
+"""
+Offline benchmarks of the translation paths against a simulated provider.
+
+	bench --site dev.localhost execute ai_translate.benchmarks.runner.run
+	bench --site dev.localhost execute ai_translate.benchmarks.runner.run \\
+		--kwargs "{'items': 200, 'save': '/tmp/bench.json'}"
+	bench --site dev.localhost execute ai_translate.benchmarks.runner.run \\
+		--kwargs "{'baseline': '/tmp/bench.json'}"
+
+Run it on a development site: translations are written to its translation memory.
+"""
+
+import json
+import random
+import time
+import timeit
+from contextlib import contextmanager
+
+import frappe
+
+from ai_translate import glossary, provider_health, segmentation, sessions, streaming
+from ai_translate.benchmarks.provider_server import ProviderProfile, SimulatedProviderServer
+from ai_translate.benchmarks.transport import CountingTransport, RecordReplayTransport
+from ai_translate.settings import invalidate_config
+
+SCENARIOS = ("single", "bulk", "cached", "fallback", "stream")
+
+# (provider, api format) served by the simulated server
+SIMULATED_PROVIDERS = (("groq", "openai"), ("deepseek", "openai"), ("claude", "anthropic"))
+
+WORDS = (
+	"premium", "steel", "bracket", "assembly", "warranty", "annual", "maintenance", "service", "cotton",
+	"shirt", "industrial", "pump", "replacement", "filter", "delivery", "installation", "kit", "stainless",
+	"valve", "copper", "cable", "heavy", "duty", "office", "chair", "ergonomic", "spare", "parts", "license",
+	"software", "subscription", "consulting", "hours", "training", "session", "packaging", "box", "pallet",
+)
+
+MICRO_SAMPLES = (
+	'Translation: "مضخة صناعية مع مجموعة فلاتر بديلة"',
+	"Here is the translation:\n\nسلك نحاسي للخدمة الشاقة\n\nNote: technical terms were kept.",
+	"**Traducción:** Silla de oficina ergonómica con garantía anual",
+	"短い説明",
+)
+
+# A drop below (throughput) or rise above (everything else) the baseline by more than
+# the tolerance counts as a regression
+HIGHER_IS_BETTER = ("items_per_sec",)
+COMPARED = ("items_per_sec", "p95", "upstream_calls_per_item", "tokens_per_item")
+
+
+def make_texts(count, run_id, prefix):
+	rng = random.Random(f"{run_id}:{prefix}")
+	return [f"{prefix} {run_id}-{index}: " + " ".join(rng.choices(WORDS, k=rng.randint(6, 18))) for index in range(count)]
+
+
+def percentile(values, q):
+	if not values:
+		return None
+	ordered = sorted(values)
+	return round(ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))], 4)
+
+
+@contextmanager
+def benchmark_site(server, overrides=None):
+	"""
+	Point the built-in providers at the simulated server (or at its recorded URLs) for
+	the duration of the block, with logging, hedging and fuzzy matching off so every
+	run does the same work
+	"""
+	conf = {
+		"ai_translate_providers": {
+			name: {"endpoint": server.endpoint(name, api_format), "model": f"simulated-{name}"}
+			for name, api_format in SIMULATED_PROVIDERS
+		},
+		"ai_translate_translation_log": 0,
+		"ai_translate_fuzzy_enabled": 0,
+		"ai_translate_hedge": 0,
+		"ai_translate_http_retries": 0,
+		**{f"{name}_api_key": "simulated-key" for name, _api_format in SIMULATED_PROVIDERS},
+		**(overrides or {}),
+	}
+	previous = {key: frappe.conf.get(key) for key in conf}
+	frappe.conf.update(conf)
+	invalidate_config(frappe.local.site)
+	sessions.close_sessions()
+	try:
+		yield
+	finally:
+		for key, value in previous.items():
+			if value is None:
+				frappe.conf.pop(key, None)
+			else:
+				frappe.conf[key] = value
+		invalidate_config(frappe.local.site)
+		sessions.close_sessions()
+		reset_health()
+
+
+def reset_health():
+	provider_health.reset_provider_health()
+
+
+def measure(counter, items, fn):
+	"""
+	Run fn() and return the scenario report; fn returns (per-item latencies, failures)
+	"""
+	reset_health()
+	counter.reset()
+	start = time.monotonic()
+	latencies, failures = fn()
+	wall = time.monotonic() - start
+
+	return {
+		"items": items,
+		"failures": failures,
+		"wall_time": round(wall, 3),
+		"items_per_sec": round(items / wall, 2) if wall else None,
+		"p50": percentile(latencies, 0.50),
+		"p95": percentile(latencies, 0.95),
+		"p99": percentile(latencies, 0.99),
+		"upstream_calls_per_item": round(counter.calls / items, 3) if items else None,
+		"tokens_per_item": round(counter.tokens / items, 1) if items else None,
+	}
+
+
+def translate_each(texts, provider, use_cache):
+	from ai_translate.translate import ai_translate_text
+
+	latencies = []
+	failures = 0
+	for text in texts:
+		start = time.monotonic()
+		result = ai_translate_text(text, "ar", "en", provider, use_cache=use_cache, hedge=0)
+		latencies.append(time.monotonic() - start)
+		failures += 0 if result.get("success") else 1
+	return latencies, failures
+
+
+def scenario_single(counter, server, items, run_id):
+	texts = make_texts(items, run_id, "single")
+	return measure(counter, items, lambda: translate_each(texts, "groq", 0))
+
+
+def scenario_bulk(counter, server, items, run_id):
+	from ai_translate.translate import run_bulk_translation
+
+	texts = make_texts(items, run_id, "bulk")
+	items_data = [{"item_code": f"BENCH-{index}", "description": text} for index, text in enumerate(texts)]
+
+	def run():
+		response = run_bulk_translation(items_data, "ar", "groq", batch_mode=1)
+		results = response["results"]
+		return [result.get("processing_time", 0) for result in results], sum(
+			1 for result in results if not result.get("success")
+		)
+
+	return measure(counter, items, run)
+
+
+def scenario_cached(counter, server, items, run_id):
+	texts = make_texts(items, run_id, "cached")
+	translate_each(texts, "groq", 1)
+	return measure(counter, items, lambda: translate_each(texts, "groq", 1))
+
+
+def scenario_fallback(counter, server, items, run_id):
+	texts = make_texts(items, run_id, "fallback")
+	if server is None:
+		return measure(counter, items, lambda: translate_each(texts, "groq", 0))
+
+	healthy = server.profiles.get("groq")
+	server.profiles["groq"] = ProviderProfile(median=0.01, error_rate=1.0)
+	try:
+		return measure(counter, items, lambda: translate_each(texts, "groq", 0))
+	finally:
+		if healthy is None:
+			server.profiles.pop("groq", None)
+		else:
+			server.profiles["groq"] = healthy
+
+
+def scenario_stream(counter, server, items, run_id):
+	"""
+	Latencies are times to the first streamed piece; claude exercises the Anthropic format
+	"""
+	from ai_translate.providers import get_adapter
+
+	texts = make_texts(items, run_id, "stream")
+
+	def run():
+		adapter = get_adapter("claude")
+		first_piece = []
+		failures = 0
+		for text in texts:
+			system_prompt, user_prompt = adapter.translation_prompts(text, "ar", "en")
+			start = time.monotonic()
+			try:
+				for _piece in streaming.stream_chat_completion("claude", system_prompt, user_prompt):
+					first_piece.append(time.monotonic() - start)
+					break
+			except Exception:
+				failures += 1
+		return first_piece, failures
+
+	return measure(counter, items, run)
+
+
+def run_micro(repeat=2000):
+	"""
+	Microseconds per call of the pure-Python hot spots
+	"""
+	from ai_translate.translate import clean_partial_translation, clean_translation_response
+
+	long_text = "\n\n".join(make_texts(40, "micro", "paragraph"))
+	descriptions = make_texts(20, "micro", "description")
+	# A glossary of 5000 terms, a few of them occurring in every description
+	matcher = glossary.Matcher(
+		[(f"{word} {index}", f"term {index}", 0, "") for index, word in enumerate(WORDS * 130)]
+		+ [(word, word.upper(), 0, "") for word in WORDS[:10]]
+	)
+	cases = {
+		"clean_translation_response": lambda: [clean_translation_response(sample) for sample in MICRO_SAMPLES],
+		"clean_partial_translation": lambda: [clean_partial_translation(sample) for sample in MICRO_SAMPLES],
+		"split_text": lambda: segmentation.split_text(long_text, 500),
+		"glossary_match": lambda: [matcher.find(description) for description in descriptions],
+	}
+	report = {}
+	for name, fn in cases.items():
+		best = min(timeit.repeat(fn, number=repeat, repeat=3))
+		report[name] = {"us_per_call": round(best / repeat * 1e6, 2)}
+	return report
+
+
+def compare(report, baseline, tolerance=0.25):
+	"""
+	Regressions of report against a baseline report, as readable messages
+	"""
+	regressions = []
+	for name, current in report.get("scenarios", {}).items():
+		previous = baseline.get("scenarios", {}).get(name) or {}
+		for metric in COMPARED:
+			old, new = previous.get(metric), current.get(metric)
+			if not old or new is None:
+				continue
+			if metric in HIGHER_IS_BETTER and new < old * (1 - tolerance):
+				regressions.append(f"{name}.{metric} fell from {old} to {new}")
+			elif metric not in HIGHER_IS_BETTER and new > old * (1 + tolerance):
+				regressions.append(f"{name}.{metric} rose from {old} to {new}")
+
+	for name, current in report.get("micro", {}).items():
+		old = (baseline.get("micro", {}).get(name) or {}).get("us_per_call")
+		if old and current["us_per_call"] > old * (1 + tolerance):
+			regressions.append(f"micro.{name} rose from {old}us to {current['us_per_call']}us")
+	return regressions
+
+
+def format_report(report):
+	lines = [
+		f"{'scenario':<10} {'items/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'calls/item':>11} {'tokens/item':>12} {'failed':>7}"
+	]
+	for name, row in report["scenarios"].items():
+		lines.append(
+			f"{name:<10} {row['items_per_sec'] or 0:>9} {row['p50'] or 0:>8} {row['p95'] or 0:>8} "
+			f"{row['p99'] or 0:>8} {row['upstream_calls_per_item'] or 0:>11} {row['tokens_per_item'] or 0:>12} "
+			f"{row['failures']:>7}"
+		)
+	for name, row in report.get("micro", {}).items():
+		lines.append(f"{name:<30} {row['us_per_call']:>10} us/call")
+	return "\n".join(lines)
+
+
+def run(items=50, scenarios=None, profile=None, cassette=None, record=0, replay_latency=0, baseline=None,
+		save=None, tolerance=0.25, seed=42, micro=1):
+	"""
+	Run the benchmark scenarios and print the report.
+
+	profile: ProviderProfile fields for every simulated provider, e.g. {"median": 0.05}
+	cassette: JSONL recording; with record set the run against the simulated server is
+	recorded to it, otherwise it is replayed from it without a server
+	baseline: report saved by an earlier run; regressions beyond tolerance raise
+	"""
+	scenarios = scenarios or SCENARIOS
+	if isinstance(scenarios, str):
+		scenarios = [name.strip() for name in scenarios.split(",")]
+
+	replay = cassette and not int(record)
+	# Texts are unique per run so earlier runs' translation memory is never hit, except
+	# with a cassette, where they must match the recording
+	run_id = seed if cassette else frappe.generate_hash(length=6)
+	server = None
+	if not replay:
+		server = SimulatedProviderServer(
+			{name: ProviderProfile(**(profile or {})) for name, _api_format in SIMULATED_PROVIDERS}, seed=seed
+		).start()
+
+	transport = None
+	if cassette:
+		transport = RecordReplayTransport(cassette, "replay" if replay else "record", bool(int(replay_latency)))
+	counter = CountingTransport(transport)
+
+	# Recordings keep the URLs of the server they were made against; only the path is matched
+	endpoints = server or SimulatedProviderServer(seed=seed)
+	report = {"items": items, "scenarios": {}}
+	try:
+		with benchmark_site(endpoints), sessions.use_transport(counter):
+			for name in scenarios:
+				report["scenarios"][name] = globals()[f"scenario_{name}"](counter, server, int(items), run_id)
+	finally:
+		if server:
+			server.stop()
+		else:
+			endpoints.httpd.server_close()
+
+	if transport and not replay:
+		transport.save()
+	if int(micro):
+		report["micro"] = run_micro()
+
+	print(format_report(report))
+	if save:
+		with open(save, "w") as f:
+			json.dump(report, f, indent=1)
+
+	if baseline:
+		with open(baseline) as f:
+			regressions = compare(report, json.load(f), float(tolerance))
+		if regressions:
+			raise AssertionError("Performance regressions:\n" + "\n".join(regressions))
+
+	return report
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from ai_translate import sessions
+
+
+class ReplayResponse:
+	"""
+	The parts of requests.Response the provider code uses, built from a recording
+	"""
+
+	def __init__(self, status_code, headers, body):
+		self.status_code = status_code
+		self.headers = CaseInsensitiveDict(headers or {})
+		self.text = body
+		self.content = body.encode("utf-8")
+
+	def json(self):
+		return json.loads(self.text)
+
+	def iter_lines(self):
+		return iter(self.text.splitlines())
+
+	def close(self):
+		pass
+
+
+def request_key(url, payload):
+	"""
+	Recording key of a request: path and payload, not the host, so recordings made
+	against a simulated server on a random port replay anywhere
+	"""
+	canonical = json.dumps({"path": urlparse(url).path, "payload": payload}, sort_keys=True, ensure_ascii=False)
+	return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class RecordReplayTransport:
+	"""
+	Transport for sessions.use_transport. In "record" mode requests go out through the
+	pooled session and every response is kept; save() writes them to a JSONL cassette.
+	In "replay" mode responses come from the cassette only, served in recorded order
+	for repeated identical requests, and an unknown request raises. replay_latency
+	sleeps for the recorded response time to keep throughput numbers realistic.
+	"""
+
+	def __init__(self, path, mode="replay", replay_latency=False):
+		if mode not in ("record", "replay"):
+			raise ValueError(f"Unknown transport mode {mode}")
+		self.path = path
+		self.mode = mode
+		self.replay_latency = replay_latency
+		self.lock = threading.Lock()
+		self.recordings = {}
+		self.positions = {}
+		if mode == "replay":
+			self.load()
+
+	def load(self):
+		with open(self.path, encoding="utf-8") as cassette:
+			for line in cassette:
+				if line.strip():
+					entry = json.loads(line)
+					self.recordings.setdefault(entry["key"], []).append(entry)
+
+	def save(self):
+		with self.lock, open(self.path, "w", encoding="utf-8") as cassette:
+			for entries in self.recordings.values():
+				for entry in entries:
+					cassette.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+	def __call__(self, session, url, headers, payload, timeout, stream):
+		key = request_key(url, payload)
+		if self.mode == "replay":
+			return self._replay(key)
+
+		start = time.monotonic()
+		response = sessions._send(session, url, headers, payload, timeout, stream)
+		# Streams are read to the end too; the replay serves them line by line
+		raw = response.content if isinstance(response, requests.Response) else response.read()
+		body = raw.decode("utf-8", "replace")
+		response.close()
+		entry = {
+			"key": key,
+			"status": response.status_code,
+			"headers": dict(response.headers),
+			"body": body,
+			"elapsed": round(time.monotonic() - start, 4),
+		}
+		with self.lock:
+			self.recordings.setdefault(key, []).append(entry)
+		return ReplayResponse(entry["status"], entry["headers"], body)
+
+	def _replay(self, key):
+		with self.lock:
+			entries = self.recordings.get(key)
+			if not entries:
+				raise KeyError(f"No recorded response for request {key}")
+			position = self.positions.get(key, 0)
+			self.positions[key] = position + 1
+			entry = entries[position % len(entries)]
+
+		if self.replay_latency:
+			time.sleep(entry["elapsed"])
+		return ReplayResponse(entry["status"], entry["headers"], entry["body"])
+
+
+class CountingTransport:
+	"""
+	Wraps another transport (the network by default) and counts upstream calls and the
+	tokens the non-streamed responses report
+	"""
+
+	def __init__(self, inner=None):
+		self.inner = inner or sessions._send
+		self.lock = threading.Lock()
+		self.calls = 0
+		self.tokens = 0
+
+	def reset(self):
+		with self.lock:
+			self.calls = 0
+			self.tokens = 0
+
+	def __call__(self, session, url, headers, payload, timeout, stream):
+		response = self.inner(session, url, headers, payload, timeout, stream)
+		tokens = 0
+		if not stream and response.status_code == 200:
+			try:
+				usage = response.json().get("usage") or {}
+			except ValueError:
+				usage = {}
+			tokens = (
+				(usage.get("prompt_tokens") or 0)
+				+ (usage.get("completion_tokens") or 0)
+				+ (usage.get("input_tokens") or 0)
+				+ (usage.get("output_tokens") or 0)
+				+ (usage.get("cache_read_input_tokens") or 0)
+				+ (usage.get("cache_creation_input_tokens") or 0)
+			)
+		with self.lock:
+			self.calls += 1
+			self.tokens += tokens
+		return response
@@ -0,0 +1,211 @@
+import json
+import logging
+import time
+
+import frappe
+from frappe.utils import cint, flt, get_datetime
+
+from ai_translate.auto_translate import language_values
+from ai_translate.translation_stats import adjust_translated_rows, row_totals
+
+logger = logging.getLogger(__name__)
+
+REALTIME_EVENT = "ai_translate_clear_progress"
+STATUS_PREFIX = "ai_translate:clear_job:"
+STATUS_TTL = 24 * 3600  # seconds
+JOB_TIMEOUT = 3 * 3600  # seconds
+
+DEFAULT_CHUNK_SIZE = 1000  # rows updated per transaction
+MAX_CHUNK_SIZE = 10000
+DEFAULT_THROTTLE = 0.1  # seconds to pause between chunks
+
+
+def get_filters(from_date=None, to_date=None, target_language=None, ai_provider=None, invoices=None):
+	if isinstance(invoices, str):
+		invoices = json.loads(invoices) if invoices.strip().startswith("[") else [invoices]
+	return {
+		"from_date": from_date,
+		"to_date": to_date,
+		"target_language": target_language,
+		"ai_provider": ai_provider,
+		"invoices": list(invoices or []),
+	}
+
+
+def iter_chunks(filters, chunk_size=DEFAULT_CHUNK_SIZE):
+	"""
+	Yield lists of Sales Invoice Item names that still hold a translation, walking the
+	primary key in ascending ranges so every chunk is an index range scan
+	"""
+	conditions = ["sii.custom_translated_description IS NOT NULL"]
+	values = {}
+	join = ""
+
+	if filters.get("from_date"):
+		conditions.append("sii.modified >= %(from_date)s")
+		values["from_date"] = get_datetime(filters["from_date"])
+	if filters.get("to_date"):
+		conditions.append("sii.modified < %(to_date)s")
+		values["to_date"] = get_datetime(filters["to_date"])
+	if filters.get("invoices"):
+		conditions.append("sii.parent IN %(invoices)s")
+		values["invoices"] = tuple(filters["invoices"])
+	if filters.get("target_language") or filters.get("ai_provider"):
+		join = "JOIN `tabSales Invoice` si ON sii.parent = si.name"
+		if filters.get("target_language"):
+			# Invoices store labels ("Arabic"), callers may pass codes ("ar")
+			conditions.append("IFNULL(si.custom_translation_language, '') IN %(target_language)s")
+			values["target_language"] = language_values(filters["target_language"])
+		if filters.get("ai_provider"):
+			conditions.append("si.custom_ai_provider = %(ai_provider)s")
+			values["ai_provider"] = filters["ai_provider"]
+
+	values["after"] = ""
+	while True:
+		names = frappe.db.sql_list(
+			f"""
+			SELECT sii.name
+			FROM `tabSales Invoice Item` sii {join}
+			WHERE sii.name > %(after)s AND {" AND ".join(conditions)}
+			ORDER BY sii.name
+			LIMIT {cint(chunk_size)}
+			""",
+			values,
+		)
+		if not names:
+			return
+		yield names
+		if len(names) < chunk_size:
+			return
+		values["after"] = names[-1]
+
+
+def clear_translations(filters, chunk_size=None, throttle=None, on_progress=None):
+	"""
+	Clear custom_translated_description and its source hash on every matching row, so
+	auto-translation treats the rows as new, one chunk per transaction with a pause in
+	between, so invoice posting is never blocked for long. The translated row counters
+	drop in the same transaction.
+	Returns the number of rows cleared.
+	"""
+	chunk_size = min(cint(chunk_size) or DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE)
+	throttle = DEFAULT_THROTTLE if throttle is None else flt(throttle)
+	cleared = 0
+
+	for names in iter_chunks(filters, chunk_size):
+		counts = frappe.db.sql(
+			"""
+			SELECT DATE(sii.modified) AS date, si.custom_ai_provider AS ai_provider,
+				si.custom_translation_language AS target_language, -COUNT(*) AS translated_rows
+			FROM `tabSales Invoice Item` sii
+			INNER JOIN `tabSales Invoice` si ON si.name = sii.parent
+			WHERE sii.name IN %(names)s AND sii.custom_translated_description != ''
+			GROUP BY DATE(sii.modified), si.custom_ai_provider, si.custom_translation_language
+			""",
+			{"names": tuple(names)},
+			as_dict=True,
+		)
+		frappe.db.sql(
+			"""
+			UPDATE `tabSales Invoice Item`
+			SET custom_translated_description = NULL, custom_source_hash = NULL
+			WHERE name IN %(names)s
+			""",
+			{"names": tuple(names)},
+		)
+		adjust_translated_rows(row_totals(counts))
+		frappe.db.commit()
+		cleared += len(names)
+		if on_progress:
+			on_progress(cleared)
+		if throttle:
+			time.sleep(throttle)
+
+	return cleared
+
+
+@frappe.whitelist()
+def clear_all_translations(from_date=None, to_date=None, target_language=None, ai_provider=None, invoices=None,
+		background=1, chunk_size=None, throttle=None):
+	"""
+	Clear stored translations, optionally limited to a modified date range, a target
+	language, a provider or a list of invoices.
+
+	With background set (the default) the clearing runs as a job: its id is returned
+	at once and progress is pushed on the ``ai_translate_clear_progress`` realtime event.
+	"""
+	frappe.only_for("System Manager")
+
+	filters = get_filters(from_date, to_date, target_language, ai_provider, invoices)
+	if not cint(background):
+		cleared = clear_translations(filters, chunk_size, throttle)
+		return {"success": True, "cleared": cleared, "message": f"{cleared} translations cleared"}
+
+	job_id = frappe.generate_hash(length=16)
+	_set_meta(
+		job_id,
+		{
+			"job_id": job_id,
+			"status": "queued",
+			"user": frappe.session.user,
+			"filters": filters,
+			"cleared": 0,
+			"error": None,
+		},
+	)
+	frappe.enqueue(
+		"ai_translate.clearing.run_clear_job",
+		queue="long",
+		timeout=JOB_TIMEOUT,
+		job_id=f"ai_translate_clear::{job_id}",
+		clear_job_id=job_id,
+		filters=filters,
+		chunk_size=chunk_size,
+		throttle=throttle,
+	)
+	return {"success": True, "job_id": job_id, "status": "queued"}
+
+
+def run_clear_job(clear_job_id, filters, chunk_size=None, throttle=None):
+	meta = _get_meta(clear_job_id) or {}
+	user = meta.get("user") or frappe.session.user
+
+	meta.update(status="running")
+	_set_meta(clear_job_id, meta)
+
+	def on_progress(cleared):
+		meta.update(cleared=cleared)
+		_set_meta(clear_job_id, meta)
+		_publish(user, {"job_id": clear_job_id, "status": "running", "cleared": cleared})
+
+	try:
+		cleared = clear_translations(filters, chunk_size, throttle, on_progress)
+		meta.update(status="finished", cleared=cleared)
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(title="Clearing Translations Failed")
+		meta.update(status="failed", error=str(e))
+
+	_set_meta(clear_job_id, meta)
+	_publish(
+		user,
+		{"job_id": clear_job_id, "status": meta["status"], "cleared": meta.get("cleared"), "error": meta.get("error")},
+	)
+
+
+@frappe.whitelist()
+def get_clear_status(job_id):
+	frappe.only_for("System Manager")
+	return _get_meta(job_id) or {"job_id": job_id, "status": "not_found"}
+
+
+def _get_meta(job_id):
+	return frappe.cache().get_value(STATUS_PREFIX + job_id)
+
+
+def _set_meta(job_id, meta):
+	frappe.cache().set_value(STATUS_PREFIX + job_id, meta, expires_in_sec=STATUS_TTL)
+
+
+def _publish(user, message):
+	frappe.publish_realtime(REALTIME_EVENT, message, user=user)
@@ -0,0 +1,274 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+logger = logging.getLogger(__name__)
+
+# Maximum in-flight requests per provider and process, overridable with
+# "ai_translate_max_concurrency": {"groq": 8, ...} in site_config.json
+DEFAULT_PROVIDER_CONCURRENCY = {
+	"groq": 8,
+	"openai": 8,
+	"claude": 4,
+	"deepseek": 4,
+	"perplexity": 2,
+}
+FALLBACK_CONCURRENCY = 4
+
+# Seconds a persistent worker waits for work before releasing its site context
+WORKER_IDLE_TIMEOUT = 300
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+# Set in map_in_threads' worker threads, which already hold a site context
+_worker = threading.local()
+
+_site_workers = {}
+_site_workers_lock = threading.Lock()
+
+
+def get_provider_concurrency(provider):
+	limits = frappe.conf.get("ai_translate_max_concurrency")
+	if isinstance(limits, dict) and limits.get(provider):
+		return max(cint(limits[provider]), 1)
+	if limits and not isinstance(limits, dict):
+		return max(cint(limits), 1)
+	return DEFAULT_PROVIDER_CONCURRENCY.get(provider, FALLBACK_CONCURRENCY)
+
+
+def get_provider_semaphore(provider):
+	"""
+	Process-wide semaphore shared by every request translating with this provider
+	"""
+	key = (frappe.local.site, provider)
+	semaphore = _semaphores.get(key)
+	if semaphore is None:
+		with _semaphores_lock:
+			semaphore = _semaphores.get(key)
+			if semaphore is None:
+				semaphore = threading.BoundedSemaphore(get_provider_concurrency(provider))
+				_semaphores[key] = semaphore
+	return semaphore
+
+
+@contextmanager
+def provider_slot(provider):
+	"""
+	Hold one of the provider's in-flight request slots for the duration of an HTTP call
+	"""
+	semaphore = get_provider_semaphore(provider)
+	with semaphore:
+		yield
+
+
+class SiteWorkers:
+	"""
+	Long-lived threads of one site in this process, each holding its own site context,
+	so a task submitted to them pays no frappe.init, connect or destroy. A worker is
+	started when none is idle and exits after WORKER_IDLE_TIMEOUT seconds without work.
+	"""
+
+	def __init__(self, site, sites_path):
+		self.site = site
+		self.sites_path = sites_path
+		self.tasks = queue.SimpleQueue()
+		self.idle = 0
+		self.lock = threading.Lock()
+
+	def submit(self, fn, *args, **kwargs):
+		"""
+		Run fn(*args, **kwargs) as the current user on a worker; returns a Future
+		"""
+		future = Future()
+		with self.lock:
+			start = not self.idle
+			if not start:
+				self.idle -= 1
+		self.tasks.put((future, frappe.session.user, fn, args, kwargs))
+		if start:
+			threading.Thread(target=self._run, name=f"ai_translate_site_{self.site}", daemon=True).start()
+		return future
+
+	def _run(self):
+		try:
+			frappe.init(site=self.site, sites_path=self.sites_path)
+			frappe.connect()
+		except Exception as e:
+			logger.warning(f"Could not set up a site context for a worker thread: {str(e)}")
+			# This thread was started for one task, which still needs an outcome
+			future, _user, _fn, _args, _kwargs = self.tasks.get()
+			if future.set_running_or_notify_cancel():
+				future.set_exception(e)
+			frappe.destroy()
+			return
+
+		try:
+			while True:
+				try:
+					task = self.tasks.get(timeout=WORKER_IDLE_TIMEOUT)
+				except queue.Empty:
+					with self.lock:
+						# Nobody has claimed this worker in the meantime
+						if self.idle:
+							self.idle -= 1
+							return
+					continue
+
+				if not self._execute(*task):
+					# The database connection is broken; the next submit starts a fresh worker
+					return
+				with self.lock:
+					self.idle += 1
+		finally:
+			frappe.destroy()
+
+	def _execute(self, future, user, fn, args, kwargs):
+		if not future.set_running_or_notify_cancel():
+			return True
+
+		# Values cached for the previous task's request must not leak into this one
+		frappe.local.cache = {}
+		try:
+			frappe.set_user(user)
+			result = fn(*args, **kwargs)
+			frappe.db.commit()
+		except Exception as e:
+			future.set_exception(e)
+			return _rollback()
+		future.set_result(result)
+		return True
+
+
+def get_site_workers():
+	key = frappe.local.site
+	workers = _site_workers.get(key)
+	if workers is None:
+		with _site_workers_lock:
+			workers = _site_workers.get(key)
+			if workers is None:
+				workers = _site_workers[key] = SiteWorkers(frappe.local.site, frappe.local.sites_path)
+	return workers
+
+
+def map_in_threads(fn, items, provider, max_workers=None, on_result=None):
+	"""
+	Apply fn to every item on a pool of threads sized to the provider's in-flight limit.
+
+	Each worker thread sets up its site context once and runs items until none are left,
+	committing after every item. Results are returned in input order. An exception raised
+	for an item is returned in that item's slot instead of aborting the others.
+	on_result(position, result) is called from the calling thread as each item finishes,
+	in completion order. Called from one of these workers, fn runs inline instead of on a
+	nested pool.
+	"""
+	items = list(items)
+	workers = min(max_workers or get_provider_concurrency(provider), len(items))
+
+	if workers <= 1 or getattr(_worker, "active", False):
+		results = []
+		for position, item in enumerate(items):
+			results.append(_call(fn, item))
+			if on_result:
+				on_result(position, results[-1])
+		return results
+
+	tasks = queue.SimpleQueue()
+	for position, item in enumerate(items):
+		tasks.put((position, item))
+	done = queue.SimpleQueue()
+	alive = {"workers": workers, "lock": threading.Lock()}
+
+	threads = [
+		threading.Thread(
+			target=_work,
+			args=(frappe.local.site, frappe.local.sites_path, frappe.session.user, fn, tasks, done, alive),
+			name=f"ai_translate_{provider}_{number}",
+			daemon=True,
+		)
+		for number in range(workers)
+	]
+	for thread in threads:
+		thread.start()
+
+	results = [None] * len(items)
+	for _finished in range(len(items)):
+		position, result = done.get()
+		results[position] = result
+		if on_result:
+			on_result(position, result)
+
+	for thread in threads:
+		thread.join()
+	return results
+
+
+def _work(site, sites_path, user, fn, tasks, done, alive):
+	"""
+	Worker thread of map_in_threads: one Frappe context for all the items it takes
+	"""
+	try:
+		frappe.init(site=site, sites_path=sites_path)
+		frappe.connect()
+		frappe.set_user(user)
+	except Exception as e:
+		logger.warning(f"Could not set up a site context for a worker thread: {str(e)}")
+		with alive["lock"]:
+			alive["workers"] -= 1
+			last = not alive["workers"]
+		# The other workers take the items; without any, they still need a result or
+		# the caller would wait for them forever
+		if last:
+			_drain(tasks, done, e)
+		frappe.destroy()
+		return
+
+	_worker.active = True
+	try:
+		while True:
+			try:
+				position, item = tasks.get_nowait()
+			except queue.Empty:
+				break
+			try:
+				result = fn(item)
+				frappe.db.commit()
+			except Exception as e:
+				result = e
+				_rollback()
+			done.put((position, result))
+	finally:
+		_worker.active = False
+		with alive["lock"]:
+			alive["workers"] -= 1
+		frappe.destroy()
+
+
+def _rollback():
+	try:
+		frappe.db.rollback()
+		return True
+	except Exception as e:
+		logger.warning(f"Rollback in a worker thread failed: {str(e)}")
+		return False
+
+
+def _drain(tasks, done, error):
+	while True:
+		try:
+			position, _item = tasks.get_nowait()
+		except queue.Empty:
+			return
+		done.put((position, error))
+
+
+def _call(fn, item):
+	try:
+		return fn(item)
+	except Exception as e:
+		return e
@@ -0,0 +1,327 @@
+import csv
+import json
+import logging
+import os
+
+import frappe
+from frappe.utils import cint, get_datetime, now_datetime
+
+from ai_translate.auto_translate import language_values
+
+logger = logging.getLogger(__name__)
+
+REALTIME_EVENT = "ai_translate_export_progress"
+STATUS_PREFIX = "ai_translate:export_job:"
+STATUS_TTL = 24 * 3600  # seconds
+JOB_TIMEOUT = 3 * 3600  # seconds
+PAGE_SIZE = 2000  # rows fetched per keyset page
+WATERMARK_PREFIX = "ai_translate_export_watermark"
+
+FORMATS = ("jsonl", "csv", "parquet")
+COLUMNS = (
+	"row_name",
+	"invoice_name",
+	"item_code",
+	"original_text",
+	"translated_text",
+	"target_language",
+	"ai_provider",
+	"modified",
+)
+
+
+def iter_translation_pages(filters=None, after=None, page_size=PAGE_SIZE):
+	"""
+	Yield pages of translated Sales Invoice Item rows in (modified, name) order, each
+	page starting right after the last row of the previous one, so the cost of a page
+	does not grow with how far the export has got. after is a (modified, name) pair
+	to resume from.
+	"""
+	filters = filters or {}
+	conditions = [
+		"sii.custom_translated_description IS NOT NULL",
+		"sii.custom_translated_description != ''",
+	]
+	values = {}
+
+	if filters.get("from_date"):
+		conditions.append("sii.modified >= %(from_date)s")
+		values["from_date"] = get_datetime(filters["from_date"])
+	if filters.get("to_date"):
+		conditions.append("sii.modified < %(to_date)s")
+		values["to_date"] = get_datetime(filters["to_date"])
+	if filters.get("target_language"):
+		# Invoices store labels ("Arabic"), callers may pass codes ("ar")
+		conditions.append("IFNULL(si.custom_translation_language, '') IN %(target_language)s")
+		values["target_language"] = language_values(filters["target_language"])
+	if filters.get("ai_provider"):
+		conditions.append("si.custom_ai_provider = %(ai_provider)s")
+		values["ai_provider"] = filters["ai_provider"]
+
+	while True:
+		page_conditions = list(conditions)
+		if after:
+			page_conditions.append(
+				"(sii.modified > %(after_modified)s OR (sii.modified = %(after_modified)s AND sii.name > %(after_name)s))"
+			)
+			values["after_modified"], values["after_name"] = after
+
+		rows = frappe.db.sql(
+			f"""
+			SELECT
+				sii.name as row_name,
+				sii.parent as invoice_name,
+				sii.item_code,
+				sii.description as original_text,
+				sii.custom_translated_description as translated_text,
+				si.custom_translation_language as target_language,
+				si.custom_ai_provider as ai_provider,
+				sii.modified
+			FROM `tabSales Invoice Item` sii
+			JOIN `tabSales Invoice` si ON sii.parent = si.name
+			WHERE {" AND ".join(page_conditions)}
+			ORDER BY sii.modified, sii.name
+			LIMIT {cint(page_size)}
+			""",
+			values,
+			as_dict=True,
+		)
+		if not rows:
+			return
+
+		yield rows
+		if len(rows) < page_size:
+			return
+		after = (rows[-1].modified, rows[-1].row_name)
+
+
+class JsonlWriter:
+	extension = "jsonl"
+
+	def __init__(self, path):
+		self.file = open(path, "w", encoding="utf-8")
+
+	def write(self, rows):
+		for row in rows:
+			self.file.write(json.dumps({column: row.get(column) for column in COLUMNS}, default=str, ensure_ascii=False))
+			self.file.write("\n")
+
+	def close(self):
+		self.file.close()
+
+
+class CsvWriter:
+	extension = "csv"
+
+	def __init__(self, path):
+		self.file = open(path, "w", encoding="utf-8", newline="")
+		self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS, extrasaction="ignore")
+		self.writer.writeheader()
+
+	def write(self, rows):
+		self.writer.writerows(rows)
+
+	def close(self):
+		self.file.close()
+
+
+class ParquetWriter:
+	"""
+	One row group per page; needs `pip install pyarrow`
+	"""
+
+	extension = "parquet"
+
+	def __init__(self, path):
+		try:
+			import pyarrow
+			import pyarrow.parquet
+		except ImportError:
+			frappe.throw("Parquet export needs the pyarrow package (pip install pyarrow)")
+
+		self.pyarrow = pyarrow
+		self.schema = pyarrow.schema(
+			[(column, pyarrow.timestamp("us") if column == "modified" else pyarrow.string()) for column in COLUMNS]
+		)
+		self.writer = pyarrow.parquet.ParquetWriter(path, self.schema, compression="zstd")
+
+	def write(self, rows):
+		table = self.pyarrow.Table.from_pylist(
+			[{column: row.get(column) for column in COLUMNS} for row in rows], schema=self.schema
+		)
+		self.writer.write_table(table)
+
+	def close(self):
+		self.writer.close()
+
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def get_watermark(filters):
+	"""
+	(modified, name) of the last row written by the previous incremental export with
+	the same language and provider filters
+	"""
+	value = frappe.db.get_default(_watermark_key(filters))
+	if not value:
+		return None
+	modified, name = json.loads(value)
+	return get_datetime(modified), name
+
+
+def _watermark_key(filters):
+	return f"{WATERMARK_PREFIX}:{filters.get('target_language') or '*'}:{filters.get('ai_provider') or '*'}"
+
+
+def write_export(export_format, filters, since_last_export=False, on_progress=None):
+	"""
+	Write every matching row to a private File, one page at a time.
+	Returns {"file_url", "file_name", "count"}.
+	"""
+	writer_class = WRITERS[export_format]
+	file_name = f"translations-{now_datetime().strftime('%Y%m%d-%H%M%S')}-{frappe.generate_hash(length=6)}"
+	file_name += f".{writer_class.extension}"
+	path = frappe.get_site_path("private", "files", file_name)
+
+	after = get_watermark(filters) if since_last_export else None
+	count = 0
+	last = None
+	writer = writer_class(path)
+	try:
+		for rows in iter_translation_pages(filters, after):
+			writer.write(rows)
+			count += len(rows)
+			last = (str(rows[-1].modified), rows[-1].row_name)
+			if on_progress:
+				on_progress(count)
+	except Exception:
+		writer.close()
+		os.remove(path)
+		raise
+	writer.close()
+
+	file_doc = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+		}
+	)
+	file_doc.insert(ignore_permissions=True)
+
+	if since_last_export and last:
+		frappe.db.set_default(_watermark_key(filters), json.dumps(last))
+	frappe.db.commit()
+
+	return {"file_url": file_doc.file_url, "file_name": file_name, "count": count}
+
+
+@frappe.whitelist()
+def export_translations(export_format="jsonl", from_date=None, to_date=None, target_language=None,
+		ai_provider=None, since_last_export=0, background=1):
+	"""
+	Export translated invoice items to a private File as JSONL, CSV or Parquet.
+
+	since_last_export continues after the last row of the previous incremental export
+	with the same language and provider filters. With background set (the default) the
+	export runs as a job: its id is returned at once and progress is pushed on the
+	``ai_translate_export_progress`` realtime event.
+	"""
+	if not frappe.has_permission("Sales Invoice", "export"):
+		frappe.throw("Not permitted to export Sales Invoice translations", frappe.PermissionError)
+
+	export_format = (export_format or "jsonl").lower()
+	if export_format not in FORMATS:
+		frappe.throw(f"Unsupported export format {export_format}, use one of {', '.join(FORMATS)}")
+
+	filters = {
+		"from_date": from_date,
+		"to_date": to_date,
+		"target_language": target_language,
+		"ai_provider": ai_provider,
+	}
+	since_last_export = cint(since_last_export)
+
+	if not cint(background):
+		return {"success": True, **write_export(export_format, filters, since_last_export)}
+
+	job_id = frappe.generate_hash(length=16)
+	_set_meta(
+		job_id,
+		{
+			"job_id": job_id,
+			"status": "queued",
+			"user": frappe.session.user,
+			"format": export_format,
+			"filters": filters,
+			"count": 0,
+			"file_url": None,
+			"error": None,
+		},
+	)
+	frappe.enqueue(
+		"ai_translate.export.run_export_job",
+		queue="long",
+		timeout=JOB_TIMEOUT,
+		job_id=f"ai_translate_export::{job_id}",
+		export_job_id=job_id,
+		export_format=export_format,
+		filters=filters,
+		since_last_export=since_last_export,
+	)
+	return {"success": True, "job_id": job_id, "status": "queued"}
+
+
+def run_export_job(export_job_id, export_format, filters, since_last_export=0):
+	meta = _get_meta(export_job_id) or {}
+	user = meta.get("user") or frappe.session.user
+
+	meta.update(status="running")
+	_set_meta(export_job_id, meta)
+
+	def on_progress(count):
+		_publish(user, {"job_id": export_job_id, "status": "running", "count": count})
+
+	try:
+		result = write_export(export_format, filters, since_last_export, on_progress)
+		meta.update(status="finished", count=result["count"], file_url=result["file_url"])
+	except Exception as e:
+		frappe.log_error(title="Translation Export Failed")
+		meta.update(status="failed", error=str(e))
+
+	_set_meta(export_job_id, meta)
+	_publish(
+		user,
+		{
+			"job_id": export_job_id,
+			"status": meta["status"],
+			"count": meta.get("count"),
+			"file_url": meta.get("file_url"),
+			"error": meta.get("error"),
+		},
+	)
+
+
+@frappe.whitelist()
+def get_export_status(job_id):
+	meta = _get_meta(job_id)
+	if not meta:
+		return {"job_id": job_id, "status": "not_found"}
+
+	if meta.get("user") != frappe.session.user and "System Manager" not in frappe.get_roles():
+		frappe.throw("Not permitted to view this export", frappe.PermissionError)
+	return meta
+
+
+def _get_meta(job_id):
+	return frappe.cache().get_value(STATUS_PREFIX + job_id)
+
+
+def _set_meta(job_id, meta):
+	frappe.cache().set_value(STATUS_PREFIX + job_id, meta, expires_in_sec=STATUS_TTL)
+
+
+def _publish(user, message):
+	frappe.publish_realtime(REALTIME_EVENT, message, user=user)
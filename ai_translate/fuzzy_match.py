@@ -0,0 +1,314 @@
+import difflib
+import logging
+import pickle
+import re
+import threading
+import time
+import zlib
+
+import frappe
+import numpy as np
+from frappe.utils import cint, flt
+
+from ai_translate.translation_memory import DOCTYPE, normalize_text
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+NUM_HASHES = 64
+MERSENNE_PRIME = (1 << 31) - 1
+
+# Defaults, overridable from site_config.json
+DEFAULT_REFERENCE_THRESHOLD = 0.80  # similar enough to hand to the LLM as a reference
+DEFAULT_REUSE_THRESHOLD = 0.97  # similar enough to reuse verbatim, when near-match reuse is on
+DEFAULT_MAX_SEGMENTS = 200000
+DEFAULT_INDEX_TTL = 3600  # seconds before the background job rebuilds an index
+MIN_TEXT_LENGTH = 12
+MAX_TEXT_LENGTH = 2000  # longer texts are matched per segment, not as a whole
+CANDIDATES = 8
+
+# Seconds between checks for a rebuilt index snapshot; a worker picks up a new one within this
+CHECK_INTERVAL = 30
+INDEX_PREFIX = "ai_translate:fuzzy_index:"
+PAIRS_KEY = "ai_translate:fuzzy_index_pairs"
+BUILD_TIMEOUT = 1800
+
+# Fixed seed so signatures are identical in every worker process
+_rng = np.random.default_rng(0x5EED)
+_HASH_A = _rng.integers(1, MERSENNE_PRIME, size=NUM_HASHES, dtype=np.uint64)
+_HASH_B = _rng.integers(0, MERSENNE_PRIME, size=NUM_HASHES, dtype=np.uint64)
+
+
+def is_enabled():
+	return bool(cint(frappe.conf.get("ai_translate_fuzzy_enabled", 1)))
+
+
+def reuse_near_matches():
+	"""
+	Near matches are only handed to the LLM as references unless reuse is switched on
+	"""
+	return bool(cint(frappe.conf.get("ai_translate_fuzzy_reuse", 0)))
+
+
+def get_thresholds():
+	return (
+		flt(frappe.conf.get("ai_translate_fuzzy_threshold")) or DEFAULT_REFERENCE_THRESHOLD,
+		flt(frappe.conf.get("ai_translate_fuzzy_reuse_threshold")) or DEFAULT_REUSE_THRESHOLD,
+	)
+
+
+def comparable_text(text):
+	return normalize_text(text).lower()
+
+
+def minhash_signature(text):
+	"""
+	64 MinHash values over the character trigrams of text, truncated to uint16
+	"""
+	padded = f" {text} "
+	shingles = {padded[i : i + NGRAM_SIZE] for i in range(max(len(padded) - NGRAM_SIZE + 1, 1))}
+	hashes = np.fromiter(
+		(zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+	)
+
+	# (NUM_HASHES, shingles) universal hashes, reduced to the minimum per hash function
+	permuted = (np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % MERSENNE_PRIME
+	return permuted.min(axis=1).astype(np.uint16)
+
+
+class FuzzyIndex:
+	"""
+	MinHash signatures of every stored segment for one language pair.
+
+	Similarity against the whole index is one vectorized comparison; the best few
+	candidates are then re-scored exactly.
+	"""
+
+	def __init__(self, capacity=1024):
+		self.signatures = np.zeros((capacity, NUM_HASHES), dtype=np.uint16)
+		self.sources = []
+		self.translations = []
+		self.loaded_at = time.monotonic()
+		self._lock = threading.Lock()
+
+	def __len__(self):
+		return len(self.sources)
+
+	def add(self, source_text, translated_text):
+		source = normalize_text(source_text)
+		if len(source) < MIN_TEXT_LENGTH or not translated_text:
+			return
+
+		signature = minhash_signature(source.lower())
+		with self._lock:
+			size = len(self.sources)
+			if size == self.signatures.shape[0]:
+				grown = np.zeros((max(size * 2, 1024), NUM_HASHES), dtype=np.uint16)
+				grown[:size] = self.signatures
+				self.signatures = grown
+			self.signatures[size] = signature
+			self.sources.append(source)
+			self.translations.append(translated_text)
+
+	def search(self, text, threshold):
+		"""
+		Best (score, source, translation) at or above threshold, else None
+		"""
+		query = comparable_text(text)
+		size = len(self.sources)
+		if not size or len(query) < MIN_TEXT_LENGTH:
+			return None
+
+		estimates = (self.signatures[:size] == minhash_signature(query)).mean(axis=1)
+
+		count = min(CANDIDATES, size)
+		candidates = np.argpartition(estimates, -count)[-count:]
+		# Cheap pre-filter: MinHash Jaccard well below the threshold cannot score above it
+		candidates = candidates[estimates[candidates] >= threshold / 2]
+
+		best = None
+		for position in candidates:
+			source = self.sources[position]
+			score = difflib.SequenceMatcher(None, query, source.lower(), autojunk=False).ratio()
+			if score >= threshold and (best is None or score > best[0]):
+				best = (score, source, self.translations[position])
+		return best
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(source_language, target_language):
+	"""
+	This process's copy of the index for a language pair, None until the background job
+	has built one. Rebuilt snapshots are picked up at most every CHECK_INTERVAL seconds;
+	loading one never blocks lookups of other pairs.
+	"""
+	key = (frappe.local.site, source_language, target_language)
+	now = time.monotonic()
+
+	with _indexes_lock:
+		entry = _indexes.get(key)
+		if entry and now - entry[2] < CHECK_INTERVAL:
+			return entry[0]
+		# Other threads keep using the current copy while this one checks
+		_indexes[key] = (entry[0], entry[1], now) if entry else (None, None, now)
+
+	cache = frappe.cache()
+	try:
+		built_at = cache.get(cache.make_key(_built_key(source_language, target_language)))
+		if built_at is None:
+			enqueue_build(source_language, target_language)
+			index = None
+		elif entry and entry[1] == built_at:
+			index = entry[0]
+		else:
+			index = _load_snapshot(cache, source_language, target_language)
+	except Exception as e:
+		logger.warning(f"Loading the fuzzy index failed: {str(e)}")
+		index, built_at = (entry[0], entry[1]) if entry else (None, None)
+
+	with _indexes_lock:
+		_indexes[key] = (index, built_at if index is not None else None, now)
+	return index
+
+
+def _snapshot_key(source_language, target_language):
+	return f"{INDEX_PREFIX}{source_language}:{target_language}"
+
+
+def _built_key(source_language, target_language):
+	return f"{INDEX_PREFIX}{source_language}:{target_language}:built_at"
+
+
+def _load_snapshot(cache, source_language, target_language):
+	data = cache.get(cache.make_key(_snapshot_key(source_language, target_language)))
+	if not data:
+		enqueue_build(source_language, target_language)
+		return None
+	snapshot = pickle.loads(data)
+
+	index = FuzzyIndex(capacity=0)
+	index.signatures = snapshot["signatures"]
+	index.sources = snapshot["sources"]
+	index.translations = snapshot["translations"]
+	return index
+
+
+def enqueue_build(source_language, target_language):
+	try:
+		frappe.enqueue(
+			"ai_translate.fuzzy_match.build_index",
+			queue="long",
+			timeout=BUILD_TIMEOUT,
+			job_id=f"ai_translate_fuzzy_index::{source_language}:{target_language}",
+			deduplicate=True,
+			source_language=source_language,
+			target_language=target_language,
+		)
+	except Exception as e:
+		logger.debug(f"Could not queue fuzzy index build: {str(e)}")
+
+
+def build_index(source_language, target_language):
+	"""
+	Compute the signatures of a language pair's stored segments and publish them as the
+	shared snapshot every worker loads
+	"""
+	index = _load_index(source_language, target_language)
+	size = len(index)
+	snapshot = pickle.dumps(
+		{
+			"signatures": index.signatures[:size].copy(),
+			"sources": index.sources,
+			"translations": index.translations,
+		},
+		protocol=pickle.HIGHEST_PROTOCOL,
+	)
+
+	cache = frappe.cache()
+	expires = 3 * (cint(frappe.conf.get("ai_translate_fuzzy_index_ttl")) or DEFAULT_INDEX_TTL)
+	pipe = cache.pipeline()
+	pipe.set(cache.make_key(_snapshot_key(source_language, target_language)), snapshot, ex=expires)
+	pipe.set(cache.make_key(_built_key(source_language, target_language)), str(time.time()), ex=expires)
+	pipe.sadd(cache.make_key(PAIRS_KEY), f"{source_language}:{target_language}")
+	pipe.execute()
+
+
+def refresh_indexes():
+	"""
+	Scheduled: rebuild the snapshots of every language pair that has been looked up
+	"""
+	cache = frappe.cache()
+	# The wrapper prefixes set names itself
+	for pair in cache.smembers(PAIRS_KEY) or []:
+		pair = pair.decode() if isinstance(pair, bytes) else pair
+		source_language, target_language = pair.split(":", 1)
+		enqueue_build(source_language, target_language)
+
+
+def _load_index(source_language, target_language):
+	limit = cint(frappe.conf.get("ai_translate_fuzzy_max_segments")) or DEFAULT_MAX_SEGMENTS
+	rows = frappe.get_all(
+		DOCTYPE,
+		filters={"source_language": source_language, "target_language": target_language},
+		fields=["source_text", "translated_text"],
+		order_by="modified desc",
+		limit_page_length=limit,
+		as_list=True,
+	)
+
+	index = FuzzyIndex(capacity=max(len(rows), 1024))
+	for source_text, translated_text in rows:
+		index.add(source_text, translated_text)
+	return index
+
+
+def add_segment(source_text, source_language, target_language, translated_text):
+	"""
+	Make a new translation visible to an already loaded index in this process
+	"""
+	entry = _indexes.get((frappe.local.site, source_language, target_language))
+	if entry and entry[0] is not None:
+		entry[0].add(source_text, translated_text)
+
+
+def find_match(text, source_language, target_language):
+	"""
+	Look for a stored translation of a similar text.
+
+	Returns a dict with ``score``, ``source_text``, ``translated_text`` and ``mode``:
+	``reuse`` when the stored translation can be used as-is, ``reference`` when it
+	should be handed to the LLM to adapt. Only an exact match after normalization is
+	reused unless ``ai_translate_fuzzy_reuse`` is on. None when nothing is similar enough
+	or the index has not been built yet.
+	"""
+	if not is_enabled() or len(text) > MAX_TEXT_LENGTH:
+		return None
+
+	reference_threshold, reuse_threshold = get_thresholds()
+	try:
+		index = get_index(source_language, target_language)
+		match = index.search(text, reference_threshold) if index is not None else None
+	except Exception as e:
+		logger.warning(f"Fuzzy translation memory lookup failed: {str(e)}")
+		return None
+
+	if not match:
+		return None
+
+	score, source_text, translated_text = match
+	if normalize_text(text) == source_text:
+		reuse = True
+	elif reuse_near_matches() and score >= reuse_threshold:
+		# Numbers (sizes, quantities, codes) must match exactly before a translation is reused
+		reuse = re.findall(r"\d+", text) == re.findall(r"\d+", source_text)
+	else:
+		reuse = False
+	return {
+		"score": round(score, 4),
+		"source_text": source_text,
+		"translated_text": translated_text,
+		"mode": "reuse" if reuse else "reference",
+	}
@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+
+import frappe
+from frappe.utils import cint
+
+logger = logging.getLogger(__name__)
+
+DOCTYPE = "Translation Glossary"
+VERSION_KEY = "ai_translate:glossary_version"
+
+# Seconds between checks of the shared glossary version; edits reach every worker within this
+CHECK_INTERVAL = 5
+
+PROMPT_HEADING = "Glossary: translate these terms exactly as given"
+
+
+def make_name(source_language, target_language):
+	return f"{source_language}-{target_language}"
+
+
+class Matcher:
+	"""
+	Aho-Corasick automaton over the source terms of one glossary. find() reports every
+	term occurring in a text in a single pass over its characters, however many terms
+	the glossary has. Matching ignores case unless a term is case sensitive, and only
+	whole words count, so "kit" is not found in "kitchen".
+	"""
+
+	def __init__(self, terms):
+		# terms: (source_term, target_term, case_sensitive, note)
+		self.terms = []
+		self.goto = [{}]
+		self.fail = [0]
+		self.output = [()]
+
+		for term in terms:
+			source_term = (term[0] or "").strip()
+			if not source_term or not (term[1] or "").strip():
+				continue
+			note = (term[3] or "").strip() if len(term) > 3 else ""
+			self.terms.append((source_term, term[1].strip(), cint(term[2]), note))
+			state = 0
+			for char in fold(source_term):
+				next_state = self.goto[state].get(char)
+				if next_state is None:
+					next_state = len(self.goto)
+					self.goto[state][char] = next_state
+					self.goto.append({})
+					self.fail.append(0)
+					self.output.append(())
+				state = next_state
+			self.output[state] += (len(self.terms) - 1,)
+
+		self._link()
+
+	def _link(self):
+		"""
+		Failure links, breadth first, each state inheriting the outputs of its failure state
+		"""
+		queue = list(self.goto[0].values())
+		for state in queue:
+			for char, next_state in self.goto[state].items():
+				queue.append(next_state)
+				fallback = self.fail[state]
+				while fallback and char not in self.goto[fallback]:
+					fallback = self.fail[fallback]
+				target = self.goto[fallback].get(char, 0)
+				self.fail[next_state] = target if target != next_state else 0
+				self.output[next_state] += self.output[self.fail[next_state]]
+
+	def find(self, text):
+		"""
+		Glossary entries occurring in text, in order of first occurrence. Where terms
+		overlap the longest one wins ("steel pipe" over "steel").
+		"""
+		if not self.terms or not text:
+			return []
+
+		folded = fold(text)
+		goto = self.goto
+		fail = self.fail
+		output = self.output
+		state = 0
+		hits = []
+		for end, char in enumerate(folded):
+			while state and char not in goto[state]:
+				state = fail[state]
+			state = goto[state].get(char, 0)
+			for term_index in output[state]:
+				term = self.terms[term_index]
+				start = end - len(term[0]) + 1
+				if _is_word(folded, start, end + 1) and (not term[2] or text[start : end + 1] == term[0]):
+					hits.append((start, -(end + 1 - start), term_index))
+
+		if not hits:
+			return []
+
+		found = []
+		seen = set()
+		covered_until = 0
+		for start, negative_length, term_index in sorted(hits):
+			if start < covered_until:
+				continue
+			covered_until = start - negative_length
+			if term_index not in seen:
+				seen.add(term_index)
+				found.append(self.terms[term_index])
+		return found
+
+
+def fold(text):
+	"""
+	Lower-cased text with every character keeping its position
+	"""
+	folded = text.lower()
+	if len(folded) != len(text):
+		folded = "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+	return folded
+
+
+def _is_word(text, start, end):
+	return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+_matchers = {}
+_versions = {}
+_matchers_lock = threading.Lock()
+
+
+def is_enabled():
+	return bool(cint(frappe.conf.get("ai_translate_glossary", 1)))
+
+
+def bump_version():
+	"""
+	Tell every worker to rebuild its matchers; called when a glossary is saved or deleted
+	"""
+	cache = frappe.cache()
+	cache.incr(cache.make_key(VERSION_KEY))
+	_versions.pop(frappe.local.site, None)
+
+
+def get_version():
+	"""
+	The shared glossary version, read from Redis at most every CHECK_INTERVAL seconds
+	"""
+	site = frappe.local.site
+	entry = _versions.get(site)
+	now = time.monotonic()
+	if entry and now - entry[1] < CHECK_INTERVAL:
+		return entry[0]
+
+	try:
+		cache = frappe.cache()
+		version = cint(cache.get(cache.make_key(VERSION_KEY)))
+	except Exception as e:
+		logger.warning(f"Reading the glossary version failed: {str(e)}")
+		version = entry[0] if entry else 0
+	_versions[site] = (version, now)
+	return version
+
+
+def get_matcher(source_language, target_language):
+	key = (frappe.local.site, source_language, target_language)
+	version = get_version()
+
+	entry = _matchers.get(key)
+	if entry is None or entry[0] != version:
+		with _matchers_lock:
+			entry = _matchers.get(key)
+			if entry is None or entry[0] != version:
+				entry = (version, _load_matcher(source_language, target_language))
+				_matchers[key] = entry
+	return entry[1]
+
+
+def _load_matcher(source_language, target_language):
+	name = make_name(source_language, target_language)
+	if not frappe.db.get_value(DOCTYPE, name, "enabled"):
+		return Matcher([])
+
+	terms = frappe.get_all(
+		"Translation Glossary Term",
+		filters={"parent": name, "parenttype": DOCTYPE},
+		fields=["source_term", "target_term", "case_sensitive", "note"],
+		order_by="idx",
+		as_list=True,
+	)
+	return Matcher(terms)
+
+
+def find_terms(text, source_language, target_language):
+	"""
+	(source_term, target_term, case_sensitive, note) of the glossary terms in text
+	"""
+	if not text or not is_enabled():
+		return []
+	try:
+		return get_matcher(source_language or "en", target_language).find(text)
+	except Exception as e:
+		logger.warning(f"Glossary lookup failed: {str(e)}")
+		return []
+
+
+def prompt_block(terms):
+	"""
+	The glossary lines for a prompt, empty when no term occurs
+	"""
+	if not terms:
+		return ""
+	lines = [f"\n\n{PROMPT_HEADING}:"]
+	for source_term, target_term, _case_sensitive, note in terms:
+		lines.append(f"- {source_term} => {target_term}" + (f" ({note})" if note else ""))
+	return "\n".join(lines)
+
+
+def missed_terms(translated_text, terms):
+	"""
+	Source terms whose glossary translation does not appear in translated_text
+	"""
+	if not terms:
+		return []
+	folded = fold(translated_text or "")
+	return [source_term for source_term, target_term, _case_sensitive, _note in terms if fold(target_term) not in folded]
@@ -159,26 +159,35 @@ doctype_js = {
 # 	}
 # }
 
+doc_events = {
+    "Sales Invoice": {
+        "validate": "ai_translate.translate.validate_translation_fields",
+        "on_update": "ai_translate.translate.on_sales_invoice_update",
+        "on_submit": "ai_translate.translate.on_sales_invoice_update",
+        "before_cancel": "ai_translate.translation_stats.record_invoice_rows",
+        "before_update_after_submit": "ai_translate.translation_stats.record_invoice_rows",
+        "on_trash": "ai_translate.translation_stats.record_invoice_rows"
+    }
+}
+
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-# 	"all": [
-# 		"ai_translate.tasks.all"
-# 	],
-# 	"daily": [
-# 		"ai_translate.tasks.daily"
-# 	],
-# 	"hourly": [
-# 		"ai_translate.tasks.hourly"
-# 	],
-# 	"weekly": [
-# 		"ai_translate.tasks.weekly"
-# 	],
-# 	"monthly": [
-# 		"ai_translate.tasks.monthly"
-# 	],
-# }
+scheduler_events = {
+    "all": [
+        "ai_translate.translation_log.flush_translation_logs"
+    ],
+    "hourly": [
+        "ai_translate.fuzzy_match.refresh_indexes"
+    ],
+    "hourly_long": [
+        "ai_translate.translation_stats.reconcile_translated_rows"
+    ],
+    "daily": [
+        "ai_translate.translation_stats.reconcile_daily_stats",
+        "ai_translate.translate.cleanup_translation_logs"
+    ],
+}
 
 # Testing
 # -------
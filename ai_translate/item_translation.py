@@ -0,0 +1,130 @@
+import hashlib
+import logging
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from ai_translate.translation_memory import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DOCTYPE = "Item Translation"
+
+
+def is_enabled():
+	return bool(cint(frappe.conf.get("ai_translate_item_translations", 1)))
+
+
+def make_name(item_code, language):
+	return f"{item_code}::{language}"
+
+
+def source_hash(text):
+	text = normalize_text(text)
+	if not text:
+		return None
+	return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def lookup(item_codes, language):
+	"""
+	Stored translations of the given Items into language, in one primary-key query.
+	Returns {item_code: row}.
+	"""
+	names = {make_name(item_code, language) for item_code in item_codes if item_code}
+	if not names or not is_enabled():
+		return {}
+
+	try:
+		rows = frappe.get_all(
+			DOCTYPE,
+			filters={"name": ["in", list(names)]},
+			fields=["name", "item_code", "source_hash", "translated_text", "ai_provider", "model", "reviewed"],
+		)
+	except Exception as e:
+		logger.warning(f"Item translation lookup failed: {str(e)}")
+		return {}
+	return {row.item_code: row for row in rows}
+
+
+def lookup_languages(item_code, languages):
+	"""
+	Stored translations of one Item into each of languages, in one query. Returns {language: row}.
+	"""
+	if not item_code or not languages or not is_enabled():
+		return {}
+
+	try:
+		rows = frappe.get_all(
+			DOCTYPE,
+			filters={"name": ["in", [make_name(item_code, language) for language in languages]]},
+			fields=["name", "language", "source_hash", "translated_text", "ai_provider", "model", "reviewed"],
+		)
+	except Exception as e:
+		logger.warning(f"Item translation lookup failed: {str(e)}")
+		return {}
+	return {row.language: row for row in rows}
+
+
+def match(stored, key, description):
+	"""
+	The translation stored under key (an item code or a language) if it was made from
+	this description
+	"""
+	row = stored.get(key) if key else None
+	if row and row.translated_text and row.source_hash == source_hash(description):
+		return row
+	return None
+
+
+def store(entries, language, stored=None):
+	"""
+	Write AI translations back to the Items they belong to. entries are
+	(item_code, description, translated_text, provider, model); stored is what lookup
+	returned for them. Missing translations are inserted, translations of an older
+	description are replaced unless reviewed. Failures are logged, never raised.
+	"""
+	if not entries or not is_enabled():
+		return
+
+	stored = stored if stored is not None else lookup([entry[0] for entry in entries], language)
+	now = now_datetime()
+	user = frappe.session.user
+	new_rows = {}
+
+	try:
+		for item_code, description, translated_text, provider, model in entries:
+			if not item_code or not translated_text:
+				continue
+			row = stored.get(item_code)
+			if row is None:
+				name = make_name(item_code, language)
+				new_rows[name] = (
+					name, now, now, user, user, item_code, language, provider, model, 0,
+					normalize_text(description), translated_text, source_hash(description),
+				)
+			elif not row.reviewed and row.source_hash != source_hash(description):
+				frappe.db.set_value(
+					DOCTYPE,
+					row.name,
+					{
+						"source_text": normalize_text(description),
+						"source_hash": source_hash(description),
+						"translated_text": translated_text,
+						"ai_provider": provider,
+						"model": model,
+					},
+				)
+
+		if new_rows:
+			frappe.db.bulk_insert(
+				DOCTYPE,
+				(
+					"name", "creation", "modified", "owner", "modified_by", "item_code", "language", "ai_provider",
+					"model", "reviewed", "source_text", "translated_text", "source_hash",
+				),
+				list(new_rows.values()),
+				ignore_duplicates=True,
+			)
+	except Exception as e:
+		logger.warning(f"Item translation store failed: {str(e)}")
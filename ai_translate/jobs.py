@@ -0,0 +1,149 @@
+import json
+import logging
+
+import frappe
+from frappe.utils import cint
+
+logger = logging.getLogger(__name__)
+
+REALTIME_EVENT = "ai_translate_bulk_progress"
+STATUS_PREFIX = "ai_translate:bulk_job:"
+STATUS_TTL = 24 * 3600  # seconds
+JOB_TIMEOUT = 3600  # seconds
+
+
+@frappe.whitelist()
+def enqueue_bulk_translation(items_data, target_language="ar", ai_provider="groq", batch_mode=None):
+	"""
+	Queue bulk_ai_translate_items as a background job and return its id immediately.
+
+	Progress and per-item results are pushed on the ``ai_translate_bulk_progress``
+	realtime event; get_bulk_translation_status serves clients that cannot listen.
+	"""
+	if isinstance(items_data, str):
+		items_data = json.loads(items_data)
+
+	job_id = frappe.generate_hash(length=16)
+	_set_meta(
+		job_id,
+		{
+			"job_id": job_id,
+			"status": "queued",
+			"user": frappe.session.user,
+			"total": len(items_data),
+			"completed": 0,
+			"target_language": target_language,
+			"ai_provider": ai_provider,
+			"summary": None,
+			"error": None,
+		},
+	)
+
+	frappe.enqueue(
+		"ai_translate.jobs.run_bulk_translation_job",
+		queue="long",
+		timeout=JOB_TIMEOUT,
+		job_id=f"ai_translate_bulk::{job_id}",
+		translation_job_id=job_id,
+		items_data=items_data,
+		target_language=target_language,
+		ai_provider=ai_provider,
+		batch_mode=batch_mode,
+	)
+
+	return {"job_id": job_id, "status": "queued", "total_items": len(items_data)}
+
+
+def run_bulk_translation_job(translation_job_id, items_data, target_language, ai_provider, batch_mode=None):
+	from ai_translate.translate import run_bulk_translation
+
+	meta = _get_meta(translation_job_id) or {}
+	user = meta.get("user") or frappe.session.user
+	total = len(items_data)
+	completed = 0
+
+	meta.update(status="running")
+	_set_meta(translation_job_id, meta)
+	_publish(user, {"job_id": translation_job_id, "status": "running", "completed": 0, "total": total})
+
+	def on_result(index, result):
+		nonlocal completed
+		completed += 1
+		frappe.cache().hset(_status_key(translation_job_id), f"result:{index}", result)
+		_publish(
+			user,
+			{
+				"job_id": translation_job_id,
+				"status": "running",
+				"index": index,
+				"result": result,
+				"completed": completed,
+				"total": total,
+			},
+		)
+
+	try:
+		response = run_bulk_translation(
+			items_data, target_language, ai_provider, batch_mode, on_result=on_result
+		)
+		meta.update(status="finished", completed=total, summary=response.get("summary"))
+	except Exception as e:
+		frappe.log_error(title="Background Bulk Translation Failed")
+		meta.update(status="failed", completed=completed, error=str(e))
+
+	_set_meta(translation_job_id, meta)
+	_publish(
+		user,
+		{
+			"job_id": translation_job_id,
+			"status": meta["status"],
+			"completed": meta["completed"],
+			"total": total,
+			"summary": meta.get("summary"),
+			"error": meta.get("error"),
+		},
+	)
+
+
+@frappe.whitelist()
+def get_bulk_translation_status(job_id, include_results=1):
+	"""
+	Poll endpoint: job status, progress counters and (optionally) results so far
+	"""
+	meta = _get_meta(job_id)
+	if not meta:
+		return {"job_id": job_id, "status": "not_found"}
+
+	if meta.get("user") != frappe.session.user and "System Manager" not in frappe.get_roles():
+		frappe.throw("Not permitted to view this translation job", frappe.PermissionError)
+
+	response = dict(meta)
+	if cint(include_results):
+		stored = frappe.cache().hgetall(_status_key(job_id)) or {}
+		results = []
+		for field, value in stored.items():
+			field = field.decode() if isinstance(field, bytes) else field
+			if field.startswith("result:"):
+				results.append({"index": int(field.split(":", 1)[1]), "result": value})
+		response["results"] = sorted(results, key=lambda row: row["index"])
+		response["completed"] = max(response.get("completed") or 0, len(results))
+
+	return response
+
+
+def _status_key(job_id):
+	return STATUS_PREFIX + job_id
+
+
+def _get_meta(job_id):
+	return frappe.cache().hget(_status_key(job_id), "meta")
+
+
+def _set_meta(job_id, meta):
+	cache = frappe.cache()
+	cache.hset(_status_key(job_id), "meta", meta)
+	cache.expire(cache.make_key(_status_key(job_id)), STATUS_TTL)
+
+
+def _publish(user, message):
+	frappe.publish_realtime(REALTIME_EVENT, message, user=user)
@@ -0,0 +1,350 @@
+import json
+import logging
+
+import frappe
+from frappe.utils import cint, flt
+
+from ai_translate import translation_log
+
+logger = logging.getLogger(__name__)
+
+# Every counter of a site lives in one Redis hash, one field per series
+METRICS_KEY = "ai_translate:metrics"
+
+# Upper bounds (seconds) of the translation latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+METRICS = {
+	"ai_translate_translation_seconds": (
+		"histogram",
+		"Time to produce one translation, by provider, model, language pair and source "
+		"(cache, fuzzy, item, ai, batch, stream, fallback, failed)",
+	),
+	"ai_translate_requests_total": ("counter", "Upstream API requests by outcome (ok or error class)"),
+	"ai_translate_tokens_total": ("counter", "Tokens reported by the provider APIs, by kind"),
+	"ai_translate_fallbacks_total": ("counter", "Translations served by a fallback provider"),
+}
+
+# Sources that reached a provider, as opposed to the translation memory
+UPSTREAM_SOURCES = ("ai", "batch", "stream", "fallback")
+
+
+def record_translation(provider, model, source_language, target_language, source, seconds, text=None,
+		usage=None, error=None):
+	"""
+	Count one translation and its latency. source tells where it came from:
+	cache, fuzzy, item, ai, batch, stream, fallback or failed. The Translation Log entry is
+	buffered in the same Redis round trip.
+	"""
+	labels = {
+		"provider": provider,
+		"model": model or "unknown",
+		"pair": f"{source_language}-{target_language}",
+		"source": source,
+	}
+	bucket = next((str(bound) for bound in LATENCY_BUCKETS if seconds <= bound), "+Inf")
+	log_entry = None
+	if translation_log.is_enabled():
+		log_entry = translation_log.make_entry(
+			provider, model, source_language, target_language, source, seconds, text, usage, error
+		)
+
+	_write(
+		[
+			(_field("ai_translate_translation_seconds_bucket", {**labels, "le": bucket}), 1),
+			(_field("ai_translate_translation_seconds_count", labels), 1),
+		],
+		[(_field("ai_translate_translation_seconds_sum", labels), flt(seconds))],
+		log_entry,
+	)
+
+
+def record_request(provider, model, usage=None, error=None, status_code=None):
+	"""
+	Count one upstream API request: its outcome and the tokens it used
+	"""
+	outcome = error_class(error, status_code) if error or status_code else "ok"
+	counters = [(_field("ai_translate_requests_total", {"provider": provider, "model": model, "outcome": outcome}), 1)]
+	for kind, tokens in (usage or {}).items():
+		if tokens:
+			kind = kind[: -len("_tokens")] if kind.endswith("_tokens") else kind
+			counters.append(
+				(_field("ai_translate_tokens_total", {"provider": provider, "model": model, "kind": kind}), cint(tokens))
+			)
+	_write(counters)
+
+
+def record_fallback(provider, fallback):
+	_write([(_field("ai_translate_fallbacks_total", {"provider": provider, "fallback": fallback}), 1)])
+
+
+def error_class(error=None, status_code=None):
+	"""
+	Coarse, low-cardinality class of a failed request
+	"""
+	from ai_translate.provider_health import ProviderUnavailable
+	from ai_translate.rate_limit import RateLimited
+
+	if status_code:
+		if status_code == 429:
+			return "rate_limited"
+		return "http_5xx" if status_code >= 500 else "http_4xx"
+	if isinstance(error, ProviderUnavailable):
+		return "circuit_open"
+	if isinstance(error, RateLimited):
+		return "rate_limited"
+
+	name = type(error).__name__
+	if "Timeout" in name:
+		return "timeout"
+	if "Connect" in name:
+		return "connection"
+	return name
+
+
+def _field(name, labels):
+	return json.dumps([name, sorted(labels.items())], separators=(",", ":"), ensure_ascii=False)
+
+
+def _write(counters, floats=(), log_entry=None):
+	# Metrics must never slow down or break a translation
+	try:
+		cache = frappe.cache()
+		key = cache.make_key(METRICS_KEY)
+		pipe = cache.pipeline(transaction=False)
+		for field, amount in counters:
+			pipe.hincrby(key, field, amount)
+		for field, amount in floats:
+			pipe.hincrbyfloat(key, field, amount)
+		if log_entry:
+			pipe.rpush(cache.make_key(translation_log.BUFFER_KEY), log_entry)
+		replies = pipe.execute()
+	except Exception as e:
+		logger.debug(f"Could not record translation metrics: {str(e)}")
+		return
+
+	if log_entry:
+		translation_log.after_buffered(replies[-1])
+
+
+def read_series():
+	"""
+	[(name, labels dict, value)] of every stored series
+	"""
+	cache = frappe.cache()
+	# Through a pipeline, as the cache wrapper's hgetall expects pickled values
+	pipe = cache.pipeline(transaction=False)
+	pipe.hgetall(cache.make_key(METRICS_KEY))
+	(raw,) = pipe.execute()
+
+	series = []
+	for field, value in (raw or {}).items():
+		field = field.decode() if isinstance(field, bytes) else field
+		value = value.decode() if isinstance(value, bytes) else value
+		try:
+			name, labels = json.loads(field)
+		except ValueError:
+			continue
+		series.append((name, dict(labels), flt(value)))
+	return series
+
+
+def _histograms(series):
+	"""
+	{labels tuple: {"buckets": [(bound, cumulative count)], "sum": s, "count": n}}
+	"""
+	histograms = {}
+	for name, labels, value in series:
+		if not name.startswith("ai_translate_translation_seconds_"):
+			continue
+		labels = dict(labels)
+		le = labels.pop("le", None)
+		entry = histograms.setdefault(tuple(sorted(labels.items())), {"buckets": {}, "sum": 0, "count": 0})
+		if name.endswith("_bucket"):
+			entry["buckets"][le] = entry["buckets"].get(le, 0) + value
+		elif name.endswith("_sum"):
+			entry["sum"] = value
+		elif name.endswith("_count"):
+			entry["count"] = value
+
+	for entry in histograms.values():
+		cumulative = 0
+		buckets = []
+		for bound in [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]:
+			cumulative += entry["buckets"].get(bound, 0)
+			buckets.append((bound, cumulative))
+		entry["buckets"] = buckets
+	return histograms
+
+
+def _quantile(buckets, q):
+	"""
+	Estimate of the q-quantile from cumulative buckets, interpolating linearly inside
+	the bucket it falls in (as Prometheus' histogram_quantile does)
+	"""
+	total = buckets[-1][1] if buckets else 0
+	if not total:
+		return None
+
+	rank = q * total
+	lower_bound, lower_count = 0.0, 0
+	for bound, count in buckets:
+		if count >= rank:
+			if bound == "+Inf":
+				return float(LATENCY_BUCKETS[-1])
+			upper = float(bound)
+			if count == lower_count:
+				return upper
+			return round(lower_bound + (upper - lower_bound) * (rank - lower_count) / (count - lower_count), 3)
+		lower_bound, lower_count = float(bound), count
+	return float(LATENCY_BUCKETS[-1])
+
+
+def _merge_buckets(entries):
+	merged = {}
+	for entry in entries:
+		for bound, count in entry["buckets"]:
+			merged[bound] = merged.get(bound, 0) + count
+	return [(bound, merged.get(bound, 0)) for bound in [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]]
+
+
+def get_summary():
+	"""
+	Per-provider totals plus per language pair latencies, computed from the stored series
+	"""
+	series = read_series()
+	histograms = _histograms(series)
+
+	provider_summary = {}
+
+	def for_provider(name):
+		return provider_summary.setdefault(name, {
+			"translations": 0,
+			"by_source": {},
+			"cache_hit_ratio": 0,
+			"latency": {},
+			"requests": 0,
+			"errors": {},
+			"tokens": {},
+			"fallbacks": 0,
+		})
+
+	pairs = []
+	upstream_by_provider = {}
+	for key, entry in histograms.items():
+		labels = dict(key)
+		summary = for_provider(labels["provider"])
+		summary["translations"] += int(entry["count"])
+		summary["by_source"][labels["source"]] = summary["by_source"].get(labels["source"], 0) + int(entry["count"])
+		if labels["source"] in UPSTREAM_SOURCES:
+			upstream_by_provider.setdefault(labels["provider"], []).append(entry)
+
+		pairs.append({
+			**labels,
+			"count": int(entry["count"]),
+			"avg": round(entry["sum"] / entry["count"], 3) if entry["count"] else None,
+			"p50": _quantile(entry["buckets"], 0.5),
+			"p95": _quantile(entry["buckets"], 0.95),
+		})
+
+	for name, labels, value in series:
+		if name == "ai_translate_requests_total":
+			summary = for_provider(labels["provider"])
+			summary["requests"] += int(value)
+			if labels["outcome"] != "ok":
+				summary["errors"][labels["outcome"]] = summary["errors"].get(labels["outcome"], 0) + int(value)
+		elif name == "ai_translate_tokens_total":
+			tokens = for_provider(labels["provider"])["tokens"]
+			tokens[labels["kind"]] = tokens.get(labels["kind"], 0) + int(value)
+		elif name == "ai_translate_fallbacks_total":
+			for_provider(labels["provider"])["fallbacks"] += int(value)
+
+	for name, summary in provider_summary.items():
+		if summary["translations"]:
+			summary["cache_hit_ratio"] = round(summary["by_source"].get("cache", 0) / summary["translations"], 3)
+
+		entries = upstream_by_provider.get(name) or []
+		count = sum(entry["count"] for entry in entries)
+		if count:
+			buckets = _merge_buckets(entries)
+			summary["latency"] = {
+				"avg": round(sum(entry["sum"] for entry in entries) / count, 3),
+				"p50": _quantile(buckets, 0.5),
+				"p95": _quantile(buckets, 0.95),
+			}
+
+	pairs.sort(key=lambda entry: (entry["provider"], entry["pair"], entry["source"], entry["model"]))
+	return {"providers": provider_summary, "pairs": pairs}
+
+
+def render_prometheus():
+	"""
+	Every stored series in the Prometheus text exposition format
+	"""
+	series = read_series()
+	lines = []
+
+	by_name = {}
+	for name, labels, value in series:
+		if not name.startswith("ai_translate_translation_seconds_"):
+			by_name.setdefault(name, []).append((labels, value))
+
+	for name, (metric_type, help_text) in METRICS.items():
+		if metric_type == "histogram":
+			histograms = _histograms(series)
+			if not histograms:
+				continue
+			lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+			for key in sorted(histograms):
+				entry = histograms[key]
+				labels = dict(key)
+				for bound, count in entry["buckets"]:
+					lines.append(f"{name}_bucket{_render_labels({**labels, 'le': bound})} {_number(count)}")
+				lines.append(f"{name}_sum{_render_labels(labels)} {_number(entry['sum'])}")
+				lines.append(f"{name}_count{_render_labels(labels)} {_number(entry['count'])}")
+			continue
+
+		samples = by_name.get(name)
+		if not samples:
+			continue
+		lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+		for labels, value in sorted(samples, key=lambda sample: sorted(sample[0].items())):
+			lines.append(f"{name}{_render_labels(labels)} {_number(value)}")
+
+	return "\n".join(lines) + "\n"
+
+
+def _render_labels(labels):
+	def escape(value):
+		return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+	return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+	return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+@frappe.whitelist()
+def prometheus_metrics():
+	"""
+	Scrape endpoint, e.g. /api/method/ai_translate.metrics.prometheus_metrics with an API
+	key of a System Manager in the Authorization header
+	"""
+	from werkzeug.wrappers import Response
+
+	frappe.only_for("System Manager")
+	return Response(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@frappe.whitelist()
+def get_metrics_summary():
+	frappe.only_for("System Manager")
+	return get_summary()
+
+
+@frappe.whitelist()
+def reset_metrics():
+	frappe.only_for("System Manager")
+	frappe.cache().delete(frappe.cache().make_key(METRICS_KEY))
+	return {"success": True}
@@ -0,0 +1,243 @@
+import json
+import logging
+import time
+
+import frappe
+
+from ai_translate import (
+	glossary,
+	item_translation,
+	metrics,
+	provider_health,
+	providers,
+	segmentation,
+	translation_memory,
+)
+from ai_translate.batching import (
+	estimate_output_tokens,
+	get_output_budget,
+	load_json_reply,
+	make_result,
+)
+from ai_translate.concurrency import map_in_threads
+
+logger = logging.getLogger(__name__)
+
+MAX_TARGET_LANGUAGES = 20
+
+# The instructions never change, so the system prompt is identical across requests;
+# languages and text travel in the user message
+MULTI_TARGET_SYSTEM_PROMPT = """You are a professional translator specializing in natural, fluent business translations.
+You receive a JSON object {"source_language": string, "targets": {code: language name}, "text": string}.
+Translate "text" into every target language:
+- Make it sound completely natural in each language
+- Preserve the original meaning, tone and any codes, numbers or units
+- Use appropriate business terminology
+- Don't add explanations or notes
+
+Reply with ONLY a JSON object of the form {"translations": {code: translation}}
+containing exactly one entry for each target code."""
+
+
+def parse_target_languages(target_languages):
+	"""
+	Language codes from a list, a JSON array or a comma-separated string, deduplicated in order
+	"""
+	if isinstance(target_languages, str):
+		value = target_languages.strip()
+		target_languages = json.loads(value) if value.startswith("[") else value.split(",")
+
+	codes = []
+	for code in target_languages or []:
+		code = (code or "").strip()
+		if code and code not in codes:
+			codes.append(code)
+	return codes
+
+
+def build_prompt(text, source_language, target_languages, terms_by_language=None):
+	"""
+	terms_by_language: {code: glossary terms found for that language}, listed after the
+	fixed instructions as one line per term with its translation in each language
+	"""
+	from ai_translate.translate import get_language_names
+
+	lang_names = get_language_names()
+	user_prompt = json.dumps(
+		{
+			"source_language": lang_names.get(source_language, "English"),
+			"targets": {code: lang_names.get(code, code) for code in target_languages},
+			"text": text,
+		},
+		ensure_ascii=False,
+	)
+
+	translations_by_term = {}
+	for code, terms in (terms_by_language or {}).items():
+		for source_term, target_term, _case_sensitive, _note in terms:
+			translations_by_term.setdefault(source_term, []).append(f"{code}: {target_term}")
+
+	system_prompt = MULTI_TARGET_SYSTEM_PROMPT
+	if translations_by_term:
+		system_prompt += f"\n\n{glossary.PROMPT_HEADING}:\n" + "\n".join(
+			f"- {source_term} => {'; '.join(translations)}" for source_term, translations in translations_by_term.items()
+		)
+	return system_prompt, user_prompt
+
+
+def parse_response(raw, target_languages):
+	"""
+	Map language code -> translation, dropping languages that are missing or empty
+	"""
+	data = load_json_reply(raw)
+	if isinstance(data, dict) and isinstance(data.get("translations"), dict):
+		data = data["translations"]
+	if not isinstance(data, dict):
+		return {}
+
+	parsed = {}
+	for code in target_languages:
+		translated_text = data.get(code)
+		if isinstance(translated_text, str) and translated_text.strip():
+			parsed[code] = translated_text.strip()
+	return parsed
+
+
+def plan_groups(text, target_languages, provider):
+	"""
+	Split the languages into groups whose combined reply fits the provider's output budget
+	"""
+	output_budget, _context = get_output_budget(provider)
+	groups = []
+	current = []
+	current_output = 0
+	for code in target_languages:
+		output_tokens = estimate_output_tokens(text, code)
+		if current and current_output + output_tokens > output_budget:
+			groups.append(current)
+			current, current_output = [], 0
+		current.append(code)
+		current_output += output_tokens
+	if current:
+		groups.append(current)
+	return groups
+
+
+def translate_group(text, target_languages, source_language, provider):
+	"""
+	One request for all target_languages. Returns (translations by code, glossary terms
+	missed by code, usage, seconds); languages the reply left out are absent.
+	"""
+	adapter = providers.get_adapter(provider)
+	terms_by_language = {code: glossary.find_terms(text, source_language, code) for code in target_languages}
+	system_prompt, user_prompt = build_prompt(text, source_language, target_languages, terms_by_language)
+	output_budget, _context = get_output_budget(provider)
+	max_tokens = min(output_budget, sum(estimate_output_tokens(text, code) for code in target_languages) + 256)
+
+	start_time = time.monotonic()
+	reply, data = adapter.send(system_prompt, user_prompt, max_tokens, temperature=0.2, json_mode=True, timeout=90)
+	translations = parse_response(reply, target_languages)
+	missed = {code: glossary.missed_terms(translations[code], terms_by_language[code]) for code in translations}
+	return translations, missed, adapter.usage(data), time.monotonic() - start_time
+
+
+def translate_multi_target(text, target_languages, source_language="en", ai_provider="groq", use_cache=True,
+		item_code=None):
+	"""
+	Translate text into several languages, asking the model for all of them in one
+	structured reply.
+
+	Languages come from the translation memory (and the Item Translation of item_code)
+	first. A language the reply leaves out is retried on its own through
+	ai_translate_text, which also handles long texts and provider fallback. Returns
+	{code: result in the ai_translate_text response shape} and the number of
+	multi-target requests made.
+	"""
+	from ai_translate.translate import ai_translate_text
+
+	text = text.strip()
+	model = providers.get_model(ai_provider)
+	results = {}
+
+	stored = item_translation.lookup_languages(item_code, target_languages) if item_code else {}
+	for code in target_languages:
+		entry = item_translation.match(stored, code, text)
+		if entry:
+			results[code] = make_result(
+				entry.translated_text, source_language, code, entry.ai_provider or ai_provider,
+				entry.model, 0, cache_hit=True, item_translation=True,
+			)
+			metrics.record_translation(entry.ai_provider or ai_provider, entry.model, source_language, code, "item", 0, text)
+			continue
+
+		cached = translation_memory.lookup(text, source_language, code, ai_provider, model) if use_cache else None
+		if cached:
+			results[code] = make_result(
+				cached["translated_text"], source_language, code, cached.get("ai_provider") or ai_provider,
+				cached.get("model") or model, 0, cache_hit=True, cache_tier=cached["tier"],
+			)
+			metrics.record_translation(ai_provider, cached.get("model") or model, source_language, code, "cache", 0, text)
+
+	# Texts that need segmenting for some language go through the single-text path
+	missing = [code for code in target_languages if code not in results]
+	if len(missing) > 1 and not any(segmentation.is_long_text(text, code, ai_provider) for code in missing):
+		groups = plan_groups(text, missing, ai_provider)
+	else:
+		groups = []
+
+	requests_made = 0
+	for group in groups:
+		try:
+			translations, missed, usage, elapsed = translate_group(text, group, source_language, ai_provider)
+		except provider_health.ProviderUnavailable:
+			break
+		except Exception as e:
+			logger.warning(f"Multi-target translation into {len(group)} languages failed with {ai_provider}: {str(e)}")
+			requests_made += 1
+			continue
+
+		requests_made += 1
+		per_language_time = elapsed / max(len(translations), 1)
+		for position, (code, translated_text) in enumerate(translations.items()):
+			if use_cache:
+				translation_memory.store(text, source_language, code, ai_provider, model, translated_text)
+			results[code] = make_result(
+				translated_text, source_language, code, ai_provider, model, per_language_time, multi_target=True,
+				glossary_missed=missed[code],
+			)
+			# The request's token usage is logged once, with its first language
+			metrics.record_translation(
+				ai_provider, model, source_language, code, "batch", per_language_time, text,
+				usage if position == 0 else None,
+			)
+
+	# Whatever the structured replies did not cover is retried one language at a time
+	retry = [code for code in target_languages if code not in results]
+	outcomes = map_in_threads(
+		lambda code: ai_translate_text(text, code, source_language, ai_provider, use_cache=int(use_cache), hedge=0),
+		retry,
+		ai_provider,
+	)
+	for code, outcome in zip(retry, outcomes):
+		if isinstance(outcome, Exception):
+			outcome = {"success": False, "error": str(outcome), "translated_text": "", "ai_provider": ai_provider}
+		results[code] = dict(outcome, retried=True)
+
+	if item_code:
+		for code in target_languages:
+			result = results[code]
+			if result.get("success") and not result.get("item_translation"):
+				item_translation.store(
+					[(item_code, text, result["translated_text"], result.get("ai_provider"), result.get("model_used"))],
+					code,
+					{item_code: stored[code]} if code in stored else {},
+				)
+
+	return {code: results[code] for code in target_languages}, requests_made
+
+
+def check_languages(target_languages):
+	if not target_languages:
+		frappe.throw("No target languages given")
+	if len(target_languages) > MAX_TARGET_LANGUAGES:
+		frappe.throw(f"At most {MAX_TARGET_LANGUAGES} target languages can be translated at once")
@@ -0,0 +1,243 @@
+import logging
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PREFIX = "ai_translate:health:"
+PROBE_PREFIX = "ai_translate:health_probe:"
+LATENCY_PREFIX = "ai_translate:latency:"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Defaults, overridable from site_config.json
+DEFAULT_FAILURE_THRESHOLD = 5  # consecutive failures that open the circuit
+DEFAULT_COOLDOWN = 30  # seconds an open circuit rejects calls before a probe
+PROBE_TIMEOUT = 60  # seconds a half-open probe may take before another is allowed
+LATENCY_SMOOTHING = 0.2
+HEALTH_TTL = 7 * 24 * 3600
+LATENCY_SAMPLES = 200  # most recent single-text latencies kept per provider
+MIN_LATENCY_SAMPLES = 20  # fewer samples than this give no percentile
+SAMPLES_CACHE_TTL = 30  # seconds a worker reuses the samples it read from Redis
+
+# KEYS: health hash. ARGV: now, error, failure threshold, cooldown, ttl.
+# Counts the failure and opens the circuit in one step, so concurrent failures in
+# different workers all count. Returns 1 when the circuit was not open before.
+FAILURE_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+local opened_at = tonumber(redis.call('HGET', KEYS[1], 'opened_at') or '') or 0
+local half_open = state == 'open' and tonumber(ARGV[1]) - opened_at >= tonumber(ARGV[4])
+
+local consecutive = redis.call('HINCRBY', KEYS[1], 'consecutive_failures', 1)
+redis.call('HINCRBY', KEYS[1], 'failures', 1)
+redis.call('HSET', KEYS[1], 'last_error', ARGV[2], 'last_failure_at', ARGV[1])
+
+local opened = 0
+-- A failed probe re-opens immediately; otherwise open after repeated failures
+if half_open or consecutive >= tonumber(ARGV[3]) then
+	redis.call('HSET', KEYS[1], 'state', 'open', 'opened_at', ARGV[1])
+	if state ~= 'open' or half_open then
+		opened = 1
+	end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return opened
+"""
+
+# KEYS: health hash. ARGV: now, latency, smoothing, ttl. Returns the previous state.
+SUCCESS_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state') or 'closed'
+local latency = tonumber(ARGV[2])
+local previous = tonumber(redis.call('HGET', KEYS[1], 'latency_ewma') or '')
+if previous then
+	latency = previous + tonumber(ARGV[3]) * (latency - previous)
+end
+
+redis.call('HSET', KEYS[1], 'state', 'closed', 'consecutive_failures', 0, 'opened_at', '',
+	'last_success_at', ARGV[1], 'latency_ewma', tostring(latency))
+redis.call('HINCRBY', KEYS[1], 'successes', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return state
+"""
+
+COUNTERS = ("consecutive_failures", "successes", "failures")
+TIMESTAMPS = ("opened_at", "last_failure_at", "last_success_at", "latency_ewma")
+
+_latency_samples = {}
+_scripts = {}
+
+
+class ProviderUnavailable(Exception):
+	"""
+	Raised instead of calling a provider whose circuit breaker is open
+	"""
+
+
+def get_failure_threshold():
+	return cint(frappe.conf.get("ai_translate_breaker_failures")) or DEFAULT_FAILURE_THRESHOLD
+
+
+def get_cooldown():
+	return flt(frappe.conf.get("ai_translate_breaker_cooldown")) or DEFAULT_COOLDOWN
+
+
+def get_health(provider):
+	"""
+	The provider's health as stored in Redis, read fresh on every call
+	"""
+	cache = frappe.cache()
+	# A pipeline reads the raw hash, bypassing the wrapper's unpickling and request cache
+	pipe = cache.pipeline(transaction=False)
+	pipe.hgetall(_health_key(provider))
+	stored = {
+		(key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+		for key, value in (pipe.execute()[0] or {}).items()
+	}
+
+	health = {"state": stored.get("state") or CLOSED, "last_error": stored.get("last_error") or None}
+	for field in COUNTERS:
+		health[field] = cint(stored.get(field))
+	for field in TIMESTAMPS:
+		health[field] = flt(stored[field]) if stored.get(field) else None
+	return health
+
+
+def _health_key(provider):
+	return frappe.cache().make_key(HEALTH_PREFIX + provider)
+
+
+def _run_script(name, source, keys, args):
+	script = _scripts.get(name)
+	if script is None:
+		script = _scripts[name] = frappe.cache().register_script(source)
+	return script(keys=keys, args=args, client=frappe.cache())
+
+
+def get_state(provider, health=None):
+	"""
+	Effective state: an open circuit whose cooldown has elapsed reads as half-open
+	"""
+	health = health or get_health(provider)
+	if health["state"] == OPEN and time.time() - (health["opened_at"] or 0) >= get_cooldown():
+		return HALF_OPEN
+	return health["state"]
+
+
+def is_available(provider):
+	"""
+	False while the provider's circuit is open; does not claim the half-open probe
+	"""
+	return get_state(provider) != OPEN
+
+
+def allow_request(provider):
+	"""
+	Whether a call may go out now. In the half-open state only one caller across all
+	workers wins the probe; everyone else is rejected until the probe reports back.
+	"""
+	state = get_state(provider)
+	if state == CLOSED:
+		return True
+	if state == OPEN:
+		return False
+
+	cache = frappe.cache()
+	return bool(cache.set(cache.make_key(PROBE_PREFIX + provider), 1, nx=True, ex=PROBE_TIMEOUT))
+
+
+def record_success(provider, latency):
+	previous_state = _run_script(
+		"success", SUCCESS_SCRIPT, [_health_key(provider)], [time.time(), latency, LATENCY_SMOOTHING, HEALTH_TTL]
+	)
+	if isinstance(previous_state, bytes):
+		previous_state = previous_state.decode()
+	if previous_state != CLOSED:
+		logger.info(f"Provider {provider} recovered, closing circuit")
+	_release_probe(provider)
+
+
+def record_failure(provider, error):
+	error = str(error)[:500]
+	opened = _run_script(
+		"failure",
+		FAILURE_SCRIPT,
+		[_health_key(provider)],
+		[time.time(), error, get_failure_threshold(), get_cooldown(), HEALTH_TTL],
+	)
+	if cint(opened):
+		logger.warning(f"Opening circuit for provider {provider}: {error}")
+	_release_probe(provider)
+
+
+def record_latency(provider, latency):
+	"""
+	Add one end-to-end single-text translation time to the provider's rolling window
+	"""
+	cache = frappe.cache()
+	cache.lpush(LATENCY_PREFIX + provider, round(latency, 4))
+	cache.ltrim(LATENCY_PREFIX + provider, 0, LATENCY_SAMPLES - 1)
+
+
+def get_latency_samples(provider):
+	key = (frappe.local.site, provider)
+	cached = _latency_samples.get(key)
+	if cached and time.monotonic() - cached[0] < SAMPLES_CACHE_TTL:
+		return cached[1]
+
+	raw = frappe.cache().lrange(LATENCY_PREFIX + provider, 0, -1) or []
+	samples = sorted(float(value) for value in raw)
+	_latency_samples[key] = (time.monotonic(), samples)
+	return samples
+
+
+def get_latency_percentile(provider, percentile=0.95):
+	"""
+	Latency (seconds) below which the given fraction of recent calls finished, or None
+	while there are too few samples
+	"""
+	samples = get_latency_samples(provider)
+	if len(samples) < MIN_LATENCY_SAMPLES:
+		return None
+	return samples[min(int(len(samples) * percentile), len(samples) - 1)]
+
+
+def _release_probe(provider):
+	cache = frappe.cache()
+	cache.delete(cache.make_key(PROBE_PREFIX + provider))
+
+
+@frappe.whitelist()
+def get_provider_health():
+	"""
+	Circuit state, error counts and latency for every provider
+	"""
+	from ai_translate.providers import get_provider_names
+
+	report = {}
+	for provider in get_provider_names():
+		health = get_health(provider)
+		report[provider] = dict(
+			health,
+			state=get_state(provider, health),
+			latency_p50=get_latency_percentile(provider, 0.5),
+			latency_p95=get_latency_percentile(provider, 0.95),
+		)
+	return report
+
+
+@frappe.whitelist()
+def reset_provider_health(provider=None):
+	frappe.only_for("System Manager")
+
+	from ai_translate.providers import get_provider_names
+
+	for name in [provider] if provider else get_provider_names():
+		frappe.cache().delete_value([HEALTH_PREFIX + name, LATENCY_PREFIX + name])
+		_latency_samples.pop((frappe.local.site, name), None)
+		_release_probe(name)
+
+	return {"success": True}
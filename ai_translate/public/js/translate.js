@@ -18,6 +18,7 @@ $(document).ready(function() {
 frappe.ui.form.on('Sales Invoice', {
     onload: function(frm) {
         console.log('Sales Invoice onload triggered');
+        listen_for_auto_translation();
         setTimeout(function() {
             add_ai_buttons_force(frm);
             // Removed grid buttons - add_grid_buttons_force(frm);
@@ -51,6 +52,17 @@ frappe.ui.form.on('Sales Invoice', {
     }
 });
 
+// Rows translated in the background after a save: show them unless the user has unsaved edits
+function listen_for_auto_translation() {
+    frappe.realtime.off('ai_translate_auto_translation');
+    frappe.realtime.on('ai_translate_auto_translation', function(data) {
+        if (cur_frm && cur_frm.doctype === 'Sales Invoice' && cur_frm.doc.name === data.invoice
+                && data.translated && !cur_frm.is_dirty()) {
+            cur_frm.reload_doc();
+        }
+    });
+}
+
 function add_ai_buttons_force(frm) {
     console.log('Adding AI buttons to form');
     
@@ -256,6 +268,11 @@ function perform_bulk_ai_translation(frm, items) {
     var language_code = get_language_code(target_language);
     var ai_provider = frm.doc.custom_ai_provider || 'groq';
     
+    if (items.length === 1) {
+        stream_row_translation(frm, items[0], language_code, ai_provider);
+        return;
+    }
+    
     frappe.show_progress('AI Bulk Translation', 0, 100, 'Preparing bulk translation request...');
     
     var items_data = [];
@@ -266,6 +283,11 @@ function perform_bulk_ai_translation(frm, items) {
         });
     }
     
+    if (items_data.length >= BACKGROUND_TRANSLATION_THRESHOLD) {
+        start_background_translation(frm, items, items_data, language_code, ai_provider, 'AI Bulk Translation');
+        return;
+    }
+    
     frappe.call({
         method: 'ai_translate.translate.bulk_ai_translate_items',
         args: {
@@ -324,6 +346,11 @@ function perform_bulk_translation(frm, settings) {
     
     var language_code = get_language_code(settings.target_language);
     
+    if (items_to_translate.length === 1) {
+        stream_row_translation(frm, items_to_translate[0], language_code, settings.ai_provider);
+        return;
+    }
+    
     frappe.show_progress('Smart AI Translation', 0, 100, 'Preparing smart translation...');
     
     var items_data = [];
@@ -334,6 +361,12 @@ function perform_bulk_translation(frm, settings) {
         });
     }
     
+    if (items_data.length >= BACKGROUND_TRANSLATION_THRESHOLD) {
+        start_background_translation(frm, items_to_translate, items_data, language_code,
+            settings.ai_provider, 'Smart AI Translation');
+        return;
+    }
+    
     frappe.call({
         method: 'ai_translate.translate.bulk_ai_translate_items',
         args: {
@@ -370,6 +403,143 @@ function perform_bulk_translation(frm, settings) {
     });
 }
 
+// A single description is streamed into its row while the provider generates it
+function stream_row_translation(frm, row, language_code, ai_provider) {
+    var stream_id = frappe.utils.get_random(10);
+    
+    function on_partial(data) {
+        if (!data || data.stream_id !== stream_id || data.done) return;
+        row.custom_translated_description = data.text;
+        frm.refresh_field('items');
+    }
+    
+    frappe.realtime.on('ai_translate_stream', on_partial);
+    frappe.show_alert({
+        message: 'Translating with ' + ai_provider.toUpperCase() + '...',
+        indicator: 'blue'
+    });
+    
+    frappe.call({
+        method: 'ai_translate.streaming.stream_translate_text',
+        args: {
+            text: row.description,
+            target_language: language_code,
+            ai_provider: ai_provider,
+            stream_id: stream_id
+        },
+        callback: function(response) {
+            frappe.realtime.off('ai_translate_stream', on_partial);
+            var result = response.message;
+            if (result && result.success && result.translated_text) {
+                frappe.model.set_value(row.doctype, row.name, 'custom_translated_description',
+                    result.translated_text);
+                frappe.show_alert({
+                    message: 'Translation complete (' + (result.processing_time || 0).toFixed(1) + 's)',
+                    indicator: 'green'
+                });
+            } else {
+                frappe.msgprint({
+                    title: 'Translation Failed',
+                    message: 'AI translation failed: ' + ((result && result.error) || 'Unknown error'),
+                    indicator: 'red'
+                });
+            }
+            frm.refresh_field('items');
+        },
+        error: function() {
+            frappe.realtime.off('ai_translate_stream', on_partial);
+        }
+    });
+}
+
+// Invoices with at least this many items are translated in a background job
+var BACKGROUND_TRANSLATION_THRESHOLD = 20;
+
+function start_background_translation(frm, items, items_data, language_code, ai_provider, progress_title) {
+    frappe.show_progress(progress_title, 0, items_data.length, 'Queueing background translation...');
+    
+    frappe.call({
+        method: 'ai_translate.jobs.enqueue_bulk_translation',
+        args: {
+            items_data: JSON.stringify(items_data),
+            target_language: language_code,
+            ai_provider: ai_provider
+        },
+        callback: function(response) {
+            if (response.message && response.message.job_id) {
+                track_background_translation(frm, items, response.message.job_id, progress_title);
+            } else {
+                frappe.hide_progress();
+                frappe.msgprint({
+                    title: 'Translation Failed',
+                    message: 'Could not start the background translation job. Please try again.',
+                    indicator: 'red'
+                });
+            }
+        }
+    });
+}
+
+function track_background_translation(frm, items, job_id, progress_title) {
+    var applied = {};
+    var finished = false;
+    var poll_timer = null;
+    
+    function apply_result(index, result) {
+        if (applied[index] || !result) return;
+        applied[index] = true;
+        if (result.success && result.translated_text && items[index]) {
+            frappe.model.set_value(items[index].doctype, items[index].name, 'custom_translated_description',
+                result.translated_text);
+        }
+    }
+    
+    function finish(status) {
+        if (finished) return;
+        finished = true;
+        frappe.realtime.off('ai_translate_bulk_progress', on_progress);
+        clearInterval(poll_timer);
+        frappe.hide_progress();
+        frm.refresh_fields();
+        
+        if (status.status === 'finished' && status.summary) {
+            show_bulk_results(status.summary);
+        } else {
+            frappe.msgprint({
+                title: 'Translation Failed',
+                message: 'Background translation failed: ' + (status.error || 'Unknown error'),
+                indicator: 'red'
+            });
+        }
+    }
+    
+    function on_progress(data) {
+        if (!data || data.job_id !== job_id) return;
+        if (data.result) apply_result(data.index, data.result);
+        frappe.show_progress(progress_title, data.completed || 0, data.total || items.length,
+            'Translated ' + (data.completed || 0) + ' of ' + (data.total || items.length) + ' items');
+        if (data.status === 'finished' || data.status === 'failed') finish(data);
+    }
+    
+    frappe.realtime.on('ai_translate_bulk_progress', on_progress);
+    
+    // Polling fallback for clients without a realtime connection
+    poll_timer = setInterval(function() {
+        frappe.call({
+            method: 'ai_translate.jobs.get_bulk_translation_status',
+            args: { job_id: job_id },
+            callback: function(response) {
+                var status = response.message;
+                if (!status || finished) return;
+                (status.results || []).forEach(function(row) {
+                    apply_result(row.index, row.result);
+                });
+                on_progress(status);
+            }
+        });
+    }, 5000);
+}
+
 function show_bulk_results(summary) {
     var success_rate = ((summary.successful_translations / summary.total_items) * 100).toFixed(1);
     var cost_estimate = ((summary.total_items || 0) * 0.001).toFixed(3);
@@ -441,7 +611,8 @@ function test_single_provider(provider) {
             text: 'High-quality professional business solution',
             target_language: 'ar',
             source_language: 'en',
-            ai_provider: provider
+            ai_provider: provider,
+            hedge: 0
         },
         callback: function(response) {
             if (response.message && response.message.success) {
@@ -596,6 +767,7 @@ function clear_all_translations(frm) {
             for (var i = 0; i < frm.doc.items.length; i++) {
                 var item = frm.doc.items[i];
                 frappe.model.set_value(item.doctype, item.name, 'custom_translated_description', '');
+                frappe.model.set_value(item.doctype, item.name, 'custom_source_hash', '');
             }
             
             frappe.show_alert({
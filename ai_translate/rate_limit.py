@@ -0,0 +1,299 @@
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import frappe
+from frappe.utils import cint, flt
+
+logger = logging.getLogger(__name__)
+
+BUCKET_PREFIX = "ai_translate:ratelimit:"
+LIMITS_PREFIX = "ai_translate:ratelimit_learned:"
+
+DEFAULT_MAX_WAIT = 30  # seconds a caller may be queued before giving up
+DEFAULT_429_RETRIES = 3
+DEFAULT_RETRY_AFTER = 2  # seconds to back off on a 429 without usable headers
+LEARNED_LIMITS_TTL = 3600
+LOCAL_LIMITS_TTL = 60  # seconds a worker reuses learned limits it read from Redis
+
+# Providers whose x-ratelimit-*-requests headers describe a daily, not per-minute, quota
+DAILY_REQUEST_HEADERS = ("groq",)
+
+# KEYS: request bucket, token bucket, block key. ARGV: rpm, request cost, tpm, token cost.
+# A limit of 0 disables that bucket. Consumes from both buckets only if both have room,
+# otherwise returns the seconds to wait (as a string, Lua numbers become integers).
+ACQUIRE_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local blocked = tonumber(redis.call('GET', KEYS[3]) or '0')
+if blocked > now then
+	return tostring(blocked - now)
+end
+
+local wait = 0
+local levels = {}
+local costs = {}
+for i = 1, 2 do
+	local capacity = tonumber(ARGV[i * 2 - 1])
+	if capacity > 0 then
+		local rate = capacity / 60
+		local cost = math.min(tonumber(ARGV[i * 2]), capacity)
+		local state = redis.call('HMGET', KEYS[i], 'level', 'updated')
+		local level = tonumber(state[1]) or capacity
+		local updated = tonumber(state[2]) or now
+		level = math.min(capacity, level + math.max(now - updated, 0) * rate)
+		if level < cost then
+			wait = math.max(wait, (cost - level) / rate)
+		end
+		levels[i] = level
+		costs[i] = cost
+	end
+end
+
+if wait > 0 then
+	return tostring(wait)
+end
+
+for i = 1, 2 do
+	if levels[i] then
+		redis.call('HSET', KEYS[i], 'level', levels[i] - costs[i], 'updated', now)
+		redis.call('EXPIRE', KEYS[i], 120)
+	end
+end
+return '0'
+"""
+
+# KEYS: block key. ARGV: seconds. Extends (never shortens) the shared back-off window.
+BLOCK_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local blocked_until = now + tonumber(ARGV[1])
+if blocked_until > tonumber(redis.call('GET', KEYS[1]) or '0') then
+	redis.call('SET', KEYS[1], tostring(blocked_until), 'EX', math.ceil(tonumber(ARGV[1])) + 1)
+end
+return 1
+"""
+
+_scripts = {}
+_learned_limits = {}
+
+
+class RateLimited(Exception):
+	"""
+	Raised when a caller would have to wait longer than ai_translate_rate_limit_max_wait
+	"""
+
+
+def key_fingerprint(headers):
+	"""
+	Short hash identifying the API key a request is sent with, so limits are shared
+	per key without the key itself ending up in Redis
+	"""
+	headers = headers or {}
+	secret = headers.get("Authorization") or headers.get("x-api-key") or ""
+	if not secret:
+		return "default"
+	return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+def estimate_request_tokens(payload):
+	"""
+	Upper-bound token cost of a completion request: prompt (about three characters per
+	token) plus the completion budget, which providers count against TPM up front
+	"""
+	if not payload:
+		return 1
+	prompt_tokens = len(json.dumps(payload, ensure_ascii=False)) // 3
+	return prompt_tokens + cint(payload.get("max_tokens"))
+
+
+def get_max_wait():
+	return flt(frappe.conf.get("ai_translate_rate_limit_max_wait")) or DEFAULT_MAX_WAIT
+
+
+def get_429_retries():
+	retries = frappe.conf.get("ai_translate_rate_limit_retries")
+	return DEFAULT_429_RETRIES if retries is None else cint(retries)
+
+
+def get_limits(provider, key_id):
+	"""
+	(requests per minute, tokens per minute) for a provider and key; 0 means unlimited.
+
+	Limits come from "ai_translate_rate_limits": {"groq": {"rpm": 30, "tpm": 6000}} in
+	site_config.json and from the provider's own rate-limit headers; the lower wins.
+	"""
+	configured = (frappe.conf.get("ai_translate_rate_limits") or {}).get(provider) or {}
+	learned = _get_learned_limits(provider, key_id)
+
+	limits = []
+	for name in ("rpm", "tpm"):
+		values = [cint(source.get(name)) for source in (configured, learned) if cint(source.get(name)) > 0]
+		limits.append(min(values) if values else 0)
+	return tuple(limits)
+
+
+def acquire(provider, key_id, tokens):
+	"""
+	Block until the shared buckets for this provider and key have room for one request
+	of the given token cost, or raise RateLimited after ai_translate_rate_limit_max_wait
+	"""
+	rpm, tpm = get_limits(provider, key_id)
+	deadline = time.monotonic() + get_max_wait()
+	keys = _bucket_keys(provider, key_id)
+
+	while True:
+		try:
+			wait = float(_run_script("acquire", ACQUIRE_SCRIPT, keys, [rpm, 1, tpm, tokens]))
+		except Exception as e:
+			# The limiter must never take translations down with it
+			logger.warning(f"Rate limiter unavailable, sending without it: {str(e)}")
+			return
+
+		if wait <= 0:
+			return
+
+		remaining = deadline - time.monotonic()
+		if wait > remaining:
+			raise RateLimited(f"Rate limit for {provider} would delay this request by {wait:.1f}s")
+
+		# Jitter keeps queued callers from all retrying in the same instant
+		time.sleep(wait + random.uniform(0, min(0.25, remaining - wait)))
+
+
+def block(provider, key_id, seconds):
+	"""
+	Make every caller using this provider and key wait for the given number of seconds
+	"""
+	try:
+		_run_script("block", BLOCK_SCRIPT, [_bucket_keys(provider, key_id)[2]], [max(seconds, 0.1)])
+	except Exception as e:
+		logger.warning(f"Could not record rate limit back-off for {provider}: {str(e)}")
+
+
+def update_from_response(provider, key_id, response):
+	"""
+	Adjust the shared limiter from a provider response: learn the real limits from its
+	rate-limit headers, and back off everyone on 429 or when a quota is exhausted.
+	Returns the back-off in seconds (0 when none).
+	"""
+	headers = response.headers
+	limits = _parse_limit_headers(provider, headers)
+	if limits:
+		_store_learned_limits(provider, key_id, limits)
+
+	delay = 0
+	if response.status_code == 429:
+		delay = _parse_retry_after(headers.get("Retry-After")) or _exhausted_reset(headers, force=True)
+		delay = delay or DEFAULT_RETRY_AFTER
+	else:
+		delay = _exhausted_reset(headers)
+
+	if delay:
+		block(provider, key_id, delay)
+	return delay
+
+
+def _bucket_keys(provider, key_id):
+	cache = frappe.cache()
+	base = f"{BUCKET_PREFIX}{provider}:{key_id}"
+	return [cache.make_key(f"{base}:requests"), cache.make_key(f"{base}:tokens"), cache.make_key(f"{base}:blocked")]
+
+
+def _run_script(name, source, keys, args):
+	script = _scripts.get(name)
+	if script is None:
+		script = _scripts[name] = frappe.cache().register_script(source)
+	return script(keys=keys, args=args, client=frappe.cache())
+
+
+def _get_learned_limits(provider, key_id):
+	key = (frappe.local.site, provider, key_id)
+	cached = _learned_limits.get(key)
+	if cached and time.monotonic() - cached[0] < LOCAL_LIMITS_TTL:
+		return cached[1]
+
+	limits = frappe.cache().get_value(f"{LIMITS_PREFIX}{provider}:{key_id}", expires=True) or {}
+	_learned_limits[key] = (time.monotonic(), limits)
+	return limits
+
+
+def _store_learned_limits(provider, key_id, limits):
+	if _get_learned_limits(provider, key_id) == limits:
+		return
+	frappe.cache().set_value(f"{LIMITS_PREFIX}{provider}:{key_id}", limits, expires_in_sec=LEARNED_LIMITS_TTL)
+	_learned_limits[(frappe.local.site, provider, key_id)] = (time.monotonic(), limits)
+
+
+def _parse_limit_headers(provider, headers):
+	limits = {}
+
+	requests_limit = headers.get("x-ratelimit-limit-requests") or headers.get("anthropic-ratelimit-requests-limit")
+	if requests_limit and provider not in DAILY_REQUEST_HEADERS:
+		limits["rpm"] = cint(requests_limit)
+
+	tokens_limit = headers.get("x-ratelimit-limit-tokens") or headers.get("anthropic-ratelimit-tokens-limit")
+	if tokens_limit:
+		limits["tpm"] = cint(tokens_limit)
+
+	return {name: value for name, value in limits.items() if value > 0}
+
+
+def _exhausted_reset(headers, force=False):
+	"""
+	Seconds until the first exhausted quota resets (any reported quota when force is set)
+	"""
+	delays = []
+	for kind in ("requests", "tokens"):
+		for remaining_header, reset_header in (
+			(f"x-ratelimit-remaining-{kind}", f"x-ratelimit-reset-{kind}"),
+			(f"anthropic-ratelimit-{kind}-remaining", f"anthropic-ratelimit-{kind}-reset"),
+		):
+			remaining = headers.get(remaining_header)
+			if remaining is None or (not force and cint(remaining) > 0):
+				continue
+			delay = _parse_reset(headers.get(reset_header))
+			if delay:
+				delays.append(delay)
+	return min(delays) if delays else 0
+
+
+def _parse_retry_after(value):
+	if not value:
+		return 0
+	try:
+		return max(float(value), 0)
+	except ValueError:
+		pass
+	try:
+		return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0)
+	except (TypeError, ValueError):
+		return 0
+
+
+def _parse_reset(value):
+	"""
+	Seconds from a reset header: Go-style durations ("6m0s", "1.5s", "20ms") as sent by
+	OpenAI-compatible APIs, or an RFC 3339 timestamp as sent by Anthropic
+	"""
+	if not value:
+		return 0
+
+	parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+	if parts and "T" not in value:
+		scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+		return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+	try:
+		reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+		return max((reset_at - datetime.now(timezone.utc)).total_seconds(), 0)
+	except ValueError:
+		return 0
@@ -0,0 +1,173 @@
+import logging
+import re
+
+import frappe
+from frappe.utils import cint
+
+from ai_translate import providers, translation_memory
+from ai_translate.batching import estimate_output_tokens, get_output_budget
+from ai_translate.concurrency import map_in_threads
+
+logger = logging.getLogger(__name__)
+
+# Default upper bound for one segment, overridable with ai_translate_segment_chars
+DEFAULT_SEGMENT_CHARS = 1500
+MIN_SEGMENT_CHARS = 200
+
+# Boundaries tried in turn, coarsest first: paragraphs, lines, sentences, words
+SPLIT_PATTERNS = (
+	re.compile(r"(\n[^\S\n]*\n\s*)"),
+	re.compile(r"(\n)"),
+	re.compile(r"((?<=[.!?;؟])\s+|(?<=[。！？]))"),
+	re.compile(r"(\s+)"),
+)
+
+
+def get_segment_chars(provider, target_language):
+	"""
+	Longest source text (in characters) whose translation fits the provider's output budget
+	"""
+	configured = cint(frappe.conf.get("ai_translate_segment_chars")) or DEFAULT_SEGMENT_CHARS
+	output_budget, _context = get_output_budget(provider)
+	tokens_per_char = estimate_output_tokens("x" * 300, target_language) / 300
+	return max(MIN_SEGMENT_CHARS, min(configured, int(output_budget / tokens_per_char)))
+
+
+def is_long_text(text, target_language, provider):
+	return len(text or "") > get_segment_chars(provider, target_language)
+
+
+def split_text(text, max_chars):
+	"""
+	Split text into (segment, separator) pairs no longer than max_chars, breaking at
+	paragraphs first, then lines, sentences and words. Joining every segment with its
+	separator reproduces text exactly.
+
+	Adjacent short paragraphs are packed into one segment up to max_chars, so a long
+	text of short paragraphs takes as few requests as its length allows.
+	"""
+	segments = []
+	for segment, separator in _pack(text, "", max_chars, 0):
+		_emit(segments, segment, separator)
+	return segments or [(text, "")]
+
+
+def _pieces(text, pattern):
+	parts = pattern.split(text)
+	return list(zip(parts[0::2], parts[1::2] + [""]))
+
+
+def _pack(block, trailing_separator, max_chars, level):
+	if len(block) <= max_chars:
+		return [(block, trailing_separator)]
+	if level >= len(SPLIT_PATTERNS):
+		# A single unbreakable run of characters
+		cuts = [block[i : i + max_chars] for i in range(0, len(block), max_chars)]
+		return [(cut, "") for cut in cuts[:-1]] + [(cuts[-1], trailing_separator)]
+
+	segments = []
+	current = ""
+	pending_separator = ""
+	for piece, separator in _pieces(block, SPLIT_PATTERNS[level]):
+		if len(piece) > max_chars:
+			_emit(segments, current, pending_separator)
+			segments.extend(_pack(piece, separator, max_chars, level + 1))
+			current, pending_separator = "", ""
+			continue
+
+		if current and len(current) + len(pending_separator) + len(piece) > max_chars:
+			segments.append((current, pending_separator))
+			current, pending_separator = "", ""
+		if current:
+			current = current + pending_separator + piece
+		else:
+			# A separator with no text before it (leading whitespace, indentation after
+			# an over-long piece) still has to come out ahead of this piece
+			_emit(segments, "", pending_separator)
+			current = piece
+		pending_separator = separator
+
+	_emit(segments, current, pending_separator + trailing_separator)
+	return segments
+
+
+def _emit(segments, text, separator):
+	"""
+	Append text with the separator that follows it; a bare separator extends the
+	previous segment's
+	"""
+	if text:
+		segments.append((text, separator))
+	elif separator:
+		if segments:
+			last, last_separator = segments[-1]
+			segments[-1] = (last, last_separator + separator)
+		else:
+			segments.append(("", separator))
+
+
+def translate_segment(text, target_language, source_language, provider):
+	from ai_translate.translate import clean_translation_response
+
+	adapter = providers.get_adapter(provider)
+	system_prompt, user_prompt = adapter.translation_prompts(text, target_language, source_language)
+	max_tokens = adapter.completion_budget(text, target_language)
+
+	reply, data = adapter.send(system_prompt, user_prompt, max_tokens=max_tokens)
+	translated_text = clean_translation_response(reply, keep_newlines=True)
+	if not translated_text:
+		raise Exception(f"{provider} returned empty translation for a segment")
+	return translated_text, adapter.usage(data)
+
+
+def translate_long_text(text, target_language, source_language, provider, use_cache=True):
+	"""
+	Translate a text too long for one request: segments are looked up in the translation
+	memory, the rest translated in parallel, and the result reassembled in order with the
+	original paragraph and line breaks. Returns the translate_with_*_natural dict.
+	"""
+	model = providers.get_model(provider)
+	segments = split_text(text, get_segment_chars(provider, target_language))
+	translations = [None] * len(segments)
+
+	misses = []
+	for position, (segment, _separator) in enumerate(segments):
+		if not segment.strip():
+			translations[position] = segment
+			continue
+		cached = use_cache and translation_memory.lookup(segment, source_language, target_language, provider, model)
+		if cached:
+			translations[position] = cached["translated_text"]
+		else:
+			misses.append((position, segment))
+
+	results = map_in_threads(
+		lambda entry: translate_segment(entry[1], target_language, source_language, provider), misses, provider
+	)
+
+	errors = []
+	usages = []
+	for (position, segment), result in zip(misses, results):
+		if isinstance(result, Exception):
+			errors.append(result)
+			continue
+		translations[position], usage = result
+		usages.append(usage)
+		if use_cache:
+			# Also kept when another segment failed, so a retry only re-does the failures
+			translation_memory.store(segment, source_language, target_language, provider, model, translations[position])
+
+	if errors:
+		raise Exception(f"{len(errors)} of {len(segments)} segments failed: {str(errors[0])}")
+
+	return {
+		"translated_text": "".join(
+			translation + separator for translation, (_segment, separator) in zip(translations, segments)
+		).strip(),
+		"confidence": 0.95,
+		"model": model,
+		"provider": provider,
+		"segments": len(segments),
+		"segments_cached": len(segments) - len(misses),
+		"usage": providers.merge_usage(usages),
+	}
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import frappe
+import requests
+from frappe.utils import cint
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ai_translate import provider_health, rate_limit
+from ai_translate.concurrency import provider_slot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_RETRIES = 2
+
+# Transient gateway errors worth retrying on a fresh connection. 429 is handled by rate_limit.
+RETRY_STATUSES = (502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_sessions_pid = os.getpid()
+
+# Replaces _send for every request while set, see use_transport
+_transport = None
+
+
+def get_session(provider):
+	"""
+	Keep-alive session for a provider, created on first use and reused by every
+	request and job handled by this worker process
+	"""
+	_reset_after_fork()
+
+	session = _sessions.get(provider)
+	if session is None:
+		with _sessions_lock:
+			session = _sessions.get(provider)
+			if session is None:
+				session = _create_session(provider)
+				_sessions[provider] = session
+	return session
+
+
+def post(provider, url, headers=None, json=None, timeout=30, stream=False):
+	"""
+	POST through the provider's pooled session while holding one of its in-flight slots.
+
+	Requests first wait for room in the cluster-wide rate limiter shared by everyone
+	using the same API key; a 429 backs everyone off and is retried after the delay
+	the provider asked for. Every outcome is reported to the provider health registry;
+	while the provider's circuit is open this raises ProviderUnavailable without
+	touching the network.
+
+	With stream the body is left unread for iter_lines; the caller must close the response.
+	"""
+	if not provider_health.allow_request(provider):
+		raise provider_health.ProviderUnavailable(f"Provider {provider} is unavailable (circuit open)")
+
+	key_id = rate_limit.key_fingerprint(headers)
+	tokens = rate_limit.estimate_request_tokens(json)
+	retries = rate_limit.get_429_retries()
+
+	for attempt in range(retries + 1):
+		rate_limit.acquire(provider, key_id, tokens)
+
+		with provider_slot(provider):
+			start = time.monotonic()
+			try:
+				response = (_transport or _send)(get_session(provider), url, headers, json, timeout, stream)
+			except Exception as e:
+				provider_health.record_failure(provider, e)
+				raise
+
+		delay = rate_limit.update_from_response(provider, key_id, response)
+		if response.status_code != 429 or attempt == retries:
+			break
+		response.close()
+		logger.info(f"Rate limited by {provider}, retrying in {delay:.1f}s")
+
+	# Client errors (bad key, bad request) say nothing about the provider being down
+	if response.status_code >= 500 or response.status_code == 429:
+		provider_health.record_failure(provider, f"HTTP {response.status_code}")
+	else:
+		provider_health.record_success(provider, time.monotonic() - start)
+	return response
+
+
+@contextmanager
+def use_transport(transport):
+	"""
+	Send every request of this process through transport(session, url, headers, json,
+	timeout, stream) instead of the pooled session, e.g. the record/replay transport of
+	ai_translate.benchmarks. Rate limiting, health tracking and slots still apply.
+	"""
+	global _transport
+
+	previous, _transport = _transport, transport
+	try:
+		yield
+	finally:
+		_transport = previous
+
+
+def iter_lines(response):
+	"""
+	Decoded lines of a streamed response from either transport
+	"""
+	if isinstance(response, requests.Response):
+		# Server-sent events are UTF-8 but rarely declare a charset
+		response.encoding = response.encoding or "utf-8"
+		return response.iter_lines(decode_unicode=True)
+	return response.iter_lines()
+
+
+def _send(session, url, headers, json, timeout, stream):
+	if not stream:
+		return session.post(url, headers=headers, json=json, timeout=timeout)
+	if isinstance(session, requests.Session):
+		return session.post(url, headers=headers, json=json, timeout=timeout, stream=True)
+	# httpx streams through send(); the body is then read lazily by iter_lines
+	request = session.build_request("POST", url, headers=headers, json=json, timeout=timeout)
+	return session.send(request, stream=True)
+
+
+def close_sessions():
+	with _sessions_lock:
+		for session in _sessions.values():
+			try:
+				session.close()
+			except Exception:
+				pass
+		_sessions.clear()
+
+
+def _reset_after_fork():
+	# Pooled sockets must not be shared between a parent and its forked workers
+	global _sessions_pid
+
+	if _sessions_pid != os.getpid():
+		with _sessions_lock:
+			if _sessions_pid != os.getpid():
+				_sessions.clear()
+				_sessions_pid = os.getpid()
+
+
+def _create_session(provider):
+	pool_size = cint(frappe.conf.get("ai_translate_http_pool_size")) or DEFAULT_POOL_SIZE
+	retries = frappe.conf.get("ai_translate_http_retries")
+	retries = DEFAULT_RETRIES if retries is None else cint(retries)
+
+	if cint(frappe.conf.get("ai_translate_http2")):
+		client = _create_http2_client(pool_size, retries)
+		if client is not None:
+			return client
+
+	retry = Retry(
+		total=retries,
+		connect=retries,
+		read=0,
+		status=retries,
+		status_forcelist=RETRY_STATUSES,
+		allowed_methods=frozenset({"POST"}),
+		backoff_factor=0.25,
+		respect_retry_after_header=True,
+		raise_on_status=False,
+	)
+	adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+	session = requests.Session()
+	session.mount("https://", adapter)
+	session.mount("http://", adapter)
+	return session
+
+
+def _create_http2_client(pool_size, retries):
+	"""
+	Optional HTTP/2 transport; needs `pip install "httpx[http2]"`
+	"""
+	try:
+		import httpx
+
+		transport = httpx.HTTPTransport(
+			http2=True,
+			retries=retries,
+			limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+		)
+		return httpx.Client(transport=transport)
+	except ImportError:
+		logger.warning("ai_translate_http2 is set but httpx[http2] is not installed, using HTTP/1.1")
+		return None
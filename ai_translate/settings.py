@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import frappe
+
+from ai_translate import providers
+
+# Seconds between checks of the site config files for changes
+CHECK_INTERVAL = 5
+
+LANGUAGE_NAMES = {
+	"ar": "Arabic",
+	"es": "Spanish",
+	"fr": "French",
+	"de": "German",
+	"it": "Italian",
+	"pt": "Portuguese",
+	"ru": "Russian",
+	"ja": "Japanese",
+	"ko": "Korean",
+	"zh": "Chinese",
+	"zh-tw": "Traditional Chinese",
+	"hi": "Hindi",
+	"ur": "Urdu",
+	"tr": "Turkish",
+	"nl": "Dutch",
+	"sv": "Swedish",
+	"da": "Danish",
+	"no": "Norwegian",
+	"fi": "Finnish",
+	"en": "English",
+}
+
+NATIVE_LANGUAGE_NAMES = {
+	"ar": "العربية",
+	"es": "Español",
+	"fr": "Français",
+	"de": "Deutsch",
+	"it": "Italiano",
+	"pt": "Português",
+	"ru": "Русский",
+	"ja": "日本語",
+	"ko": "한국어",
+	"zh": "中文",
+	"zh-tw": "中文(繁體)",
+	"hi": "हिन्दी",
+	"ur": "اردو",
+	"tr": "Türkçe",
+	"nl": "Nederlands",
+	"sv": "Svenska",
+	"da": "Dansk",
+	"no": "Norsk",
+	"fi": "Suomi",
+	"en": "English",
+}
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ResolvedConfig:
+	"""
+	Everything the translation pipeline reads from site config, resolved once per site
+	and process: provider adapters with their API keys, models and timeouts, and the
+	language tables. Treat it as read-only.
+	"""
+
+	site: str
+	version: tuple
+	providers: dict
+	provider_names: tuple
+	configured_providers: frozenset
+	language_names: dict
+	native_language_names: dict
+
+	def get_adapter(self, name):
+		return self.providers.get(name)
+
+	def is_known(self, name):
+		return name in self.providers
+
+	def has_api_key(self, name):
+		return name in self.configured_providers
+
+	def get_api_key(self, name):
+		adapter = self.providers.get(name)
+		return adapter.api_key if adapter else ""
+
+	def get_model(self, name, default="auto"):
+		adapter = self.providers.get(name)
+		return adapter.model if adapter else default
+
+	def language_name(self, code, default=None):
+		return self.language_names.get(code, code if default is None else default)
+
+
+def get_config():
+	"""
+	The resolved configuration of the current site. Rebuilt when site_config.json or
+	common_site_config.json has changed, which is checked at most every CHECK_INTERVAL seconds.
+	"""
+	site = frappe.local.site
+	entry = _snapshots.get(site)
+	now = time.monotonic()
+	if entry and now - entry[1] < CHECK_INTERVAL:
+		return entry[0]
+
+	with _snapshots_lock:
+		version = _config_version()
+		snapshot = entry[0] if entry and entry[0].version == version else _resolve(site, version)
+		_snapshots[site] = (snapshot, now)
+	return snapshot
+
+
+def invalidate_config(site=None):
+	with _snapshots_lock:
+		if site:
+			_snapshots.pop(site, None)
+		else:
+			_snapshots.clear()
+
+
+def _config_version():
+	paths = (
+		frappe.get_site_path("site_config.json"),
+		os.path.join(frappe.local.sites_path, "common_site_config.json"),
+	)
+	return tuple(os.path.getmtime(path) if os.path.exists(path) else 0 for path in paths)
+
+
+def _resolve(site, version):
+	registry = providers.build_registry(frappe.conf.get("ai_translate_providers") or {})
+	preferred = [name for name in providers.DEFAULT_PREFERENCE if name in registry]
+
+	# "ai_translate_languages": {"sw": "Swahili"} adds or renames target languages
+	extra_languages = frappe.conf.get("ai_translate_languages") or {}
+
+	return ResolvedConfig(
+		site=site,
+		version=version,
+		providers=registry,
+		provider_names=tuple(preferred + [name for name in registry if name not in preferred]),
+		configured_providers=frozenset(name for name, adapter in registry.items() if adapter.api_key),
+		language_names={**LANGUAGE_NAMES, **extra_languages},
+		native_language_names=NATIVE_LANGUAGE_NAMES,
+	)
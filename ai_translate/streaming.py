@@ -0,0 +1,163 @@
+import json
+import logging
+import time
+from datetime import datetime
+
+import frappe
+
+from ai_translate import fuzzy_match, glossary, metrics, providers, segmentation, translation_memory
+from ai_translate.sessions import iter_lines
+from ai_translate.sessions import post as http_post
+
+logger = logging.getLogger(__name__)
+
+REALTIME_EVENT = "ai_translate_stream"
+PUBLISH_INTERVAL = 0.15  # seconds between partial updates pushed to the browser
+HOLDBACK_CHARS = 24  # raw characters to wait for so a "Translation:" prefix can be recognised
+
+
+def stream_chat_completion(provider, system_prompt, user_prompt, max_tokens=1024, temperature=0.3, timeout=60):
+	"""
+	Yield the reply text in pieces as the provider generates it, using the OpenAI-compatible
+	``stream: true`` server-sent events or Anthropic's message event stream
+	"""
+	adapter = providers.get_adapter(provider)
+	url, headers, payload = adapter.chat_request(system_prompt, user_prompt, max_tokens, temperature, stream=True)
+
+	try:
+		response = http_post(provider, url, headers=headers, json=payload, timeout=timeout, stream=True)
+	except Exception as e:
+		metrics.record_request(provider, adapter.model, error=e)
+		raise
+
+	try:
+		if response.status_code != 200:
+			metrics.record_request(provider, adapter.model, status_code=response.status_code)
+			raise Exception(f"{provider} API error: HTTP {response.status_code}")
+		metrics.record_request(provider, adapter.model)
+
+		for line in iter_lines(response):
+			if not line or not line.startswith("data:"):
+				continue
+			data = line[5:].strip()
+			if data == "[DONE]":
+				break
+
+			delta, finished = adapter.stream_delta(json.loads(data))
+			if delta:
+				yield delta
+			if finished:
+				break
+	finally:
+		response.close()
+
+
+def stream_translation(text, target_language, source_language, provider, stream_id):
+	"""
+	Translate text with provider, publishing the cleaned partial translation as it grows.
+	Returns the same dict as the translate_with_*_natural functions.
+	"""
+	from ai_translate.translate import clean_partial_translation, clean_translation_response
+
+	adapter = providers.get_adapter(provider)
+	terms = glossary.find_terms(text, source_language, target_language)
+	system_prompt, user_prompt = adapter.translation_prompts(text, target_language, source_language, terms)
+
+	pieces = []
+	published = ""
+	last_publish = 0
+	max_tokens = adapter.completion_budget(text, target_language)
+	for delta in stream_chat_completion(provider, system_prompt, user_prompt, max_tokens):
+		pieces.append(delta)
+		now = time.monotonic()
+		if now - last_publish < PUBLISH_INTERVAL:
+			continue
+
+		raw = "".join(pieces)
+		if len(raw) < HOLDBACK_CHARS:
+			continue
+		partial = clean_partial_translation(raw)
+		if partial and partial != published:
+			publish(stream_id, partial)
+			published = partial
+			last_publish = now
+
+	translated_text = clean_translation_response("".join(pieces))
+	if not translated_text:
+		raise Exception(f"{provider} returned empty translation")
+
+	return providers.TranslationResult(
+		translated_text, provider, adapter.model, adapter.confidence,
+		glossary_missed=glossary.missed_terms(translated_text, terms),
+	).as_dict()
+
+
+@frappe.whitelist()
+def stream_translate_text(text, target_language="ar", source_language="en", ai_provider="groq", stream_id=None):
+	"""
+	ai_translate_text that pushes the translation to the caller while it is generated.
+
+	Partial text is published on the ``ai_translate_stream`` realtime event as
+	{stream_id, text, done}; the final cleaned translation is returned as usual and
+	published with done set. Cached, fuzzy-matched and segmented long texts take the
+	regular path.
+	"""
+	from ai_translate.translate import ai_translate_text
+
+	stream_id = stream_id or frappe.generate_hash(length=10)
+	text = (text or "").strip()
+
+	streamable = (
+		text
+		and providers.is_known(ai_provider)
+		and not segmentation.is_long_text(text, target_language, ai_provider)
+	)
+	model = providers.get_model(ai_provider)
+	if streamable and (
+		translation_memory.lookup(text, source_language, target_language, ai_provider, model)
+		or fuzzy_match.find_match(text, source_language, target_language)
+	):
+		streamable = False
+
+	response = None
+	if streamable:
+		start_time = datetime.now()
+		try:
+			result = stream_translation(text, target_language, source_language, ai_provider, stream_id)
+			translation_memory.store(text, source_language, target_language, ai_provider, model, result["translated_text"])
+			processing_time = (datetime.now() - start_time).total_seconds()
+			metrics.record_translation(
+				ai_provider, model, source_language, target_language, "stream", processing_time, text
+			)
+			response = {
+				"success": True,
+				"translated_text": result["translated_text"],
+				"source_language": source_language,
+				"target_language": target_language,
+				"ai_provider": ai_provider,
+				"model_used": result["model"],
+				"confidence_score": result["confidence"],
+				"processing_time": processing_time,
+				"context_aware": True,
+				"ai_enhanced": True,
+				"cache_hit": False,
+				"streamed": True,
+			}
+		except Exception as e:
+			logger.warning(f"Streaming translation with {ai_provider} failed, using regular path: {str(e)}")
+
+	if response is None:
+		response = ai_translate_text(text, target_language, source_language, ai_provider)
+		response["streamed"] = False
+
+	publish(stream_id, response.get("translated_text") or "", done=True, success=response.get("success"))
+	response["stream_id"] = stream_id
+	return response
+
+
+def publish(stream_id, text, done=False, success=True):
+	frappe.publish_realtime(
+		REALTIME_EVENT,
+		{"stream_id": stream_id, "text": text, "done": done, "success": success},
+		user=frappe.session.user,
+	)
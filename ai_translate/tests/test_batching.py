@@ -0,0 +1,46 @@
+from frappe.tests.utils import FrappeTestCase
+
+from ai_translate.batching import estimate_output_tokens, get_output_budget, parse_batch_response, plan_batches
+
+
+class TestParseBatchResponse(FrappeTestCase):
+	def test_fenced_reply_with_chatter(self):
+		raw = 'Sure, here you go:\n```json\n{"translations": [{"id": 1, "text": " أ "}, {"id": "2", "text": "ب"}]}\n```'
+		self.assertEqual(parse_batch_response(raw, [1, 2]), {1: "أ", 2: "ب"})
+
+	def test_bare_array_and_translation_key(self):
+		raw = '[{"id": 1, "translation": "أ"}, {"id": 2, "text": "ب"}]'
+		self.assertEqual(parse_batch_response(raw, [1, 2]), {1: "أ", 2: "ب"})
+
+	def test_unknown_malformed_and_empty_entries_are_dropped(self):
+		raw = '{"translations": [{"id": 3, "text": "x"}, {"id": "one", "text": "y"}, {"id": 1, "text": "  "}, "z", {"id": 2, "text": "ب"}]}'
+		self.assertEqual(parse_batch_response(raw, [1, 2]), {2: "ب"})
+
+	def test_unparsable_reply(self):
+		self.assertEqual(parse_batch_response("I cannot translate this.", [1]), {})
+		self.assertEqual(parse_batch_response('{"translations": "none"}', [1]), {})
+		self.assertEqual(parse_batch_response(None, [1]), {})
+
+
+class TestPlanBatches(FrappeTestCase):
+	def test_item_limit_keeps_order(self):
+		entries = [(index, f"text {index}") for index in range(5)]
+		batches = plan_batches(entries, "groq", "ar", max_items=2)
+		self.assertEqual(batches, [entries[0:2], entries[2:4], entries[4:]])
+
+	def test_batches_fit_the_output_budget(self):
+		output_budget, _context = get_output_budget("groq")
+		entries = [(index, "x" * 1500 * (index % 3 + 1)) for index in range(12)]
+		batches = plan_batches(entries, "groq", "ar", max_items=40)
+
+		self.assertEqual([entry for batch in batches for entry in batch], entries)
+		self.assertGreater(len(batches), 1)
+		for batch in batches:
+			planned = sum(estimate_output_tokens(text, "ar") for _id, text in batch)
+			self.assertTrue(len(batch) == 1 or planned <= output_budget)
+
+	def test_oversized_entry_gets_its_own_batch(self):
+		output_budget, _context = get_output_budget("groq")
+		huge = (1, "x" * output_budget * 3)
+		batches = plan_batches([(0, "short"), huge, (2, "short")], "groq", "ar")
+		self.assertEqual(batches, [[(0, "short")], [huge], [(2, "short")]])
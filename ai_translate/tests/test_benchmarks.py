@@ -0,0 +1,27 @@
+import os
+
+from frappe.tests.utils import FrappeTestCase
+
+from ai_translate.benchmarks import runner
+
+BASELINE = os.path.join(os.path.dirname(runner.__file__), "baseline.json")
+
+
+class TestBenchmarks(FrappeTestCase):
+	def test_simulated_server_against_baseline(self):
+		"""
+		A short run against the simulated server with a fixed 10 ms latency. The baseline
+		holds the exact upstream calls per item and generous throughput and latency
+		bounds, so only real regressions fail on a slow runner; run() raises on them.
+		"""
+		report = runner.run(
+			items=20,
+			scenarios="single,bulk,cached,stream",
+			profile={"latency": "fixed", "median": 0.01},
+			baseline=BASELINE,
+			micro=0,
+		)
+
+		for name, row in report["scenarios"].items():
+			self.assertEqual(row["failures"], 0, name)
+		self.assertEqual(report["scenarios"]["cached"]["upstream_calls_per_item"], 0)
@@ -0,0 +1,30 @@
+from frappe.tests.utils import FrappeTestCase
+
+from ai_translate.glossary import Matcher
+
+
+class TestGlossaryMatcher(FrappeTestCase):
+	def test_only_whole_words_match(self):
+		matcher = Matcher([("kit", "طقم", 0, "")])
+		self.assertEqual(matcher.find("kitchen sink"), [])
+		self.assertEqual(matcher.find("repair kit, large"), [("kit", "طقم", 0, "")])
+
+	def test_longest_overlapping_term_wins(self):
+		matcher = Matcher([("steel", "فولاذ", 0, ""), ("steel pipe", "أنبوب فولاذي", 0, "")])
+		self.assertEqual([term[0] for term in matcher.find("steel pipe fittings")], ["steel pipe"])
+		self.assertEqual([term[0] for term in matcher.find("steel bracket and steel pipe")], ["steel", "steel pipe"])
+
+	def test_terms_are_reported_once_in_order_of_first_occurrence(self):
+		matcher = Matcher([("valve", "صمام", 0, ""), ("pump", "مضخة", 0, "")])
+		self.assertEqual([term[0] for term in matcher.find("pump with valve and spare pump")], ["pump", "valve"])
+
+	def test_case(self):
+		matcher = Matcher([("Pump", "مضخة", 0, ""), ("PVC", "بي في سي", 1, "")])
+		self.assertEqual([term[0] for term in matcher.find("INDUSTRIAL PUMP")], ["Pump"])
+		self.assertEqual(matcher.find("pvc pipe"), [])
+		self.assertEqual([term[0] for term in matcher.find("PVC pipe")], ["PVC"])
+
+	def test_blank_terms_are_ignored(self):
+		matcher = Matcher([("", "x", 0, ""), ("cable", " ", 0, ""), (" cable ", " كابل ", 0, " note ")])
+		self.assertEqual(matcher.find("copper cable"), [("cable", "كابل", 0, "note")])
+		self.assertEqual(Matcher([]).find("copper cable"), [])
@@ -0,0 +1,33 @@
+from frappe.tests.utils import FrappeTestCase
+
+from ai_translate.metrics import LATENCY_BUCKETS, _quantile
+
+
+def cumulative(counts):
+	"""
+	Cumulative buckets from per-bucket counts ({bound: count})
+	"""
+	total = 0
+	buckets = []
+	for bound in [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"]:
+		total += counts.get(bound, 0)
+		buckets.append((bound, total))
+	return buckets
+
+
+class TestQuantile(FrappeTestCase):
+	def test_interpolates_inside_the_bucket(self):
+		buckets = cumulative({"0.25": 10, "0.5": 10})
+		self.assertEqual(_quantile(buckets, 0.5), 0.25)
+		self.assertEqual(_quantile(buckets, 0.75), 0.375)
+		self.assertEqual(_quantile(buckets, 0.25), 0.15)
+
+	def test_first_bucket_starts_at_zero(self):
+		self.assertEqual(_quantile(cumulative({"0.05": 4}), 0.5), 0.025)
+
+	def test_overflow_bucket_reports_the_largest_bound(self):
+		self.assertEqual(_quantile(cumulative({"+Inf": 3}), 0.99), float(LATENCY_BUCKETS[-1]))
+
+	def test_no_observations(self):
+		self.assertIsNone(_quantile(cumulative({}), 0.5))
+		self.assertIsNone(_quantile([], 0.5))
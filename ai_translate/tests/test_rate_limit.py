@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from frappe.tests.utils import FrappeTestCase
+
+from ai_translate.rate_limit import _parse_reset, _parse_retry_after
+
+
+class TestRateLimitHeaders(FrappeTestCase):
+	def test_reset_durations(self):
+		self.assertEqual(_parse_reset("6m0s"), 360)
+		self.assertEqual(_parse_reset("1h2m3s"), 3723)
+		self.assertAlmostEqual(_parse_reset("1.5s"), 1.5)
+		self.assertAlmostEqual(_parse_reset("20ms"), 0.02)
+
+	def test_reset_timestamps(self):
+		reset_at = (datetime.now(timezone.utc) + timedelta(seconds=30)).isoformat().replace("+00:00", "Z")
+		self.assertAlmostEqual(_parse_reset(reset_at), 30, delta=2)
+		self.assertEqual(_parse_reset("2020-01-01T00:00:00Z"), 0)
+
+	def test_reset_garbage(self):
+		for value in (None, "", "soon"):
+			self.assertEqual(_parse_reset(value), 0)
+
+	def test_retry_after_seconds(self):
+		self.assertEqual(_parse_retry_after("12"), 12)
+		self.assertEqual(_parse_retry_after("0.5"), 0.5)
+		self.assertEqual(_parse_retry_after("-3"), 0)
+
+	def test_retry_after_http_date(self):
+		retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+		self.assertAlmostEqual(_parse_retry_after(retry_at), 30, delta=2)
+		self.assertEqual(_parse_retry_after("Wed, 01 Jan 2020 00:00:00 GMT"), 0)
+
+	def test_retry_after_garbage(self):
+		for value in (None, "", "later"):
+			self.assertEqual(_parse_retry_after(value), 0)
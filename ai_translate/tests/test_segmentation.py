@@ -0,0 +1,36 @@
+from frappe.tests.utils import FrappeTestCase
+
+from ai_translate.segmentation import split_text
+
+PARAGRAPH = "Heavy duty industrial pump with a replacement filter kit. Annual maintenance included."
+
+
+class TestSplitText(FrappeTestCase):
+	def assertSplit(self, text, max_chars):
+		segments = split_text(text, max_chars)
+		self.assertEqual("".join(segment + separator for segment, separator in segments), text)
+		for segment, _separator in segments:
+			self.assertLessEqual(len(segment), max_chars)
+		return segments
+
+	def test_short_text_is_one_segment(self):
+		self.assertEqual(split_text(PARAGRAPH, 500), [(PARAGRAPH, "")])
+
+	def test_short_paragraphs_are_packed(self):
+		text = "\n\n".join([PARAGRAPH] * 6)
+		segments = self.assertSplit(text, 300)
+		self.assertEqual(len(segments), 2)
+		self.assertEqual(segments[0], ("\n\n".join([PARAGRAPH] * 3), "\n\n"))
+
+	def test_long_paragraphs_break_at_sentences_then_words(self):
+		text = " ".join([PARAGRAPH] * 10) + "\n\n" + "word " * 100
+		segments = self.assertSplit(text, 120)
+		self.assertTrue(all(segment.endswith(".") for segment, _separator in segments[:5]))
+
+	def test_indentation_and_blank_lines_are_kept(self):
+		text = "  Item list:\n\n\n    - " + "\n    - ".join([PARAGRAPH] * 8) + "\n"
+		self.assertSplit(text, 200)
+
+	def test_unbreakable_runs_are_cut(self):
+		segments = self.assertSplit("x" * 450, 200)
+		self.assertEqual([len(segment) for segment, _separator in segments], [200, 200, 50])
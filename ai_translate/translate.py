@@ -1,19 +1,50 @@
 import frappe
-import requests
 import json
 import logging
-import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import datetime
 import re
+from frappe.utils import cint, flt
+
+from ai_translate import (
+    auto_translate,
+    clearing,
+    export,
+    fuzzy_match,
+    glossary,
+    item_translation,
+    metrics,
+    multi_target,
+    provider_health,
+    providers,
+    segmentation,
+    translation_log,
+    translation_memory,
+    translation_stats,
+)
+from ai_translate.settings import get_config
+from ai_translate.concurrency import get_provider_concurrency, get_site_workers, map_in_threads
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Longer texts are rejected instead of being translated (in segments)
+DEFAULT_MAX_TEXT_CHARS = 100000
+
+# Bounds (seconds) for the delay before a hedged request goes to the second provider
+DEFAULT_HEDGE_DELAY = 3.0
+MIN_HEDGE_DELAY = 0.5
+MAX_HEDGE_DELAY = 15.0
+
 @frappe.whitelist()
-def ai_translate_text(text, target_language="ar", source_language="en", ai_provider="groq"):
+def ai_translate_text(text, target_language="ar", source_language="en", ai_provider="groq", use_cache=1, hedge=None):
     """
-    Natural AI translation with robust error handling
+    Natural AI translation with robust error handling.
+    Repeated texts are served from the translation memory unless use_cache is 0.
+    With hedge (default: the ai_translate_hedge site setting) a second provider is
+    asked too when the first is slower than its usual p95 latency.
     """
 
     if not text or not text.strip():
@@ -24,33 +55,92 @@ def ai_translate_text(text, target_language="ar", source_language="en", ai_provi
             "ai_provider": ai_provider
         }
 
+    config = get_config()
+    use_cache = cint(use_cache)
+    hedge = cint(frappe.conf.get("ai_translate_hedge")) if hedge is None else cint(hedge)
+    model = config.get_model(ai_provider)
+    fuzzy = None
+
     try:
         start_time = datetime.now()
         result = None
 
-        # Clean input text
+        # Clean input text; long texts are split into segments further down
         text = text.strip()
-        if len(text) > 5000:  # Limit text length
-            text = text[:5000] + "..."
+        max_chars = cint(frappe.conf.get("ai_translate_max_text_chars")) or DEFAULT_MAX_TEXT_CHARS
+        if len(text) > max_chars:
+            return {
+                "success": False,
+                "error": f"Text is too long to translate ({len(text)} characters, limit {max_chars})",
+                "translated_text": "",
+                "ai_provider": ai_provider
+            }
+
+        if use_cache:
+            cached = translation_memory.lookup(text, source_language, target_language, ai_provider, model)
+            if cached:
+                metrics.record_translation(ai_provider, cached.get('model') or model, source_language,
+                    target_language, 'cache', (datetime.now() - start_time).total_seconds(), text)
+                return {
+                    "success": True,
+                    "translated_text": cached['translated_text'],
+                    "source_language": source_language,
+                    "target_language": target_language,
+                    "ai_provider": cached.get('ai_provider') or ai_provider,
+                    "model_used": cached.get('model') or model,
+                    "confidence_score": 0.95,
+                    "processing_time": (datetime.now() - start_time).total_seconds(),
+                    "context_aware": True,
+                    "ai_enhanced": True,
+                    "cache_hit": True,
+                    "cache_tier": cached['tier']
+                }
+
+            fuzzy = fuzzy_match.find_match(text, source_language, target_language)
+            if fuzzy and fuzzy['mode'] == 'reuse':
+                metrics.record_translation(ai_provider, model, source_language, target_language, 'fuzzy',
+                    (datetime.now() - start_time).total_seconds(), text)
+                return {
+                    "success": True,
+                    "translated_text": fuzzy['translated_text'],
+                    "source_language": source_language,
+                    "target_language": target_language,
+                    "ai_provider": ai_provider,
+                    "model_used": model,
+                    "confidence_score": fuzzy['score'],
+                    "processing_time": (datetime.now() - start_time).total_seconds(),
+                    "context_aware": True,
+                    "ai_enhanced": True,
+                    "cache_hit": False,
+                    "fuzzy_match": fuzzy
+                }
+            if fuzzy and config.is_known(ai_provider) and provider_health.is_available(ai_provider):
+                # A close match turns a fresh translation into a short edit
+                try:
+                    result = translate_with_reference(text, target_language, source_language, ai_provider, fuzzy)
+                except Exception as reference_error:
+                    logger.warning(f"Reference translation with {ai_provider} failed: {str(reference_error)}")
+                    fuzzy = None
 
         # Try the specified provider first
-        if ai_provider == "groq":
-            result = translate_with_groq_natural(text, target_language, source_language)
-        elif ai_provider == "openai":
-            result = translate_with_openai_natural(text, target_language, source_language)
-        elif ai_provider == "claude":
-            result = translate_with_claude_natural(text, target_language, source_language)
-        elif ai_provider == "perplexity":
-            result = translate_with_perplexity_natural(text, target_language, source_language)
-        elif ai_provider == "deepseek":
-            result = translate_with_deepseek_natural(text, target_language, source_language)
-        else:
-            # Auto-select best available provider
-            result = translate_with_auto_provider(text, target_language, source_language)
+        if not result:
+            long_text = config.is_known(ai_provider) and segmentation.is_long_text(text, target_language, ai_provider)
+            secondary = get_hedge_provider(ai_provider, config) if hedge and not long_text else None
+            if secondary:
+                result = translate_hedged(text, target_language, source_language, ai_provider, secondary)
+            else:
+                result = translate_with_provider(text, target_language, source_language, ai_provider, use_cache,
+                    config)
 
         if result and result.get('translated_text'):
             processing_time = (datetime.now() - start_time).total_seconds()
 
+            if use_cache:
+                translation_memory.store(text, source_language, target_language, ai_provider, model,
+                    result['translated_text'])
+            metrics.record_translation(result.get('provider', ai_provider), result.get('model'), source_language,
+                target_language, 'ai', processing_time, text, result.get('usage'))
+
             return {
                 "success": True,
                 "translated_text": result['translated_text'],
@@ -61,9 +151,17 @@ def ai_translate_text(text, target_language="ar", source_language="en", ai_provi
                 "confidence_score": result.get('confidence', 0.95),
                 "processing_time": processing_time,
                 "context_aware": True,
-                "ai_enhanced": True
+                "ai_enhanced": True,
+                "cache_hit": False,
+                "fuzzy_match": fuzzy,
+                "hedged": result.get('hedged', False),
+                "segments": result.get('segments', 1),
+                "usage": result.get('usage') or {},
+                "glossary_missed": result.get('glossary_missed', [])
             }
         else:
+            metrics.record_translation(ai_provider, model, source_language, target_language, 'failed',
+                (datetime.now() - start_time).total_seconds(), text, error="No result returned")
             return {
                 "success": False,
                 "error": "AI translation failed - no result returned",
@@ -75,22 +173,27 @@ def ai_translate_text(text, target_language="ar", source_language="en", ai_provi
         logger.error(f"AI Translation error with {ai_provider}: {str(e)}")
 
         # Try fallback providers
-        fallback_providers = ['groq', 'deepseek', 'openai']
-        if ai_provider in fallback_providers:
-            fallback_providers.remove(ai_provider)
+        fallback_providers = get_fallback_providers(ai_provider, config)
 
         for fallback in fallback_providers:
+            if not provider_health.is_available(fallback):
+                logger.info(f"Skipping fallback provider {fallback}: circuit open")
+                continue
             try:
-                if has_api_key_configured(fallback):
+                if has_api_key_configured(fallback, config):
                     logger.info(f"Trying fallback provider: {fallback}")
-                    if fallback == 'groq':
-                        fallback_result = translate_with_groq_natural(text, target_language, source_language)
-                    elif fallback == 'deepseek':
-                        fallback_result = translate_with_deepseek_natural(text, target_language, source_language)
-                    elif fallback == 'openai':
-                        fallback_result = translate_with_openai_natural(text, target_language, source_language)
+                    fallback_result = translate_with_provider(text, target_language, source_language, fallback,
+                        use_cache, config)
 
                     if fallback_result and fallback_result.get('translated_text'):
+                        if use_cache:
+                            translation_memory.store(text, source_language, target_language, ai_provider, model,
+                                fallback_result['translated_text'])
+                        metrics.record_fallback(ai_provider, fallback)
+                        metrics.record_translation(fallback, fallback_result.get('model'), source_language,
+                            target_language, 'fallback', (datetime.now() - start_time).total_seconds(), text,
+                            fallback_result.get('usage'), f"{ai_provider} failed: {str(e)}")
+
                         return {
                             "success": True,
                             "translated_text": fallback_result['translated_text'],
@@ -99,12 +202,16 @@ def ai_translate_text(text, target_language="ar", source_language="en", ai_provi
                             "ai_provider": f"{ai_provider} (fallback: {fallback})",
                             "model_used": fallback_result.get('model', 'unknown'),
                             "warning": f"Primary provider {ai_provider} failed, used {fallback}",
-                            "ai_enhanced": True
+                            "ai_enhanced": True,
+                            "cache_hit": False,
+                            "usage": fallback_result.get('usage') or {}
                         }
             except Exception as fallback_error:
                 logger.warning(f"Fallback provider {fallback} also failed: {str(fallback_error)}")
                 continue
 
+        metrics.record_translation(ai_provider, model, source_language, target_language, 'failed',
+            (datetime.now() - start_time).total_seconds(), text, error=str(e))
         return {
             "success": False,
             "error": f"All AI providers failed. Primary error: {str(e)}",
@@ -113,324 +220,161 @@ def ai_translate_text(text, target_language="ar", source_language="en", ai_provi
             "debug_info": f"Tried providers: {[ai_provider] + fallback_providers}"
         }
 
-def translate_with_groq_natural(text, target_lang, source_lang):
+def translate_with_provider(text, target_lang, source_lang, provider, use_cache=1, config=None):
     """
-    Natural translation using Groq with updated models
+    Translate with one named provider (any other value auto-selects one),
+    recording the end-to-end latency that hedging adapts to. Texts too long for
+    one request are translated in segments, cached per segment unless use_cache is 0.
     """
-    lang_names = get_language_names()
-    target_name = lang_names.get(target_lang, target_lang)
-    source_name = lang_names.get(source_lang, 'English')
-
-    api_key = get_groq_api_key()
-    if not api_key:
-        raise Exception("Groq API key not configured")
-
-    url = "https://api.groq.com/openai/v1/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    # Natural, context-aware prompt
-    prompt = f"""You are a professional translator specializing in natural, fluent translations.
-
-Translate this {source_name} text to {target_name}:
-"{text}"
-
-Requirements:
-- Make it sound completely natural in {target_name}
-- Preserve the original meaning and tone
-- Use appropriate business terminology
-- Don't add explanations or notes
-- Return ONLY the translation
-
-Translation:"""
-
-    # Updated to use current available models
-    payload = {
-        "model": "llama-3.3-70b-versatile",  # Current production model (as of Oct 2025)
-        "messages": [
-            {
-                "role": "system",
-                "content": f"You are an expert translator. Translate text naturally to {target_name}, preserving meaning and business context."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.3,
-        "max_tokens": 1024,
-        "top_p": 0.9
-    }
+    adapter = (config or get_config()).get_adapter(provider)
+    if adapter is None:
+        # Auto-select best available provider
+        return translate_with_auto_provider(text, target_lang, source_lang, config)
 
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
+    if segmentation.is_long_text(text, target_lang, provider):
+        return segmentation.translate_long_text(text, target_lang, source_lang, provider, use_cache)
 
-    if response.status_code == 200:
-        result = response.json()
-        translated_text = result['choices'][0]['message']['content'].strip()
+    start = time.monotonic()
+    result = adapter.translate(text, target_lang, source_lang).as_dict()
+    provider_health.record_latency(provider, time.monotonic() - start)
+    return result
 
-        # Clean up the response
-        translated_text = clean_translation_response(translated_text)
-
-        if translated_text and len(translated_text) > 0:
-            return {
-                'translated_text': translated_text,
-                'confidence': 0.95,
-                'model': 'llama-3.3-70b-versatile',
-                'provider': 'groq'
-            }
-        else:
-            raise Exception("Groq returned empty translation")
-    else:
-        error_msg = f"Groq API error: HTTP {response.status_code}"
-        if response.text:
-            error_msg += f" - {response.text}"
-        raise Exception(error_msg)
-
-def translate_with_openai_natural(text, target_lang, source_lang):
+def get_hedge_provider(primary, config=None):
     """
-    Natural translation using OpenAI
+    Second provider for hedged requests: ai_translate_hedge_provider if usable,
+    else the first other configured provider whose circuit is closed
     """
-    lang_names = get_language_names()
-    target_name = lang_names.get(target_lang, target_lang)
-    source_name = lang_names.get(source_lang, 'English')
-
-    api_key = get_openai_api_key()
-    if not api_key:
-        raise Exception("OpenAI API key not configured")
-
-    url = "https://api.openai.com/v1/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    prompt = f"""Translate this {source_name} business text to natural, fluent {target_name}:
-
-"{text}"
-
-Make it sound native and professional. Return only the translation."""
-
-    payload = {
-        "model": "gpt-3.5-turbo",
-        "messages": [
-            {
-                "role": "system",
-                "content": f"You are a professional translator. Translate to natural {target_name}."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.3,
-        "max_tokens": 1000
-    }
-
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
-
-    if response.status_code == 200:
-        result = response.json()
-        translated_text = result['choices'][0]['message']['content'].strip()
-        translated_text = clean_translation_response(translated_text)
-
-        if translated_text:
-            return {
-                'translated_text': translated_text,
-                'confidence': 0.96,
-                'model': 'gpt-3.5-turbo',
-                'provider': 'openai'
-            }
-        else:
-            raise Exception("OpenAI returned empty translation")
-    else:
-        raise Exception(f"OpenAI API error: HTTP {response.status_code}")
-
-def translate_with_claude_natural(text, target_lang, source_lang):
+    config = config or get_config()
+    if not config.is_known(primary):
+        return None
+
+    configured = frappe.conf.get("ai_translate_hedge_provider")
+    candidates = [configured] if configured else config.provider_names
+    for provider in candidates:
+        if (provider != primary and config.has_api_key(provider)
+                and provider_health.is_available(provider)):
+            return provider
+    return None
+
+def get_fallback_providers(primary, config=None):
     """
-    Natural translation using Claude
+    Providers to try after the primary fails, in the order of ai_translate_fallback_providers
+    or else the registry's preference order, limited to those with an API key
     """
-    lang_names = get_language_names()
-    target_name = lang_names.get(target_lang, target_lang)
-
-    api_key = get_claude_api_key()
-    if not api_key:
-        raise Exception("Claude API key not configured")
-
-    url = "https://api.anthropic.com/v1/messages"
-
-    headers = {
-        "x-api-key": api_key,
-        "Content-Type": "application/json",
-        "anthropic-version": "2023-06-01"
-    }
-
-    prompt = f"""Translate to natural {target_name}:
-
-"{text}"
-
-Make it sound fluent and professional. Return only the translation."""
-
-    payload = {
-        "model": "claude-3-haiku-20240307",
-        "max_tokens": 1000,
-        "temperature": 0.3,
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-    }
-
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
-
-    if response.status_code == 200:
-        result = response.json()
-        translated_text = result['content'][0]['text'].strip()
-        translated_text = clean_translation_response(translated_text)
-
-        if translated_text:
-            return {
-                'translated_text': translated_text,
-                'confidence': 0.97,
-                'model': 'claude-3-haiku',
-                'provider': 'claude'
-            }
-        else:
-            raise Exception("Claude returned empty translation")
-    else:
-        raise Exception(f"Claude API error: HTTP {response.status_code}")
+    config = config or get_config()
+    candidates = frappe.conf.get("ai_translate_fallback_providers") or config.provider_names
+    return [provider for provider in candidates
+            if provider != primary and config.is_known(provider) and config.has_api_key(provider)]
 
-def translate_with_deepseek_natural(text, target_lang, source_lang):
+def get_hedge_delay(provider):
     """
-    Natural translation using DeepSeek
+    Seconds to wait for the primary before hedging: its recent p95 latency, bounded
     """
-    lang_names = get_language_names()
-    target_name = lang_names.get(target_lang, target_lang)
-
-    api_key = get_deepseek_api_key()
-    if not api_key:
-        raise Exception("DeepSeek API key not configured")
+    p95 = provider_health.get_latency_percentile(provider, 0.95)
+    if p95 is None:
+        return flt(frappe.conf.get("ai_translate_hedge_delay")) or DEFAULT_HEDGE_DELAY
+    return min(max(p95, MIN_HEDGE_DELAY), MAX_HEDGE_DELAY)
 
-    url = "https://api.deepseek.com/v1/chat/completions"
+def translate_hedged(text, target_lang, source_lang, primary, secondary):
+    """
+    Send text to primary and, if it has not answered (or has failed) within its p95
+    latency, to secondary as well. The first successful result wins; the other request
+    is abandoned and its result discarded when it eventually returns.
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    Both requests run on the site's persistent worker threads, which already hold a site
+    context, so hedging adds no per-call setup.
+    """
+    workers = get_site_workers()
 
-    prompt = f"""Translate to natural {target_name}:
+    def submit(provider):
+        future = workers.submit(translate_with_provider, text, target_lang, source_lang, provider)
+        futures[future] = provider
+        return future
 
-"{text}"
+    futures = {}
+    try:
+        first = submit(primary)
+        wait([first], timeout=get_hedge_delay(primary))
+        if not first.done() or first.exception() or not (first.result() or {}).get('translated_text'):
+            logger.info(f"Hedging translation: {primary} is slow or failed, also asking {secondary}")
+            submit(secondary)
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception():
+                    errors.append(f"{futures[future]}: {str(future.exception())}")
+                    continue
+                result = future.result()
+                if result and result.get('translated_text'):
+                    result['hedged'] = len(futures) > 1
+                    return result
 
-Make it sound fluent and professional."""
+        raise Exception(f"Hedged translation failed ({'; '.join(errors) or 'no result returned'})")
+    finally:
+        # Don't wait for the losing request; its worker finishes it on its own
+        for future in futures:
+            future.cancel()
 
-    payload = {
-        "model": "deepseek-chat",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.3,
-        "max_tokens": 1000
-    }
+def translate_with_groq_natural(text, target_lang, source_lang):
+    return providers.get_adapter("groq").translate(text, target_lang, source_lang).as_dict()
 
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
+def translate_with_openai_natural(text, target_lang, source_lang):
+    return providers.get_adapter("openai").translate(text, target_lang, source_lang).as_dict()
 
-    if response.status_code == 200:
-        result = response.json()
-        translated_text = result['choices'][0]['message']['content'].strip()
-        translated_text = clean_translation_response(translated_text)
+def translate_with_claude_natural(text, target_lang, source_lang):
+    return providers.get_adapter("claude").translate(text, target_lang, source_lang).as_dict()
 
-        if translated_text:
-            return {
-                'translated_text': translated_text,
-                'confidence': 0.90,
-                'model': 'deepseek-chat',
-                'provider': 'deepseek'
-            }
-        else:
-            raise Exception("DeepSeek returned empty translation")
-    else:
-        raise Exception(f"DeepSeek API error: HTTP {response.status_code}")
+def translate_with_deepseek_natural(text, target_lang, source_lang):
+    return providers.get_adapter("deepseek").translate(text, target_lang, source_lang).as_dict()
 
 def translate_with_perplexity_natural(text, target_lang, source_lang):
+    return providers.get_adapter("perplexity").translate(text, target_lang, source_lang).as_dict()
+
+def translate_with_reference(text, target_lang, source_lang, provider, reference):
     """
-    Natural translation using Perplexity
+    Adapt the stored translation of a similar text instead of translating from scratch
     """
     lang_names = get_language_names()
     target_name = lang_names.get(target_lang, target_lang)
+    source_name = lang_names.get(source_lang, 'English')
 
-    api_key = get_perplexity_api_key()
-    if not api_key:
-        raise Exception("Perplexity API key not configured")
-
-    url = "https://api.perplexity.ai/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    prompt = f"""Translate to natural {target_name}:
+    # Instructions and language pair first so the prompt prefix stays cacheable
+    terms = glossary.find_terms(text, source_lang, target_lang)
+    system_prompt = (f"You are a professional translator. You adapt an existing translation to a slightly "
+        f"different source text, changing only what differs. Return ONLY the translation.\n\n"
+        f"Source language: {source_name}\nTarget language: {target_name}") + glossary.prompt_block(terms)
 
-"{text}"
+    user_prompt = f"""Previous text:
+{reference['source_text']}
 
-Make it sound fluent and professional."""
+Its translation:
+{reference['translated_text']}
 
-    payload = {
-        "model": "llama-3.1-sonar-large-128k-online",
-        "messages": [
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        "temperature": 0.3,
-        "max_tokens": 1000
-    }
+New text:
+{text}"""
 
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
+    adapter = providers.get_adapter(provider)
+    reply, data = adapter.send(system_prompt, user_prompt, max_tokens=adapter.completion_budget(text, target_lang),
+        timeout=60)
+    translated_text = clean_translation_response(reply)
+    if not translated_text:
+        raise Exception(f"{provider} returned empty translation")
 
-    if response.status_code == 200:
-        result = response.json()
-        translated_text = result['choices'][0]['message']['content'].strip()
-        translated_text = clean_translation_response(translated_text)
+    return providers.TranslationResult(translated_text, provider, adapter.model, 0.95, adapter.usage(data),
+        glossary.missed_terms(translated_text, terms)).as_dict()
 
-        if translated_text:
-            return {
-                'translated_text': translated_text,
-                'confidence': 0.92,
-                'model': 'llama-3.1-sonar-large',
-                'provider': 'perplexity'
-            }
-        else:
-            raise Exception("Perplexity returned empty translation")
-    else:
-        raise Exception(f"Perplexity API error: HTTP {response.status_code}")
-
-def translate_with_auto_provider(text, target_lang, source_lang):
+def translate_with_auto_provider(text, target_lang, source_lang, config=None):
     """
     Try providers in order of preference
     """
-    providers = [
-        ('groq', translate_with_groq_natural),
-        ('deepseek', translate_with_deepseek_natural),
-        ('openai', translate_with_openai_natural),
-        ('claude', translate_with_claude_natural),
-        ('perplexity', translate_with_perplexity_natural)
-    ]
-
-    for provider_name, translate_func in providers:
-        if has_api_key_configured(provider_name):
+    config = config or get_config()
+    for provider_name in config.provider_names:
+        if config.has_api_key(provider_name) and provider_health.is_available(provider_name):
             try:
-                result = translate_func(text, target_lang, source_lang)
+                result = translate_with_provider(text, target_lang, source_lang, provider_name, config=config)
                 if result and result.get('translated_text'):
                     return result
             except Exception as e:
@@ -439,7 +383,7 @@ def translate_with_auto_provider(text, target_lang, source_lang):
 
     raise Exception("All available AI providers failed")
 
-def clean_translation_response(text):
+def clean_translation_response(text, keep_newlines=False):
     """
     Clean up AI translation responses to get natural text
     """
@@ -468,67 +412,51 @@ def clean_translation_response(text):
         text = text[1:-1]
 
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    if keep_newlines:
+        text = re.sub(r'[^\S\n]+', ' ', text)
+        text = re.sub(r' *\n *', '\n', text).strip()
+    else:
+        text = re.sub(r'\s+', ' ', text).strip()
 
     return text
 
+def clean_partial_translation(text):
+    """
+    clean_translation_response for a reply that is still streaming in: an opening
+    quote is dropped before its closing quote has arrived
+    """
+    text = clean_translation_response(text)
+    if text[:1] in ('"', "'"):
+        text = text[1:]
+    return text
+
 def get_language_names():
     """
     Get full language names for better AI prompting
     """
-    return {
-        "ar": "Arabic",
-        "es": "Spanish",
-        "fr": "French",
-        "de": "German",
-        "it": "Italian",
-        "pt": "Portuguese",
-        "ru": "Russian",
-        "ja": "Japanese",
-        "ko": "Korean",
-        "zh": "Chinese",
-        "zh-tw": "Traditional Chinese",
-        "hi": "Hindi",
-        "ur": "Urdu",
-        "tr": "Turkish",
-        "nl": "Dutch",
-        "sv": "Swedish",
-        "da": "Danish",
-        "no": "Norwegian",
-        "fi": "Finnish",
-        "en": "English"
-    }
+    return get_config().language_names
 
 # API Key management functions
 def get_openai_api_key():
-    return frappe.conf.get('openai_api_key') or os.getenv('OPENAI_API_KEY', '')
+    return providers.get_api_key('openai')
 
 def get_claude_api_key():
-    return frappe.conf.get('claude_api_key') or os.getenv('CLAUDE_API_KEY', '')
+    return providers.get_api_key('claude')
 
 def get_groq_api_key():
-    return frappe.conf.get('groq_api_key') or os.getenv('GROQ_API_KEY', '')
+    return providers.get_api_key('groq')
 
 def get_perplexity_api_key():
-    return frappe.conf.get('perplexity_api_key') or os.getenv('PERPLEXITY_API_KEY', '')
+    return providers.get_api_key('perplexity')
 
 def get_deepseek_api_key():
-    return frappe.conf.get('deepseek_api_key') or os.getenv('DEEPSEEK_API_KEY', '')
-
-def has_api_key_configured(provider):
-    key_getters = {
-        'openai': get_openai_api_key,
-        'claude': get_claude_api_key,
-        'groq': get_groq_api_key,
-        'perplexity': get_perplexity_api_key,
-        'deepseek': get_deepseek_api_key
-    }
+    return providers.get_api_key('deepseek')
+
+def get_api_key(provider):
+    return get_config().get_api_key(provider)
 
-    getter = key_getters.get(provider)
-    if getter:
-        key = getter()
-        return bool(key and len(key.strip()) > 0)
-    return False
+def has_api_key_configured(provider, config=None):
+    return (config or get_config()).has_api_key(provider)
 
 @frappe.whitelist()
 def test_ai_translation():
@@ -539,13 +467,13 @@ def test_ai_translation():
     target_lang = "ar"
 
     # Test all configured providers
-    providers = ['groq', 'openai', 'claude', 'deepseek', 'perplexity']
+    provider_names = providers.get_provider_names()
     results = {}
 
-    for provider in providers:
+    for provider in provider_names:
         if has_api_key_configured(provider):
             try:
-                result = ai_translate_text(test_text, target_lang, "en", provider)
+                result = ai_translate_text(test_text, target_lang, "en", provider, hedge=0)
                 results[provider] = result
             except Exception as e:
                 results[provider] = {
@@ -564,7 +492,7 @@ def test_ai_translation():
         "test_text": test_text,
         "target_language": target_lang,
         "results": results,
-        "configured_providers": [p for p in providers if has_api_key_configured(p)]
+        "configured_providers": [p for p in provider_names if has_api_key_configured(p)]
     }
 
 @frappe.whitelist()
@@ -576,14 +504,13 @@ def test_ai_providers():
     target_lang = "ar"
 
     # Test all providers
-    providers = ['groq', 'openai', 'claude', 'deepseek', 'perplexity']
     results = {}
 
-    for provider in providers:
+    for provider in providers.get_provider_names():
         if has_api_key_configured(provider):
             try:
                 start_time = datetime.now()
-                result = ai_translate_text(test_text, target_lang, "en", provider)
+                result = ai_translate_text(test_text, target_lang, "en", provider, hedge=0)
                 processing_time = (datetime.now() - start_time).total_seconds()
 
                 if result.get('success'):
@@ -682,51 +609,72 @@ def get_available_ai_providers():
     """
     Get list of available AI providers with their status
     """
-    providers = {
-        'groq': {
-            'name': 'Groq (Llama3)',
-            'configured': has_api_key_configured('groq'),
-            'speed': 'Ultra Fast',
-            'quality': 'Very Good',
-            'cost': 'Free'
-        },
-        'openai': {
-            'name': 'OpenAI (GPT-3.5)',
-            'configured': has_api_key_configured('openai'),
-            'speed': 'Fast',
-            'quality': 'Excellent',
-            'cost': 'Low'
-        },
-        'claude': {
-            'name': 'Claude (Haiku)',
-            'configured': has_api_key_configured('claude'),
-            'speed': 'Fast',
-            'quality': 'Excellent',
-            'cost': 'Low'
-        },
-        'deepseek': {
-            'name': 'DeepSeek',
-            'configured': has_api_key_configured('deepseek'),
-            'speed': 'Fast',
-            'quality': 'Good',
-            'cost': 'Very Low'
-        },
-        'perplexity': {
-            'name': 'Perplexity AI',
-            'configured': has_api_key_configured('perplexity'),
-            'speed': 'Fast',
-            'quality': 'Very Good',
-            'cost': 'Low'
+    config = get_config()
+    return {
+        name: {
+            'name': config.providers[name].label,
+            'configured': config.has_api_key(name),
+            'speed': config.providers[name].speed,
+            'quality': config.providers[name].quality,
+            'cost': config.providers[name].cost
         }
+        for name in config.provider_names
     }
 
-    return providers
+@frappe.whitelist()
+def ai_translate_text_multi(text, target_languages, source_language="en", ai_provider="groq", use_cache=1,
+		item_code=None):
+	"""
+	Translate one text into several languages (a list, JSON array or "ar,fr,hi") with a
+	single structured request. Languages missing from the reply are retried one by one.
+	Every translation is stored in the translation memory, and in the Item Translation
+	of item_code when given.
+	"""
+	if not text or not text.strip():
+		return {'success': False, 'error': 'No text provided for translation', 'translations': {}}
+
+	target_languages = multi_target.parse_target_languages(target_languages)
+	multi_target.check_languages(target_languages)
+
+	if not has_api_key_configured(ai_provider):
+		return {'success': False, 'error': f'AI provider {ai_provider} is not configured', 'translations': {}}
+
+	start_time = datetime.now()
+	translations, requests_made = multi_target.translate_multi_target(
+		text, target_languages, source_language, ai_provider, cint(use_cache), item_code
+	)
+	failed = [code for code, result in translations.items() if not result.get('success')]
+
+	return {
+		'success': not failed,
+		'translations': translations,
+		'summary': {
+			'target_languages': len(target_languages),
+			'failed_languages': failed,
+			'multi_target_requests': requests_made,
+			'retried_languages': [code for code, result in translations.items() if result.get('retried')],
+			'cache_hits': sum(1 for result in translations.values() if result.get('cache_hit')),
+			'wall_clock_time': (datetime.now() - start_time).total_seconds()
+		}
+	}
 
 @frappe.whitelist()
-def bulk_ai_translate_items(items_data, target_language="ar", ai_provider="groq"):
+def bulk_ai_translate_items(items_data, target_language="ar", ai_provider="groq", batch_mode=None):
 	"""
-	Robust bulk translation with better error handling
+	Robust bulk translation with better error handling.
+	In batch mode (default, see ai_translate_batch_mode) cache misses are packed into
+	multi-item requests; anything a batch could not return is translated one by one.
+	Requests run concurrently up to the provider's in-flight limit; results keep input order.
+	Repeated descriptions are translated once and copied to every matching row.
 	"""
+	return run_bulk_translation(items_data, target_language, ai_provider, batch_mode)
+
+def run_bulk_translation(items_data, target_language="ar", ai_provider="groq", batch_mode=None, on_result=None):
+	"""
+	Bulk translation engine behind bulk_ai_translate_items and the background job.
+	on_result(index, result) is called as soon as each item's result is known.
+	"""
+	from ai_translate.batching import translate_items_batched
 
 	if isinstance(items_data, str):
 		items_data = json.loads(items_data)
@@ -742,64 +690,137 @@ def bulk_ai_translate_items(items_data, target_language="ar", ai_provider="groq"
 			}
 		}
 
-	results = []
+	if batch_mode is None:
+		batch_mode = frappe.conf.get('ai_translate_batch_mode', 1)
+	batch_mode = cint(batch_mode)
+
+	wall_start = datetime.now()
+	results = [None] * len(items_data)
 	successful_translations = 0
 	failed_translations = 0
 	total_processing_time = 0
-
-	for item in items_data:
-		try:
-			item_code = item.get('item_code', '')
-			description = item.get('description', '')
-
-			if not description or not description.strip():
-				results.append({
-					'item_code': item_code,
-					'success': False,
-					'error': 'No description to translate',
-					'translated_text': '',
-					'ai_enhanced': False
-				})
-				frappe.log_error(message="Translation Error No Description",title="Translation Error No Description " + item_code)
-
-				failed_translations += 1
-				continue
-
-			translation_result = ai_translate_text(
-				description.strip(),
-				target_language,
-				"en",
-				ai_provider
-			)
-
-			results.append({
+	cache_hits = 0
+	batch_requests = 0
+
+	def emit(index, translation_result):
+		results[index] = format_bulk_result(items_data[index], translation_result, ai_provider)
+		if on_result:
+			on_result(index, results[index])
+
+		# Fan the translation out to every row with the same description
+		for duplicate_index in duplicates.get(index, ()):
+			results[duplicate_index] = format_bulk_result(items_data[duplicate_index], translation_result, ai_provider)
+			results[duplicate_index]['processing_time'] = 0
+			results[duplicate_index]['deduplicated'] = True
+			if on_result:
+				on_result(duplicate_index, results[duplicate_index])
+
+	pending = []
+	skipped_entries = []
+	for index, item in enumerate(items_data):
+		item_code = item.get('item_code', '')
+		description = item.get('description', '')
+
+		if not description or not description.strip():
+			results[index] = {
 				'item_code': item_code,
-				'success': translation_result['success'],
-				'translated_text': translation_result.get('translated_text', ''),
-				'error': translation_result.get('error', ''),
-				'ai_enhanced': translation_result.get('ai_enhanced', False),
-				'processing_time': translation_result.get('processing_time', 0),
-				'confidence_score': translation_result.get('confidence_score', 0),
-				'model_used': translation_result.get('model_used', ''),
-				'ai_provider': translation_result.get('ai_provider', ai_provider)
-			})
-
-			if translation_result['success']:
-				successful_translations += 1
-				total_processing_time += translation_result.get('processing_time', 0)
-			else:
-				frappe.log_error(message=str(translation_result),title="Translation Error Not Success")
-				failed_translations += 1
-
-		except Exception as e:
-			results.append({
-				'item_code': item.get('item_code', ''),
 				'success': False,
-				'error': f"Translation error: {str(e)}",
+				'error': 'No description to translate',
 				'translated_text': '',
 				'ai_enhanced': False
-			})
-			frappe.log_error(message=str(str(e)), title="Translation Error Exception")
+			}
+			if on_result:
+				on_result(index, results[index])
+			skipped_entries.append(translation_log.make_entry(
+				ai_provider, None, "en", target_language, "skipped", 0, error=f"No description to translate ({item_code})"
+			))
+
+			failed_translations += 1
+			continue
+
+		pending.append((index, description.strip()))
+
+	# Logged together; translated items are logged as they are served
+	translation_log.buffer_entries(skipped_entries)
+
+	# Item master translations come first, resolved for every item in one query
+	stored = item_translation.lookup([items_data[index].get('item_code') for index, _d in pending], target_language)
+	to_translate = []
+	for index, description in pending:
+		entry = item_translation.match(stored, items_data[index].get('item_code'), description)
+		if not entry:
+			to_translate.append((index, description))
+			continue
+
+		results[index] = format_bulk_result(items_data[index], {
+			'success': True,
+			'translated_text': entry.translated_text,
+			'ai_provider': entry.ai_provider or ai_provider,
+			'model_used': entry.model,
+			'confidence_score': 1.0 if entry.reviewed else 0.95,
+			'cache_hit': True,
+			'processing_time': 0
+		}, ai_provider)
+		results[index]['item_translation'] = True
+		if on_result:
+			on_result(index, results[index])
+		metrics.record_translation(entry.ai_provider or ai_provider, entry.model, "en", target_language, "item", 0,
+			text=description)
+
+	# Identical or whitespace-equivalent descriptions are sent upstream only once
+	unique_pending = []
+	duplicates = {}
+	first_index_by_text = {}
+	for index, description in to_translate:
+		normalized = translation_memory.normalize_text(description)
+		first_index = first_index_by_text.get(normalized)
+		if first_index is None:
+			first_index_by_text[normalized] = index
+			duplicates[index] = []
+			unique_pending.append((index, description))
+		else:
+			duplicates[first_index].append(index)
+
+	translated = set()
+	if batch_mode and len(unique_pending) > 1:
+		def on_batched(index, translation_result):
+			translated.add(index)
+			emit(index, translation_result)
+
+		try:
+			# Texts too long for one request are segmented by the single-text path instead
+			batchable = [entry for entry in unique_pending
+				if not segmentation.is_long_text(entry[1], target_language, ai_provider)]
+			_batched, batch_requests = translate_items_batched(
+				batchable, target_language, "en", ai_provider, on_result=on_batched
+			)
+		except Exception as e:
+			frappe.log_error(message=str(e), title="Batch Translation Error")
+
+	# Whatever batching did not cover goes through the single-text path, concurrently
+	remaining = [(index, description) for index, description in unique_pending if index not in translated]
+	map_in_threads(
+		lambda entry: ai_translate_text(entry[1], target_language, "en", ai_provider, hedge=0),
+		remaining,
+		ai_provider,
+		on_result=lambda position, translation_result: emit(remaining[position][0], translation_result)
+	)
+
+	# Write new translations back to the Items so later invoices reuse them
+	item_translation.store([
+		(items_data[index].get('item_code'), description, results[index]['translated_text'],
+			results[index].get('ai_provider') or ai_provider, results[index].get('model_used'))
+		for index, description in to_translate if results[index]['success']
+	], target_language, stored)
+
+	for index, _description in pending:
+		result = results[index]
+		if result['success']:
+			successful_translations += 1
+			total_processing_time += result.get('processing_time', 0)
+			if result.get('cache_hit'):
+				cache_hits += 1
+		else:
 			failed_translations += 1
 
 	return {
@@ -811,8 +832,45 @@ def bulk_ai_translate_items(items_data, target_language="ar", ai_provider="groq"
 			'ai_enhanced_count': successful_translations,
 			'average_processing_time': total_processing_time / max(successful_translations, 1),
 			'ai_provider': ai_provider,
-			'total_processing_time': total_processing_time
+			'total_processing_time': total_processing_time,
+			'cache_hits': cache_hits,
+			'batch_mode': bool(batch_mode),
+			'batch_requests': batch_requests,
+			'unique_texts': len(unique_pending),
+			'item_translations': len(pending) - len(to_translate),
+			'upstream_calls_saved': len(to_translate) - len(unique_pending),
+			'wall_clock_time': (datetime.now() - wall_start).total_seconds(),
+			'max_concurrency': get_provider_concurrency(ai_provider)
+		}
+	}
+
+def format_bulk_result(item, translation_result, ai_provider):
+	"""
+	Shape one item's translation outcome (a result dict or an exception) for bulk responses
+	"""
+	if isinstance(translation_result, Exception):
+		return {
+			'item_code': item.get('item_code', ''),
+			'success': False,
+			'error': f"Translation error: {str(translation_result)}",
+			'translated_text': '',
+			'ai_enhanced': False
 		}
+
+	return {
+		'item_code': item.get('item_code', ''),
+		'success': translation_result['success'],
+		'translated_text': translation_result.get('translated_text', ''),
+		'error': translation_result.get('error', ''),
+		'ai_enhanced': translation_result.get('ai_enhanced', False),
+		'processing_time': translation_result.get('processing_time', 0),
+		'confidence_score': translation_result.get('confidence_score', 0),
+		'model_used': translation_result.get('model_used', ''),
+		'ai_provider': translation_result.get('ai_provider', ai_provider),
+		'cache_hit': translation_result.get('cache_hit', False),
+		'batched': translation_result.get('batched', False),
+		'glossary_missed': translation_result.get('glossary_missed', []),
+		'deduplicated': False
 	}
 
 # Backward compatibility
@@ -853,6 +911,20 @@ def create_translation_custom_fields():
             })
             custom_field.insert(ignore_permissions=True)
 
+        if not frappe.db.exists("Custom Field", {"dt": "Sales Invoice Item", "fieldname": "custom_source_hash"}):
+            custom_field = frappe.get_doc({
+                "doctype": "Custom Field",
+                "dt": "Sales Invoice Item",
+                "label": "Translation Source Hash",
+                "fieldname": "custom_source_hash",
+                "fieldtype": "Data",
+                "insert_after": "custom_translated_description",
+                "hidden": 1,
+                "read_only": 1,
+                "no_copy": 1
+            })
+            custom_field.insert(ignore_permissions=True)
+
         if not frappe.db.exists("Custom Field", {"dt": "Sales Invoice", "fieldname": "custom_ai_provider"}):
             custom_field = frappe.get_doc({
                 "doctype": "Custom Field",
@@ -878,15 +950,17 @@ def create_translation_custom_fields():
 # Additional utility functions
 def validate_translation_fields(doc, method):
     """
-    Validate translation fields on Sales Invoice
+    Stamp each item with the hash of the description its translation was made from and
+    flag new or changed rows for auto-translation, then move the translated row counts
     """
-    pass  # Add validation logic if needed
+    auto_translate.mark_changed_rows(doc)
+    translation_stats.record_invoice_rows(doc, method)
 
 def on_sales_invoice_update(doc, method):
     """
-    Handle Sales Invoice updates for translation tracking
+    Queue background translation of the rows flagged in validate
     """
-    pass  # Add update logic if needed
+    auto_translate.enqueue_changed_rows(doc)
 
 @frappe.whitelist()
 def get_translation_stats():
@@ -894,37 +968,17 @@ def get_translation_stats():
     Get translation statistics for dashboard
     """
     try:
-        # Count total translations
-        total_translations = frappe.db.count('Sales Invoice Item',
-            filters={'custom_translated_description': ['!=', '']})
-
-        # Count by provider (simplified)
-        provider_stats = {
-            'groq': 0,
-            'openai': 0,
-            'claude': 0,
-            'deepseek': 0,
-            'perplexity': 0
-        }
+        # Read from the daily aggregates, never from the Sales Invoice Item table
+        stats = translation_stats.get_stats()
+        config = get_config()
 
-        # Get recent translation activity
-        recent_activity = frappe.db.sql("""
-            SELECT DATE(modified) as date, COUNT(*) as count
-            FROM `tabSales Invoice Item`
-            WHERE custom_translated_description IS NOT NULL
-            AND custom_translated_description != ''
-            AND modified >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-            GROUP BY DATE(modified)
-            ORDER BY date DESC
-            LIMIT 30
-        """, as_dict=True)
+        provider_stats = dict.fromkeys(providers.get_provider_names(), 0)
+        provider_stats.update(stats['provider_stats'])
 
         return {
-            'total_translations': total_translations,
+            **stats,
             'provider_stats': provider_stats,
-            'recent_activity': recent_activity,
-            'configured_providers': [p for p in ['groq', 'openai', 'claude', 'deepseek', 'perplexity']
-                                   if has_api_key_configured(p)]
+            'configured_providers': [name for name in config.provider_names if config.has_api_key(name)]
         }
 
     except Exception as e:
@@ -944,161 +998,75 @@ def validate_api_key(provider, api_key):
     try:
         test_text = "Hello world"
 
-        if provider == 'groq':
-            result = test_groq_key(api_key, test_text)
-        elif provider == 'openai':
-            result = test_openai_key(api_key, test_text)
-        elif provider == 'claude':
-            result = test_claude_key(api_key, test_text)
-        elif provider == 'deepseek':
-            result = test_deepseek_key(api_key, test_text)
-        elif provider == 'perplexity':
-            result = test_perplexity_key(api_key, test_text)
-        else:
+        adapter = providers.get_adapter(provider)
+        if adapter is None:
             return {'valid': False, 'error': 'Unknown provider'}
 
+        result = adapter.test_key(api_key, test_text)
         return {'valid': True, 'test_result': result}
 
     except Exception as e:
         return {'valid': False, 'error': str(e)}
 
 def test_groq_key(api_key, text):
-    """Test Groq API key with current production model"""
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "llama-3.3-70b-versatile",  # Current production model
-        "messages": [{"role": "user", "content": f"Translate to Arabic: {text}"}],
-        "max_tokens": 50
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
-    return response.status_code == 200
+    """Test Groq API key"""
+    return providers.get_adapter('groq').test_key(api_key, text)
 
 def test_openai_key(api_key, text):
     """Test OpenAI API key"""
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "gpt-3.5-turbo",
-        "messages": [{"role": "user", "content": f"Translate to Arabic: {text}"}],
-        "max_tokens": 50
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
-    return response.status_code == 200
+    return providers.get_adapter('openai').test_key(api_key, text)
 
 def test_claude_key(api_key, text):
     """Test Claude API key"""
-    url = "https://api.anthropic.com/v1/messages"
-    headers = {
-        "x-api-key": api_key,
-        "Content-Type": "application/json",
-        "anthropic-version": "2023-06-01"
-    }
-    payload = {
-        "model": "claude-3-haiku-20240307",
-        "max_tokens": 50,
-        "messages": [{"role": "user", "content": f"Translate to Arabic: {text}"}]
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
-    return response.status_code == 200
+    return providers.get_adapter('claude').test_key(api_key, text)
 
 def test_deepseek_key(api_key, text):
     """Test DeepSeek API key"""
-    url = "https://api.deepseek.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "deepseek-chat",
-        "messages": [{"role": "user", "content": f"Translate to Arabic: {text}"}],
-        "max_tokens": 50
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
-    return response.status_code == 200
+    return providers.get_adapter('deepseek').test_key(api_key, text)
 
 def test_perplexity_key(api_key, text):
     """Test Perplexity API key"""
-    url = "https://api.perplexity.ai/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "llama-3.1-sonar-large-128k-online",
-        "messages": [{"role": "user", "content": f"Translate to Arabic: {text}"}],
-        "max_tokens": 50
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
-    return response.status_code == 200
+    return providers.get_adapter('perplexity').test_key(api_key, text)
 
 @frappe.whitelist()
-def clear_all_translations():
+def clear_all_translations(from_date=None, to_date=None, target_language=None, ai_provider=None, invoices=None,
+                           background=1, chunk_size=None, throttle=None):
     """
-    Clear all translations (for testing purposes)
+    Clear stored translations in chunks, optionally filtered (see ai_translate.clearing)
     """
     try:
-        frappe.db.sql("""
-            UPDATE `tabSales Invoice Item` 
-            SET custom_translated_description = NULL 
-            WHERE custom_translated_description IS NOT NULL
-        """)
-        frappe.db.commit()
-        return {'success': True, 'message': 'All translations cleared'}
+        return clearing.clear_all_translations(from_date, to_date, target_language, ai_provider, invoices,
+            background, chunk_size, throttle)
+
+    except frappe.PermissionError:
+        raise
     except Exception as e:
         frappe.db.rollback()
         return {'success': False, 'error': str(e)}
 
 @frappe.whitelist()
-def export_translations():
+def export_translations(export_format="jsonl", from_date=None, to_date=None, target_language=None,
+                        ai_provider=None, since_last_export=0, background=1):
     """
-    Export all translations for backup/analysis
+    Export translations for backup/analysis to a private File (see ai_translate.export)
     """
     try:
-        translations = frappe.db.sql("""
-            SELECT 
-                sii.parent as invoice_name,
-                sii.item_code,
-                sii.description as original_text,
-                sii.custom_translated_description as translated_text,
-                si.custom_translation_language as target_language,
-                si.custom_ai_provider as ai_provider,
-                sii.modified
-            FROM `tabSales Invoice Item` sii
-            JOIN `tabSales Invoice` si ON sii.parent = si.name
-            WHERE sii.custom_translated_description IS NOT NULL
-            AND sii.custom_translated_description != ''
-            ORDER BY sii.modified DESC
-        """, as_dict=True)
-
-        return {
-            'success': True,
-            'data': translations,
-            'count': len(translations)
-        }
+        return export.export_translations(export_format, from_date, to_date, target_language, ai_provider,
+            since_last_export, background)
 
+    except frappe.PermissionError:
+        raise
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
 # Scheduled tasks (referenced in hooks.py)
 def cleanup_translation_logs():
     """
-    Clean up old translation logs (if you implement logging)
+    Delete Translation Log rows older than ai_translate_log_retention_days (30 by default)
     """
     try:
-        # Clean up logs older than 30 days
-        thirty_days_ago = frappe.utils.add_days(frappe.utils.nowdate(), -30)
-
-        # If you implement a Translation Log doctype, clean it up here
-        # frappe.db.delete('Translation Log', {'creation': ['<', thirty_days_ago]})
-
-        logger.info("Translation logs cleanup completed")
+        deleted = translation_log.delete_expired_logs()
+        logger.info(f"Translation logs cleanup completed, {deleted} rows deleted")
 
     except Exception as e:
         logger.error(f"Translation logs cleanup failed: {str(e)}")
@@ -1122,26 +1090,5 @@ def get_native_language_name(code):
     """
     Get native language names for better UX
     """
-    native_names = {
-        'ar': 'العربية',
-        'es': 'Español',
-        'fr': 'Français',
-        'de': 'Deutsch',
-        'it': 'Italiano',
-        'pt': 'Português',
-        'ru': 'Русский',
-        'ja': '日本語',
-        'ko': '한국어',
-        'zh': '中文',
-        'zh-tw': '中文(繁體)',
-        'hi': 'हिन्दी',
-        'ur': 'اردو',
-        'tr': 'Türkçe',
-        'nl': 'Nederlands',
-        'sv': 'Svenska',
-        'da': 'Dansk',
-        'no': 'Norsk',
-        'fi': 'Suomi',
-        'en': 'English'
-    }
-    return native_names.get(code, code)
+    config = get_config()
+    return config.native_language_names.get(code) or config.language_names.get(code, code)
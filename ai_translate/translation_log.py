@@ -0,0 +1,266 @@
+import json
+import logging
+import time
+
+import frappe
+from frappe.utils import add_days, cint, now_datetime
+
+logger = logging.getLogger(__name__)
+
+DOCTYPE = "Translation Log"
+
+# Entries wait in this Redis list until the next flush writes them in bulk
+BUFFER_KEY = "ai_translate:translation_log_buffer"
+# Entries that could not be inserted even on their own, kept for inspection
+DEAD_LETTER_KEY = "ai_translate:translation_log_dead_letter"
+DEAD_LETTER_SIZE = 10000
+DEAD_LETTER_TTL = 7 * 24 * 3600
+FLUSH_CHUNK = 1000  # rows per multi-row INSERT
+FLUSH_THRESHOLD = 500  # buffered entries that trigger a flush before the scheduler's next run
+MAX_FLUSH_CHUNKS = 50
+
+DEFAULT_RETENTION_DAYS = 30
+CLEANUP_CHUNK = 5000
+MAX_CLEANUP_SECONDS = 300
+
+TEXT_PREVIEW_CHARS = 140
+
+FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"status",
+	"source",
+	"ai_provider",
+	"model",
+	"source_language",
+	"target_language",
+	"processing_time",
+	"prompt_tokens",
+	"completion_tokens",
+	"cached_tokens",
+	"source_text",
+	"error",
+)
+
+
+def is_enabled():
+	return cint(frappe.conf.get("ai_translate_translation_log", 1))
+
+
+def make_entry(provider, model, source_language, target_language, source, seconds, text=None, usage=None,
+		error=None):
+	"""
+	One buffered Translation Log row, serialised in FIELDS order. The row is named and
+	timestamped now so the flush only has to insert it.
+	"""
+	now = str(now_datetime())
+	user = frappe.session.user if getattr(frappe.local, "session", None) else "Administrator"
+	usage = usage or {}
+	status = {"failed": "Failed", "skipped": "Skipped"}.get(source, "Success")
+
+	return json.dumps(
+		[
+			frappe.generate_hash(length=10),
+			now,
+			now,
+			user,
+			user,
+			status,
+			source,
+			provider,
+			model or "",
+			source_language,
+			target_language,
+			round(seconds or 0, 3),
+			cint(usage.get("prompt_tokens")),
+			cint(usage.get("completion_tokens")),
+			cint(usage.get("cached_tokens")),
+			(text or "")[:TEXT_PREVIEW_CHARS],
+			(error or "")[:1000],
+		],
+		ensure_ascii=False,
+	)
+
+
+def buffer_entries(entries):
+	"""
+	Append serialised entries to the buffer in one round trip
+	"""
+	if not entries or not is_enabled():
+		return
+	try:
+		cache = frappe.cache()
+		pipe = cache.pipeline(transaction=False)
+		pipe.rpush(cache.make_key(BUFFER_KEY), *entries)
+		(length,) = pipe.execute()
+	except Exception as e:
+		logger.debug(f"Could not buffer translation log entries: {str(e)}")
+		return
+	after_buffered(length, len(entries))
+
+
+def after_buffered(length, added=1):
+	"""
+	Queue a flush when this push took the buffer past a multiple of FLUSH_THRESHOLD
+	"""
+	if length // FLUSH_THRESHOLD > (length - added) // FLUSH_THRESHOLD:
+		enqueue_flush()
+
+
+def enqueue_flush():
+	try:
+		frappe.enqueue(
+			"ai_translate.translation_log.flush_translation_logs",
+			queue="short",
+			job_id="ai_translate_flush_translation_logs",
+			deduplicate=True,
+		)
+	except Exception as e:
+		logger.debug(f"Could not queue translation log flush: {str(e)}")
+
+
+def flush_translation_logs(max_chunks=MAX_FLUSH_CHUNKS):
+	"""
+	Move buffered entries into the Translation Log with multi-row inserts and add them
+	to the daily aggregates. Runs from the scheduler and whenever the buffer grows past
+	FLUSH_THRESHOLD.
+	"""
+	from ai_translate.translation_stats import apply_log_rows
+
+	cache = frappe.cache()
+	key = cache.make_key(BUFFER_KEY)
+	written = 0
+
+	for _chunk in range(max_chunks):
+		# Take and trim atomically so concurrent flushes never insert the same entries
+		pipe = cache.pipeline()
+		pipe.lrange(key, 0, FLUSH_CHUNK - 1)
+		pipe.ltrim(key, FLUSH_CHUNK, -1)
+		raw, _trimmed = pipe.execute()
+		if not raw:
+			break
+
+		entries = []
+		rejected = []
+		for value in raw:
+			try:
+				entries.append((value, json.loads(value)))
+			except ValueError:
+				rejected.append(value)
+
+		rows = [row for _value, row in entries]
+		try:
+			frappe.db.bulk_insert(DOCTYPE, FIELDS, rows, ignore_duplicates=True)
+			apply_log_rows(rows)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+			# One bad row fails the whole INSERT; find it by inserting them one by one
+			rows, failed = insert_one_by_one(entries)
+			if rows is None:
+				# Not a bad row: the database is failing. Back into the buffer for the next run.
+				pipe = cache.pipeline(transaction=False)
+				pipe.rpush(key, *raw)
+				pipe.execute()
+				frappe.log_error(title="Translation Log flush failed")
+				break
+			rejected += failed
+
+		if rejected:
+			dead_letter(rejected)
+		written += len(rows)
+		if len(raw) < FLUSH_CHUNK:
+			break
+
+	return written
+
+
+def insert_one_by_one(entries):
+	"""
+	Insert (raw value, row) entries each behind its own savepoint and commit the ones
+	that went in. Returns (inserted rows, raw values that failed), or (None, None) when
+	the database itself is failing.
+	"""
+	from ai_translate.translation_stats import apply_log_rows
+
+	inserted = []
+	failed = []
+	for value, row in entries:
+		frappe.db.savepoint("translation_log_row")
+		try:
+			frappe.db.bulk_insert(DOCTYPE, FIELDS, [row], ignore_duplicates=True)
+			inserted.append(row)
+		except Exception:
+			frappe.db.rollback(save_point="translation_log_row")
+			failed.append(value)
+
+	if entries and not inserted and not database_responds():
+		frappe.db.rollback()
+		return None, None
+
+	try:
+		apply_log_rows(inserted)
+		frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		return None, None
+	return inserted, failed
+
+
+def database_responds():
+	try:
+		frappe.db.rollback()
+		frappe.db.sql("SELECT 1")
+		return True
+	except Exception:
+		return False
+
+
+def dead_letter(values):
+	"""
+	Set aside buffered entries that cannot be inserted, so they stop blocking the flush
+	"""
+	logger.warning(f"Moving {len(values)} unusable Translation Log entries to the dead letter list")
+	try:
+		cache = frappe.cache()
+		key = cache.make_key(DEAD_LETTER_KEY)
+		pipe = cache.pipeline(transaction=False)
+		pipe.rpush(key, *values)
+		pipe.ltrim(key, -DEAD_LETTER_SIZE, -1)
+		pipe.expire(key, DEAD_LETTER_TTL)
+		pipe.execute()
+	except Exception as e:
+		logger.warning(f"Could not keep dead-lettered Translation Log entries: {str(e)}")
+
+
+def delete_expired_logs(retention_days=None):
+	"""
+	Delete Translation Log rows older than the retention period, oldest first, in chunks
+	that each commit on their own, so the cleanup never holds long locks
+	"""
+	days = cint(retention_days or frappe.conf.get("ai_translate_log_retention_days")) or DEFAULT_RETENTION_DAYS
+	cutoff = add_days(now_datetime(), -days)
+	deadline = time.monotonic() + MAX_CLEANUP_SECONDS
+	deleted = 0
+
+	while time.monotonic() < deadline:
+		names = frappe.get_all(
+			DOCTYPE,
+			filters={"creation": ["<", cutoff]},
+			order_by="creation asc",
+			limit_page_length=CLEANUP_CHUNK,
+			pluck="name",
+		)
+		if not names:
+			break
+
+		frappe.db.delete(DOCTYPE, {"name": ["in", names]})
+		frappe.db.commit()
+		deleted += len(names)
+		if len(names) < CLEANUP_CHUNK:
+			break
+
+	return deleted
@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import frappe
+from frappe.utils import cint
+
+logger = logging.getLogger(__name__)
+
+DOCTYPE = "Translation Memory"
+REDIS_PREFIX = "ai_translate:tm:"
+
+# Defaults, overridable from site_config.json
+DEFAULT_LOCAL_SIZE = 4096
+DEFAULT_LOCAL_TTL = 600  # seconds
+DEFAULT_SHARED_TTL = 7 * 24 * 3600  # seconds
+
+
+class LRUCache:
+	"""
+	Thread-safe in-process LRU with size and TTL eviction
+	"""
+
+	def __init__(self, maxsize=DEFAULT_LOCAL_SIZE, ttl=DEFAULT_LOCAL_TTL):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self._data = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			entry = self._data.get(key)
+			if entry is None:
+				return None
+
+			expires_at, value = entry
+			if expires_at < time.monotonic():
+				del self._data[key]
+				return None
+
+			self._data.move_to_end(key)
+			return value
+
+	def set(self, key, value):
+		with self._lock:
+			self._data[key] = (time.monotonic() + self.ttl, value)
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+
+	def delete(self, key):
+		with self._lock:
+			self._data.pop(key, None)
+
+	def clear(self):
+		with self._lock:
+			self._data.clear()
+
+	def __len__(self):
+		return len(self._data)
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache():
+	"""
+	Per-process LRU, sized from site config on first use
+	"""
+	global _local_cache
+
+	if _local_cache is None:
+		with _local_cache_lock:
+			if _local_cache is None:
+				_local_cache = LRUCache(
+					maxsize=frappe.conf.get("ai_translate_tm_local_size") or DEFAULT_LOCAL_SIZE,
+					ttl=frappe.conf.get("ai_translate_tm_local_ttl") or DEFAULT_LOCAL_TTL,
+				)
+	return _local_cache
+
+
+def is_enabled():
+	return bool(frappe.conf.get("ai_translate_tm_enabled", 1))
+
+
+def normalize_text(text):
+	"""
+	Canonical form used for keying: NFC, collapsed whitespace, trimmed
+	"""
+	if not text:
+		return ""
+	text = unicodedata.normalize("NFC", text)
+	return " ".join(text.split())
+
+
+def make_key(text, source_language, target_language, provider, model):
+	"""
+	Stable hash of the normalized text and everything that influences the output
+	"""
+	parts = [normalize_text(text), source_language or "", target_language or "", provider or "", model or ""]
+	return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def lookup(text, source_language, target_language, provider, model):
+	"""
+	Look up a translation, promoting shared-tier hits into the faster tiers.
+
+	Returns a dict with ``translated_text``, ``ai_provider``, ``model`` and ``tier``
+	(``memory``, ``redis`` or ``database``), or None on a miss.
+	"""
+	if not is_enabled():
+		return None
+
+	key = make_key(text, source_language, target_language, provider, model)
+	return lookup_key(key)
+
+
+def lookup_key(key):
+	local_key = f"{frappe.local.site}:{key}"
+	local_cache = get_local_cache()
+
+	entry = local_cache.get(local_key)
+	if entry:
+		return dict(entry, tier="memory")
+
+	try:
+		entry = frappe.cache().get_value(REDIS_PREFIX + key)
+		if entry:
+			local_cache.set(local_key, entry)
+			return dict(entry, tier="redis")
+
+		row = frappe.db.get_value(
+			DOCTYPE, key, ["translated_text", "ai_provider", "model"], as_dict=True
+		)
+		if row and row.translated_text:
+			entry = {
+				"translated_text": row.translated_text,
+				"ai_provider": row.ai_provider,
+				"model": row.model,
+			}
+			_set_shared(key, entry)
+			local_cache.set(local_key, entry)
+			return dict(entry, tier="database")
+
+	except Exception as e:
+		logger.warning(f"Translation memory lookup failed: {str(e)}")
+
+	return None
+
+
+def store(text, source_language, target_language, provider, model, translated_text, persist=True):
+	"""
+	Write a translation to every tier. Failures are logged, never raised.
+	"""
+	if not is_enabled() or not translated_text:
+		return
+
+	key = make_key(text, source_language, target_language, provider, model)
+	entry = {
+		"translated_text": translated_text,
+		"ai_provider": provider,
+		"model": model,
+	}
+
+	get_local_cache().set(f"{frappe.local.site}:{key}", entry)
+
+	try:
+		_set_shared(key, entry)
+		if persist:
+			_persist(key, text, source_language, target_language, provider, model, translated_text)
+
+		from ai_translate.fuzzy_match import add_segment
+
+		add_segment(text, source_language, target_language, translated_text)
+	except Exception as e:
+		logger.warning(f"Translation memory store failed: {str(e)}")
+
+
+def _set_shared(key, entry):
+	ttl = frappe.conf.get("ai_translate_tm_shared_ttl") or DEFAULT_SHARED_TTL
+	frappe.cache().set_value(REDIS_PREFIX + key, entry, expires_in_sec=ttl)
+
+
+def _persist(key, text, source_language, target_language, provider, model, translated_text):
+	if frappe.db.exists(DOCTYPE, key):
+		frappe.db.set_value(DOCTYPE, key, "translated_text", translated_text, update_modified=True)
+		return
+
+	frappe.get_doc(
+		{
+			"doctype": DOCTYPE,
+			"cache_key": key,
+			"source_text": normalize_text(text),
+			"source_language": source_language,
+			"target_language": target_language,
+			"ai_provider": provider,
+			"model": model,
+			"translated_text": translated_text,
+		}
+	).insert(ignore_permissions=True, ignore_if_duplicate=True)
+
+
+@frappe.whitelist()
+def clear_translation_memory(include_database=0):
+	"""
+	Drop cached translations from the local and shared tiers (optionally the table too)
+	"""
+	frappe.only_for("System Manager")
+
+	get_local_cache().clear()
+	frappe.cache().delete_keys(REDIS_PREFIX)
+
+	if cint(include_database):
+		frappe.db.delete(DOCTYPE)
+
+	return {"success": True, "message": "Translation memory cleared"}
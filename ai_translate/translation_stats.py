@@ -0,0 +1,294 @@
+import logging
+
+import frappe
+from frappe.utils import add_days, cint, flt, getdate, now_datetime, nowdate
+
+from ai_translate import translation_log
+
+logger = logging.getLogger(__name__)
+
+DOCTYPE = "Translation Daily Stat"
+
+STATS_CACHE_KEY = "ai_translate:translation_stats"
+STATS_CACHE_TTL = 60  # seconds the dashboard numbers may lag behind
+
+DEFAULT_RECONCILE_DAYS = 3
+RECENT_DAYS = 30
+
+# Maintained from the Translation Log
+COUNTERS = ("translations", "failed", "cache_hits", "processing_time", "prompt_tokens", "cached_tokens")
+# Kept by the writes to Sales Invoice Item, whether or not the log is kept
+ROW_COUNTERS = ("translated_rows",)
+
+
+def make_name(date, provider, target_language):
+	return f"{getdate(date)}::{provider or ''}::{target_language or ''}"
+
+
+def aggregate_log_rows(rows):
+	"""
+	{(date, provider, target_language): counters} of serialised Translation Log rows
+	"""
+	totals = {}
+	for row in rows:
+		entry = dict(zip(translation_log.FIELDS, row))
+		if entry["status"] == "Skipped":
+			continue
+
+		key = (str(entry["creation"])[:10], entry["ai_provider"] or "", entry["target_language"] or "")
+		counters = totals.setdefault(key, dict.fromkeys(COUNTERS, 0))
+		if entry["status"] == "Failed":
+			counters["failed"] += 1
+		else:
+			counters["translations"] += 1
+			if entry["source"] in ("cache", "fuzzy", "item"):
+				counters["cache_hits"] += 1
+		counters["processing_time"] += flt(entry["processing_time"])
+		counters["prompt_tokens"] += cint(entry["prompt_tokens"])
+		counters["cached_tokens"] += cint(entry["cached_tokens"])
+	return totals
+
+
+def apply_log_rows(rows):
+	"""
+	Add freshly flushed Translation Log rows to the daily aggregates, in the flush's
+	transaction so a failed flush leaves both untouched
+	"""
+	_upsert(aggregate_log_rows(rows), increment=True)
+
+
+def reconcile_daily_stats(days=None):
+	"""
+	Recompute the aggregates of the last few complete days from the Translation Log,
+	correcting any drift from lost buffer entries or partial flushes
+	"""
+	days = cint(days or frappe.conf.get("ai_translate_stats_reconcile_days")) or DEFAULT_RECONCILE_DAYS
+	# Whatever is still buffered belongs in the recount
+	translation_log.flush_translation_logs()
+
+	end = getdate(nowdate())
+	start = add_days(end, -days)
+	rows = frappe.db.sql(
+		f"""
+		SELECT DATE(creation) AS date, ai_provider, target_language,
+			SUM(status = 'Success') AS translations,
+			SUM(status = 'Failed') AS failed,
+			SUM(status = 'Success' AND source IN ('cache', 'fuzzy', 'item')) AS cache_hits,
+			SUM(processing_time) AS processing_time,
+			SUM(prompt_tokens) AS prompt_tokens,
+			SUM(cached_tokens) AS cached_tokens
+		FROM `tab{translation_log.DOCTYPE}`
+		WHERE creation >= %s AND creation < %s AND status != 'Skipped'
+		GROUP BY DATE(creation), ai_provider, target_language
+		""",
+		(start, end),
+		as_dict=True,
+	)
+
+	# Only the log counters are recounted; translated_rows comes from the invoices
+	frappe.db.sql(
+		f"""
+		UPDATE `tab{DOCTYPE}`
+		SET {", ".join(f"`{name}` = 0" for name in COUNTERS)}
+		WHERE date BETWEEN %s AND %s
+		""",
+		(start, add_days(end, -1)),
+	)
+	_upsert(
+		{
+			(str(row.date), row.ai_provider or "", row.target_language or ""): {name: row[name] or 0 for name in COUNTERS}
+			for row in rows
+		},
+		increment=False,
+	)
+	frappe.db.commit()
+	frappe.cache().delete_value(STATS_CACHE_KEY)
+	return len(rows)
+
+
+def reconcile_translated_rows(days=None, full=False):
+	"""
+	Recount the translated Sales Invoice Item rows modified in the last few days per day
+	(of their last change), provider and target language, correcting any drift of the
+	counters kept by the writes. Only the indexed modified range is read; the install
+	patch passes full to count every row once.
+	"""
+	days = cint(days or frappe.conf.get("ai_translate_stats_reconcile_days")) or DEFAULT_RECONCILE_DAYS
+	start = None if full else add_days(getdate(nowdate()), -days)
+
+	rows = frappe.db.sql(
+		f"""
+		SELECT DATE(sii.modified) AS date, si.custom_ai_provider AS ai_provider,
+			si.custom_translation_language AS target_language, COUNT(*) AS translated_rows
+		FROM `tabSales Invoice Item` sii
+		INNER JOIN `tabSales Invoice` si ON si.name = sii.parent
+		WHERE sii.parenttype = 'Sales Invoice'
+			AND sii.custom_translated_description IS NOT NULL
+			AND sii.custom_translated_description != ''
+			{"AND sii.modified >= %(start)s" if start else ""}
+		GROUP BY DATE(sii.modified), si.custom_ai_provider, si.custom_translation_language
+		""",
+		{"start": start},
+		as_dict=True,
+	)
+
+	frappe.db.sql(
+		f"""
+		UPDATE `tab{DOCTYPE}`
+		SET `translated_rows` = 0
+		WHERE `translated_rows` != 0 {"AND date >= %(start)s" if start else ""}
+		""",
+		{"start": start},
+	)
+	totals = row_totals(rows)
+	_upsert(totals, increment=False, counters=ROW_COUNTERS)
+	frappe.db.commit()
+	frappe.cache().delete_value(STATS_CACHE_KEY)
+	return len(totals)
+
+
+def row_totals(rows):
+	"""
+	{(date, provider, target_language): {"translated_rows": count}} of rows with date,
+	ai_provider, target_language and translated_rows, as read from the invoices
+	"""
+	from ai_translate.auto_translate import language_code
+
+	# Invoices store language labels ("Arabic"), the log stores codes
+	totals = {}
+	for row in rows:
+		key = (str(getdate(row["date"])), row["ai_provider"] or "", language_code(row["target_language"]))
+		counters = totals.setdefault(key, {"translated_rows": 0})
+		counters["translated_rows"] += cint(row["translated_rows"])
+	return totals
+
+
+def adjust_translated_rows(totals):
+	"""
+	Add the signed counts of row_totals to translated_rows, in the caller's transaction
+	so the counters move with the rows they count
+	"""
+	_upsert(
+		{key: counters for key, counters in totals.items() if counters["translated_rows"]},
+		increment=True,
+		counters=ROW_COUNTERS,
+	)
+
+
+def record_invoice_rows(doc, method=None):
+	"""
+	Sales Invoice validate, before_cancel, before_update_after_submit and on_trash
+	hooks: a save stamps every item with the invoice's modified time, so its
+	translated rows move off the day, provider and language they were counted under
+	onto the invoice's current ones; a deleted invoice takes its rows with it.
+	"""
+	before = doc if method == "on_trash" else doc.get_doc_before_save()
+	rows = []
+	if before:
+		rows += [
+			{
+				"date": row.modified,
+				"ai_provider": before.get("custom_ai_provider"),
+				"target_language": before.get("custom_translation_language"),
+				"translated_rows": -1,
+			}
+			for row in before.items
+			if row.get("custom_translated_description") and row.get("modified")
+		]
+	if method != "on_trash":
+		rows += [
+			{
+				"date": doc.modified or nowdate(),
+				"ai_provider": doc.get("custom_ai_provider"),
+				"target_language": doc.get("custom_translation_language"),
+				"translated_rows": 1,
+			}
+			for row in doc.items
+			if row.get("custom_translated_description")
+		]
+	adjust_translated_rows(row_totals(rows))
+
+
+def _upsert(totals, increment, counters=COUNTERS):
+	if not totals:
+		return
+
+	now = now_datetime()
+	fields = ["name", "creation", "modified", "owner", "modified_by", "date", "ai_provider", "target_language"]
+	fields += counters
+	values = []
+	params = []
+	for (date, provider, target_language), row in totals.items():
+		values.append("(" + ", ".join(["%s"] * len(fields)) + ")")
+		params += [make_name(date, provider, target_language), now, now, "Administrator", "Administrator", date,
+			provider, target_language]
+		params += [row[name] for name in counters]
+
+	if increment:
+		updates = [f"`{name}` = `{name}` + VALUES(`{name}`)" for name in counters]
+	else:
+		updates = [f"`{name}` = VALUES(`{name}`)" for name in counters]
+	updates.append("`modified` = VALUES(`modified`)")
+
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tab{DOCTYPE}` ({", ".join(f"`{name}`" for name in fields)})
+		VALUES {", ".join(values)}
+		ON DUPLICATE KEY UPDATE {", ".join(updates)}
+		""",
+		params,
+	)
+
+
+def get_stats():
+	"""
+	Dashboard statistics from the daily aggregates, cached for STATS_CACHE_TTL seconds
+	"""
+	stats = frappe.cache().get_value(STATS_CACHE_KEY, expires=True)
+	if stats is None:
+		stats = _compute_stats()
+		frappe.cache().set_value(STATS_CACHE_KEY, stats, expires_in_sec=STATS_CACHE_TTL)
+	return stats
+
+
+def _compute_stats():
+	totals = frappe.db.sql(
+		f"""
+		SELECT ai_provider, target_language, SUM(translated_rows) AS translated_rows,
+			SUM(translations) AS translations, SUM(failed) AS failed, SUM(cache_hits) AS cache_hits
+		FROM `tab{DOCTYPE}`
+		GROUP BY ai_provider, target_language
+		""",
+		as_dict=True,
+	)
+	recent_activity = frappe.db.sql(
+		f"""
+		SELECT date, SUM(translated_rows) AS count
+		FROM `tab{DOCTYPE}`
+		WHERE date >= %s AND translated_rows > 0
+		GROUP BY date
+		ORDER BY date DESC
+		""",
+		add_days(nowdate(), -RECENT_DAYS),
+		as_dict=True,
+	)
+
+	provider_stats = {}
+	language_stats = {}
+	for row in totals:
+		if not cint(row.translated_rows):
+			continue
+		provider_stats[row.ai_provider] = provider_stats.get(row.ai_provider, 0) + cint(row.translated_rows)
+		language_stats[row.target_language] = language_stats.get(row.target_language, 0) + cint(row.translated_rows)
+
+	# Requests (with their cache hits and failures) are only known while the log is kept
+	translations = sum(cint(row.translations) for row in totals)
+	return {
+		"total_translations": sum(cint(row.translated_rows) for row in totals),
+		"translation_requests": translations,
+		"failed_translations": sum(cint(row.failed) for row in totals),
+		"cache_hit_ratio": round(sum(cint(row.cache_hits) for row in totals) / translations, 3) if translations else 0,
+		"provider_stats": provider_stats,
+		"language_stats": language_stats,
+		"recent_activity": [{"date": str(row.date), "count": cint(row["count"])} for row in recent_activity],
+	}